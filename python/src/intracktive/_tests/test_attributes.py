@@ -0,0 +1,180 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import zarr
+from click.testing import CliRunner
+from intracktive.attributes import (
+    add_attributes,
+    attributes_cli,
+    match_points,
+    remove_attributes,
+)
+from intracktive.convert import convert_dataframe_to_zarr
+
+
+@pytest.fixture
+def sample_data(make_sample_data: pd.DataFrame) -> pd.DataFrame:
+    make_sample_data["area"] = [1.0, 2.0, 3.0, 4.0, 5.0]
+    make_sample_data["label"] = ["a", "b", "a", "b", "b"]
+    return make_sample_data
+
+
+@pytest.mark.parametrize("ragged", [False, True])
+def test_add_attributes_like_convert(
+    tmp_path: Path, sample_data: pd.DataFrame, ragged: bool
+) -> None:
+    converted = zarr.open_group(
+        convert_dataframe_to_zarr(
+            sample_data.copy(),
+            tmp_path / "converted.zarr",
+            extra_cols=["area", "label"],
+            ragged=ragged,
+        ),
+        mode="r",
+    )
+    zarr_path = convert_dataframe_to_zarr(
+        sample_data[["track_id", "t", "z", "y", "x", "parent_track_id"]].copy(),
+        tmp_path / "sample.zarr",
+        ragged=ragged,
+    )
+
+    # the rows of the table are matched by (track_id, t), in any order
+    table = sample_data[["track_id", "t", "area", "label"]].iloc[::-1]
+    names = add_attributes(zarr_path, table)
+    assert names == ["area", "label"]
+
+    attributes = zarr.open_group(zarr_path, mode="r")["attributes"]
+    expected = converted["attributes"]
+    assert attributes.attrs["attribute_names"] == ["area", "label"]
+    assert attributes.attrs["attribute_types"] == expected.attrs["attribute_types"]
+    assert attributes.attrs["attribute_columns"] == [0, 1]
+    assert attributes.attrs["string_mappings"] == {"label": {"0": "a", "1": "b"}}
+    assert attributes.chunks == expected.chunks
+    np.testing.assert_array_equal(attributes[:], expected[:])
+
+
+def test_match_points(tmp_path: Path, sample_data: pd.DataFrame) -> None:
+    zarr_path = convert_dataframe_to_zarr(sample_data.copy(), tmp_path / "sample.zarr")
+
+    # 3 point ids per time point, in the order of the rows of each time point
+    expected = [0, 3, 4, 1, 5]
+    assert match_points(zarr_path, sample_data).tolist() == expected
+    assert match_points(zarr_path, sample_data[["t"]]).tolist() == expected
+    assert match_points(zarr_path, sample_data[["area"]]).tolist() == [0, 1, 3, 4, 5]
+
+    with pytest.raises(ValueError, match="5 points"):
+        match_points(zarr_path, sample_data.iloc[:4])
+    wrong = sample_data.copy()
+    wrong.loc[0, "track_id"] = 10
+    with pytest.raises(ValueError, match="1 rows of the table match no point"):
+        match_points(zarr_path, wrong)
+    with pytest.raises(ValueError, match="points per time point"):
+        match_points(zarr_path, wrong.assign(t=[0, 1, 1, 1, 1])[["t"]])
+
+
+def test_remove_and_add_attributes(tmp_path: Path, sample_data: pd.DataFrame) -> None:
+    zarr_path = convert_dataframe_to_zarr(
+        sample_data.copy(), tmp_path / "sample.zarr", extra_cols=["area", "label"]
+    )
+    attributes_path = zarr_path / "attributes"
+    assert (attributes_path / "0.0").exists()
+
+    assert remove_attributes(zarr_path, ["area"]) == ["label"]
+    attributes = zarr.open_group(zarr_path, mode="r")["attributes"]
+    assert attributes.attrs["attribute_columns"] == [1]
+    # the chunks of the removed attribute are deleted, the others are not rewritten
+    assert not (attributes_path / "0.0").exists()
+    assert (attributes_path / "0.1").exists()
+
+    with pytest.raises(ValueError, match="already in the bundle"):
+        add_attributes(zarr_path, sample_data, ["label"])
+    sample_data["area"] *= 2
+    add_attributes(zarr_path, sample_data, ["area", "label"], replace=True)
+
+    # the columns of removed attributes are never reused
+    attributes = zarr.open_group(zarr_path, mode="r")["attributes"]
+    assert attributes.attrs["attribute_names"] == ["area", "label"]
+    assert attributes.attrs["attribute_columns"] == [2, 3]
+    assert attributes.shape == (2, 12)
+    assert sorted(p.name for p in attributes_path.glob("[0-9]*")) == [
+        "0.2",
+        "0.3",
+        "1.2",
+        "1.3",
+    ]
+    np.testing.assert_allclose(attributes[0, 6:8], [0.0, 0.75])
+
+    assert remove_attributes(zarr_path, ["area", "label"]) == []
+    assert "string_mappings" not in zarr.open_group(zarr_path)["attributes"].attrs
+    with pytest.raises(ValueError, match="not in the bundle"):
+        remove_attributes(zarr_path, ["area"])
+
+
+@pytest.mark.parametrize("ragged", [False, True])
+def test_add_attributes_rechunks_old_bundles(
+    tmp_path: Path, sample_data: pd.DataFrame, ragged: bool
+) -> None:
+    zarr_path = convert_dataframe_to_zarr(
+        sample_data.copy(), tmp_path / "sample.zarr", extra_cols=["area"], ragged=ragged
+    )
+    # bundles converted before the attributes were chunked per attribute
+    group = zarr.open_group(zarr_path, mode="r+")
+    attributes = group["attributes"]
+    expected_chunks = attributes.chunks
+    values = attributes[:]
+    group.create_array(
+        "attributes",
+        data=values,
+        chunks=(attributes.chunks[0], 2 * attributes.shape[1]),
+        attributes=dict(attributes.attrs),
+        overwrite=True,
+    )
+
+    add_attributes(zarr_path, sample_data, ["label"])
+
+    attributes = zarr.open_group(zarr_path, mode="r")["attributes"]
+    assert attributes.chunks == expected_chunks
+    assert attributes.attrs["attribute_names"] == ["area", "label"]
+    np.testing.assert_array_equal(attributes[:, : values.shape[1]], values)
+
+
+def test_add_attributes_without_original_ids(
+    tmp_path: Path, sample_data: pd.DataFrame
+) -> None:
+    zarr_path = convert_dataframe_to_zarr(sample_data.copy(), tmp_path / "sample.zarr")
+    # bundles converted before the original track ids and times were stored
+    group = zarr.open_group(zarr_path, mode="r+")
+    del group["track_ids"]
+    del group["times"]
+
+    with pytest.raises(ValueError, match="does not store the original track ids"):
+        add_attributes(zarr_path, sample_data, ["area"], by="track")
+    add_attributes(zarr_path, sample_data[["t", "area"]])
+
+
+def test_attributes_cli(tmp_path: Path, sample_data: pd.DataFrame) -> None:
+    zarr_path = convert_dataframe_to_zarr(
+        sample_data[["track_id", "t", "z", "y", "x", "parent_track_id"]].copy(),
+        tmp_path / "sample.zarr",
+    )
+    table = tmp_path / "features.csv"
+    sample_data.to_csv(table, index=False)
+    runner = CliRunner()
+
+    result = runner.invoke(attributes_cli, ["add", str(zarr_path), str(table)])
+    assert result.exit_code != 0
+    assert "No attributes to add" in result.output
+
+    result = runner.invoke(
+        attributes_cli, ["add", str(zarr_path), str(table), "--add_all_attributes"]
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output.strip() == "area, label"
+
+    result = runner.invoke(attributes_cli, ["remove", str(zarr_path), "label,area"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(attributes_cli, ["remove", str(zarr_path), "area"])
+    assert result.exit_code != 0
+    assert "Attributes not in the bundle: area" in result.output
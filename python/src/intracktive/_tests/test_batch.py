@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+from intracktive.batch import convert_batch, read_manifest
+from intracktive.main import main
+
+
+def _write_manifest(tmp_path: Path, df: pd.DataFrame) -> Path:
+    df.to_csv(tmp_path / "embryo_1.csv", index=False)
+    df.assign(radius=1.0).to_parquet(tmp_path / "embryo_2.parquet", index=False)
+
+    manifest = [
+        "embryo_1.csv",
+        {"input_file": "embryo_2.parquet", "add_radius": True},
+        {"input_file": "embryo_3.csv"},  # does not exist
+    ]
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest))
+    return manifest_path
+
+
+def test_convert_batch(tmp_path: Path, make_sample_data: pd.DataFrame) -> None:
+    manifest_path = _write_manifest(tmp_path, make_sample_data)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    entries = read_manifest(manifest_path)
+    assert entries[0]["input_file"] == tmp_path / "embryo_1.csv"
+    assert entries[1]["add_radius"] is True
+
+    report_path = tmp_path / "report.json"
+    results = convert_batch(
+        entries,
+        out_dir=out_dir,
+        max_workers=2,
+        memory_budget_gb=1.0,
+        report_path=report_path,
+    )
+
+    assert [r["status"] for r in results] == ["ok", "ok", "failed"]
+    assert (out_dir / "embryo_1_bundle.zarr").exists()
+    assert (out_dir / "embryo_2_bundle.zarr").exists()
+    assert "embryo_3.csv" in results[2]["input_file"]
+
+    report = json.loads(report_path.read_text())
+    assert report["n_datasets"] == 3
+    assert report["n_failed"] == 1
+
+
+def test_convert_batch_cli(tmp_path: Path, make_sample_data: pd.DataFrame) -> None:
+    manifest_path = _write_manifest(tmp_path, make_sample_data)
+
+    runner = CliRunner()
+    result = runner.invoke(main, ["convert-batch", str(manifest_path)])
+
+    # one dataset of the manifest does not exist
+    assert result.exit_code == 1
+    assert "Some datasets failed to convert" in result.output
+    assert (tmp_path / "convert_batch_report.json").exists()
+
+
+def test_read_manifest_invalid_entry(tmp_path: Path) -> None:
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps([{"add_radius": True}]))
+
+    with pytest.raises(ValueError, match="input_file"):
+        read_manifest(manifest_path)
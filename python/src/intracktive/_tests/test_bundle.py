@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from intracktive.bundle import BundleReader, open_bundle
+from intracktive.convert import convert_dataframe_to_zarr
+
+
+@pytest.fixture
+def bundle_path(tmp_path: Path, make_sample_data: pd.DataFrame) -> Path:
+    return convert_dataframe_to_zarr(make_sample_data, tmp_path / "sample.zarr")
+
+
+def test_bundle_reader_query_lineage(bundle_path: Path) -> None:
+    reader = BundleReader(bundle_path)
+    assert reader.num_points == 6
+    assert reader.num_tracks == 4
+
+    # point 4 is the (only) point of track 3 (0-based id 2), a daughter of track 1
+    result = reader.query_lineage([4])
+    assert result["point_track_ids"] == [[2]]
+    assert [track["track_id"] for track in result["tracks"]] == [0, 2]
+    assert [track["parent_track_id"] for track in result["tracks"]] == [-1, 1]
+    assert result["tracks"][1]["point_ids"] == [4]
+    assert result["tracks"][1]["positions"] == [60.0, 30.0, 90.0]
+
+    # lineages of multiple points are merged
+    result = reader.query_lineage([0, 1])
+    assert [track["track_id"] for track in result["tracks"]] == [0, 1, 2, 3]
+    assert result["tracks"][3]["point_ids"] == [1, 5]
+    np.testing.assert_array_equal(
+        result["tracks"][3]["positions"], [31, 32, 33, 41, 42, 43]
+    )
+
+    # padding points do not belong to any track
+    assert reader.query_lineage([2]) == {
+        "point_ids": [2],
+        "point_track_ids": [[]],
+        "tracks": [],
+    }
+
+    with pytest.raises(ValueError, match="Point ids must be in"):
+        reader.query_lineage([6])
+
+
+def test_open_bundle_reuses_reader(bundle_path: Path) -> None:
+    assert open_bundle(bundle_path) is open_bundle(bundle_path)
+
+
+def test_bundle_reader_ragged(tmp_path: Path, make_sample_data: pd.DataFrame) -> None:
+    reader = BundleReader(
+        convert_dataframe_to_zarr(
+            make_sample_data, tmp_path / "ragged.zarr", ragged=True
+        )
+    )
+    assert reader.version == 2
+    # no padding: the points of the second time point are 2, 3 and 4
+    assert reader.num_points == 5
+    assert reader.num_times == 2
+    assert reader.max_points_per_time_point == 3
+    assert reader.time_of_points([0, 1, 2, 4]).tolist() == [0, 0, 1, 1]
+
+    result = reader.query_lineage([3])
+    assert result["point_track_ids"] == [[2]]
+    assert result["tracks"][1]["point_ids"] == [3]
+    assert result["tracks"][1]["positions"] == [60.0, 30.0, 90.0]
+
+    with pytest.raises(ValueError, match="Point ids must be in"):
+        reader.query_lineage([5])
+
+
+def test_bundle_reader_quantized(
+    tmp_path: Path, make_sample_data: pd.DataFrame
+) -> None:
+    reader = BundleReader(
+        convert_dataframe_to_zarr(
+            make_sample_data,
+            tmp_path / "quantized.zarr",
+            quantize=True,
+            delta_encode=True,
+        )
+    )
+    max_error = reader.tracks_to_points_quantization["max_error"]
+    # the positions of the tracks are decoded, also when the tracks are not consecutive
+    result = reader.query_lineage([4])
+    positions = [track["positions"] for track in result["tracks"]]
+    np.testing.assert_allclose(positions[0], [10, 20, 30], atol=max_error + 1e-4)
+    np.testing.assert_allclose(positions[1], [60, 30, 90], atol=max_error + 1e-4)
+    result = reader.query_lineage([1])
+    np.testing.assert_allclose(
+        result["tracks"][0]["positions"],
+        [31, 32, 33, 41, 42, 43],
+        atol=max_error + 1e-4,
+    )
@@ -0,0 +1,155 @@
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+from intracktive.catalog import (
+    RELOAD_INTERVAL,
+    BundleCatalog,
+    bundle_summary,
+    catalog_cli,
+    serve_bundle,
+    serve_catalog,
+)
+from intracktive.convert import convert_dataframe_to_zarr
+
+
+def _get_json(url: str):
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+
+@pytest.fixture
+def bundles(tmp_path: Path, make_sample_data: pd.DataFrame) -> list[Path]:
+    paths = [tmp_path / "a" / "sample.zarr", tmp_path / "b" / "sample.zarr"]
+    df = make_sample_data.assign(area=[1.0, 2.0, 3.0, 4.0, 5.0])
+    for path in paths:
+        convert_dataframe_to_zarr(df, path, extra_cols=["area"])
+    return paths
+
+
+def test_bundle_summary(bundles: list[Path]) -> None:
+    summary = bundle_summary(bundles[0])
+    assert summary["num_times"] == 2
+    assert summary["max_points_per_time_point"] == 3
+    assert summary["num_points"] == 5
+    assert summary["num_tracks"] == 4
+    assert summary["ndim"] == 3
+    assert summary["attributes"] == ["area"]
+
+
+def test_bundle_summary_ragged(tmp_path: Path, make_sample_data: pd.DataFrame) -> None:
+    zarr_path = convert_dataframe_to_zarr(
+        make_sample_data, tmp_path / "ragged.zarr", ragged=True
+    )
+    summary = bundle_summary(zarr_path)
+    assert summary["num_times"] == 2
+    assert summary["max_points_per_time_point"] == 3
+    assert summary["num_points"] == 5
+    assert summary["bundle_version"] == 2
+    assert bundle_summary(tmp_path / "missing.zarr")["bundle_version"] == 1
+
+
+def test_catalog_add_remove(bundles: list[Path], tmp_path: Path) -> None:
+    catalog = BundleCatalog()
+    assert catalog.add(bundles[0]) == "sample.zarr"
+    # same bundle: same name, same file name: unique name
+    assert catalog.add(bundles[0]) == "sample.zarr"
+    assert catalog.add(bundles[1]) == "sample-2.zarr"
+    with pytest.raises(ValueError, match="already registered"):
+        catalog.add(bundles[1], name="sample.zarr")
+    with pytest.raises(ValueError, match="Invalid bundle name"):
+        catalog.add(bundles[1], name="../x")
+    with pytest.raises(ValueError, match="not an inTRACKtive bundle"):
+        catalog.add(tmp_path)
+
+    assert catalog.names() == ["sample-2.zarr", "sample.zarr"]
+    assert catalog.translate_path("/sample-2.zarr/points/0.0") == str(
+        bundles[1] / "points" / "0.0"
+    )
+    assert catalog.translate_path("/sample.zarr/../../etc/passwd") == str(
+        bundles[0] / "etc" / "passwd"
+    )
+    assert catalog.translate_path("/unknown.zarr/points/0.0") == ""
+
+    catalog.remove("sample.zarr")
+    assert "sample.zarr" not in catalog
+    with pytest.raises(KeyError):
+        catalog.remove("sample.zarr")
+
+
+def test_catalog_registry_reload(bundles: list[Path], tmp_path: Path) -> None:
+    registry = tmp_path / "registry.json"
+    catalog = BundleCatalog(registry)
+    catalog.add(bundles[0], name="first")
+    assert json.loads(registry.read_text()) == {"bundles": {"first": str(bundles[0])}}
+
+    # another process adds a bundle (relative paths are relative to the registry)
+    registry.write_text(
+        json.dumps({"bundles": {"first": "a/sample.zarr", "second": "b/sample.zarr"}})
+    )
+    os.utime(registry, ns=(time.time_ns(), time.time_ns() + 10**9))
+    catalog._last_check -= RELOAD_INTERVAL
+    assert catalog.names() == ["first", "second"]
+    assert catalog.resolve("second") == bundles[1]
+
+
+@pytest.mark.parametrize("engine", ["threaded", "async"])
+def test_serve_catalog(bundles: list[Path], engine: str) -> None:
+    catalog = BundleCatalog()
+    catalog.add(bundles[0], name="first")
+    url = serve_catalog(
+        catalog, port=8700, threaded=True, engine=engine, metrics_log_interval=0
+    )
+
+    listing = _get_json(f"{url}/catalog.json")
+    assert [bundle["name"] for bundle in listing["bundles"]] == ["first"]
+    assert listing["bundles"][0]["url"] == "first/"
+    assert listing["bundles"][0]["num_tracks"] == 4
+
+    meta = _get_json(f"{url}/first/points/.zarray")
+    assert meta["shape"][0] == 2
+    lineage = _get_json(f"{url}/first/query/lineage?points=0")
+    assert lineage["point_track_ids"] == [[0]]
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{url}/second/points/.zarray")
+    assert error.value.code == 404
+
+    # bundles are added without restarting the server
+    catalog.add(bundles[1], name="second")
+    assert _get_json(f"{url}/second/points/.zarray") == meta
+    assert len(_get_json(f"{url}/catalog.json")["bundles"]) == 2
+
+
+def test_serve_bundle_shares_server(bundles: list[Path]) -> None:
+    first = serve_bundle(bundles[0])
+    second = serve_bundle(bundles[1])
+    assert first.rsplit("/", 2)[0] == second.rsplit("/", 2)[0]
+    assert first != second
+    assert _get_json(f"{second}points/.zarray")["shape"][0] == 2
+
+
+def test_catalog_cli(bundles: list[Path], tmp_path: Path) -> None:
+    registry = tmp_path / "registry.json"
+    runner = CliRunner()
+
+    result = runner.invoke(catalog_cli, ["add", str(registry), str(bundles[0])])
+    assert result.exit_code == 0, result.output
+    assert result.output.strip() == "sample.zarr"
+    result = runner.invoke(
+        catalog_cli, ["add", str(registry), str(bundles[1]), "--name", "other"]
+    )
+    assert result.exit_code == 0, result.output
+    assert BundleCatalog(registry).names() == ["other", "sample.zarr"]
+
+    result = runner.invoke(catalog_cli, ["remove", str(registry), "other"])
+    assert result.exit_code == 0, result.output
+    result = runner.invoke(catalog_cli, ["remove", str(registry), "other"])
+    assert result.exit_code != 0
+    assert BundleCatalog(registry).names() == ["sample.zarr"]
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 from pathlib import Path
 from typing import List
 from unittest.mock import patch
@@ -604,3 +606,36 @@ def test_zarr_to_browser_no_browser_flag(tmp_path: Path) -> None:
         # Data server + frontend server (when bundled frontend is available) = 2 calls,
         # or just 1 call when falling back to the external URL.
         assert mock_serve_directory.call_count in (1, 2)
+
+
+HEAVY_MODULES = ["pandas", "numpy", "scipy", "zarr", "skimage", "geff", "pyarrow"]
+IMPORT_TIME_BUDGET = 2.0  # seconds
+
+
+@pytest.mark.parametrize("args", [["--help"], ["serve", "--help"]])
+def test_cli_lazy_imports(args: List[str]) -> None:
+    """`intracktive --help` and `intracktive serve` must not import the heavy dependencies."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "from intracktive.main import main\n"
+        f"main({args!r}, standalone_mode=False)\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(f'RESULT {elapsed} {loaded}')\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    _, elapsed, loaded = result.stdout.splitlines()[-1].split(" ", 2)
+
+    assert loaded == "[]", f"heavy modules imported: {loaded}"
+    assert float(elapsed) < IMPORT_TIME_BUDGET
+
+
+def test_cli_help_lists_all_commands() -> None:
+    runner = CliRunner()
+    result = runner.invoke(main, ["--help"])
+    assert result.exit_code == 0
+    for command in ["convert", "convert-batch", "open", "serve"]:
+        assert command in result.output
@@ -1,3 +1,8 @@
+import gzip
+import json
+import tempfile
+import time
+import urllib.request
 import webbrowser
 from pathlib import Path
 from unittest.mock import patch
@@ -6,11 +11,25 @@ import numpy as np
 import pandas as pd
 import pytest
 import zarr
+from intracktive import convert, zipbundle
+from intracktive.catalog import serve_bundle
 from intracktive.convert import (
+    INF_SPACE,
+    RAGGED_CHUNK_ROWS,
+    ProgressiveBundleWriter,
+    build_bundle,
     convert_dataframe_to_zarr,
     convert_file,
     dataframe_to_browser,
+    tracks_layer_to_bundle,
+    tracks_layer_to_dataframe,
 )
+from intracktive.quantize import (
+    QUANTIZED_PADDING,
+    decode_coordinates,
+    dequantize_values,
+)
+from intracktive.server import is_pending, wait_for_file
 
 
 def _evaluate(new_group: zarr.Group, old_group: zarr.Group) -> None:
@@ -188,6 +207,247 @@ def test_dataframe_to_browser_with_attributes(
             pytest.fail(f"Button click failed with error: {e}")
 
 
+def test_dataframe_to_browser_in_memory(
+    make_sample_data: pd.DataFrame,
+) -> None:
+    df = make_sample_data
+
+    with (
+        patch.object(webbrowser, "open", return_value=True) as mock_browser,
+        patch(
+            "intracktive.convert.build_bundle", wraps=convert.build_bundle
+        ) as mock_build,
+    ):
+        dataframe_to_browser(df, extra_cols=["x"])
+        # the same DataFrame is not converted again
+        dataframe_to_browser(df.copy(), extra_cols=["x"])
+        assert mock_build.call_count == 1
+        assert mock_browser.call_count == 2
+
+        df.loc[0, "x"] += 1.0
+        dataframe_to_browser(df, extra_cols=["x"])
+        assert mock_build.call_count == 2
+
+    bundle = convert._dataframe_bundles[next(reversed(convert._dataframe_bundles))]
+    # the bundle is served from memory, nothing is written
+    assert not Path(bundle.path).exists()
+    # it is mounted in a private directory, which is served without a bundled frontend
+    assert Path(bundle.path).parent != Path(tempfile.gettempdir())
+    assert list(Path(bundle.path).parent.iterdir()) == []
+    assert zipbundle.isdir(f"{bundle.path}/tracks_to_tracks")
+    with urllib.request.urlopen(
+        f"{serve_bundle(Path(bundle.path))}points/.zattrs"
+    ) as response:
+        assert json.loads(response.read())["values_per_point"] == 3
+
+
+def test_conversion_progress(tmp_path: Path, make_sample_data: pd.DataFrame):
+    stages = []
+    convert_dataframe_to_zarr(
+        make_sample_data, tmp_path / "progress.zarr", progress=stages.append
+    )
+    assert tuple(stages) == convert.CONVERSION_STAGES
+
+    def cancel(stage: str) -> None:
+        if stage == "lineage":
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        build_bundle(make_sample_data, progress=cancel)
+
+
+def test_tracks_layer_to_dataframe(make_sample_data: pd.DataFrame) -> None:
+    df = make_sample_data
+    data = df[["track_id", "t", "y", "x"]].to_numpy(dtype=float)
+    graph = {2: [1], 3: 1}
+    tracks_df = tracks_layer_to_dataframe(
+        data, properties={"track_id": data[:, 0], "area": df["x"] * 2}, graph=graph
+    )
+    assert tracks_df.columns.tolist() == [
+        "track_id",
+        "t",
+        "y",
+        "x",
+        "parent_track_id",
+        "area",
+    ]
+    assert tracks_df["parent_track_id"].tolist() == df["parent_track_id"].tolist()
+
+    with pytest.raises(ValueError):
+        tracks_layer_to_dataframe(data[:, :3])
+
+
+def test_tracks_layer_to_bundle(tmp_path: Path, make_sample_data: pd.DataFrame) -> None:
+    df = make_sample_data
+    data = df[["track_id", "t", "z", "y", "x"]].to_numpy(dtype=float)
+    original = data.copy()
+    properties = {"area": np.arange(len(df), dtype=float)}
+    graph = {2: [1], 3: [1]}
+
+    with patch(
+        "intracktive.convert.build_bundle", wraps=convert.build_bundle
+    ) as mock_build:
+        zarr_path = tracks_layer_to_bundle(data, properties, graph, tmp_path)
+        # the same layer is not converted again
+        assert tracks_layer_to_bundle(data, properties, graph, tmp_path) == zarr_path
+        assert mock_build.call_count == 1
+        # a new data array is
+        tracks_layer_to_bundle(data.copy(), properties, graph, tmp_path)
+        assert mock_build.call_count == 2
+
+    # the layer data is not modified by the conversion
+    np.testing.assert_array_equal(data, original)
+    root = zarr.open_group(zarr_path, mode="r")
+    assert root["attributes"].attrs["attribute_names"] == ["area"]
+    df["area"] = properties["area"]
+    _evaluate(
+        root,
+        zarr.open_group(
+            convert_dataframe_to_zarr(
+                df, tmp_path / "expected.zarr", extra_cols=["area"]
+            ),
+            mode="r",
+        ),
+    )
+
+
+def test_convert_ragged(tmp_path: Path, make_sample_data: pd.DataFrame) -> None:
+    make_sample_data["area"] = [1.0, 2.0, 3.0, 4.0, 5.0]
+    padded = zarr.open_group(
+        convert_dataframe_to_zarr(
+            make_sample_data.copy(), tmp_path / "padded.zarr", extra_cols=["area"]
+        ),
+        mode="r",
+    )
+    ragged = zarr.open_group(
+        convert_dataframe_to_zarr(
+            make_sample_data, tmp_path / "ragged.zarr", extra_cols=["area"], ragged=True
+        ),
+        mode="r",
+    )
+
+    assert ragged.attrs["bundle_version"] == 2
+    assert "bundle_version" not in padded.attrs
+    assert ragged["points"].attrs["layout"] == "ragged"
+    assert ragged["points"].attrs["max_points_per_time_point"] == 3
+    offsets = ragged["time_offsets"][:]
+    assert offsets.tolist() == [0, 2, 5]
+    assert ragged["points"].shape == (5, 3)
+    assert ragged["attributes"].shape == (5, 1)
+
+    # the same points and attributes, without the padding
+    for t in range(2):
+        n = offsets[t + 1] - offsets[t]
+        np.testing.assert_array_equal(
+            ragged["points"][offsets[t] : offsets[t + 1]].ravel(),
+            padded["points"][t, : 3 * n],
+        )
+        np.testing.assert_array_equal(
+            ragged["attributes"][offsets[t] : offsets[t + 1], 0],
+            padded["attributes"][t, :n],
+        )
+    # the tracks have the same points (with their ragged ids), and the same lineage
+    np.testing.assert_array_equal(
+        ragged["tracks_to_points/data"][:], padded["tracks_to_points/data"][:]
+    )
+    assert ragged["tracks_to_points/indices"][:].tolist() == [0, 2, 3, 1, 4]
+    assert ragged["points_to_tracks/indptr"].shape == (6,)
+    for name in ("indices", "indptr", "data"):
+        np.testing.assert_array_equal(
+            ragged[f"tracks_to_tracks/{name}"][:], padded[f"tracks_to_tracks/{name}"][:]
+        )
+
+
+@pytest.mark.parametrize("ragged", [False, True])
+def test_convert_attributes_chunked_per_attribute(
+    tmp_path: Path, make_sample_data: pd.DataFrame, ragged: bool
+) -> None:
+    make_sample_data["area"] = [1.0, 2.0, 3.0, 4.0, 5.0]
+    make_sample_data["speed"] = [5.0, 4.0, 3.0, 2.0, 1.0]
+    attributes = zarr.open_group(
+        convert_dataframe_to_zarr(
+            make_sample_data,
+            tmp_path / "sample.zarr",
+            extra_cols=["area", "speed"],
+            ragged=ragged,
+        ),
+        mode="r",
+    )["attributes"]
+
+    assert attributes.attrs["attribute_names"] == ["area", "speed"]
+    if ragged:
+        assert attributes.shape == (5, 2)
+        assert attributes.chunks == (RAGGED_CHUNK_ROWS, 1)
+        speed = attributes[:, 1]
+    else:
+        # 3 points per time point for each attribute
+        assert attributes.shape == (2, 6)
+        assert attributes.chunks == (1, 3)
+        speed = attributes[:, 3:].ravel()
+    np.testing.assert_allclose(speed[speed != INF_SPACE], [1.0, 0.25, 0.75, 0.5, 0.0])
+
+
+@pytest.mark.parametrize("ragged", [False, True])
+def test_convert_quantized(
+    tmp_path: Path, make_sample_data: pd.DataFrame, ragged: bool
+) -> None:
+    exact = zarr.open_group(
+        convert_dataframe_to_zarr(
+            make_sample_data.copy(), tmp_path / "exact.zarr", ragged=ragged
+        ),
+        mode="r",
+    )
+    quantized = zarr.open_group(
+        convert_dataframe_to_zarr(
+            make_sample_data,
+            tmp_path / "quantized.zarr",
+            ragged=ragged,
+            quantize=True,
+            delta_encode=True,
+        ),
+        mode="r",
+    )
+
+    quantization = quantized["points"].attrs["quantization"]
+    assert quantized["points"].dtype == np.uint16
+    assert quantization["max_error"] == pytest.approx(quantization["scale"] / 2)
+    points = exact["points"][:]
+    np.testing.assert_allclose(
+        dequantize_values(quantized["points"][:], quantization, INF_SPACE),
+        points,
+        atol=quantization["max_error"] + 1e-4,
+    )
+    if not ragged:
+        assert (quantized["points"][:] == QUANTIZED_PADDING).sum() == (
+            points == INF_SPACE
+        ).sum()
+
+    data = quantized["tracks_to_points/data"]
+    assert data.dtype == np.int16
+    assert data.attrs["quantization"] == {**quantization, "delta": True}
+    np.testing.assert_allclose(
+        decode_coordinates(
+            data[:],
+            data.attrs["quantization"],
+            np.diff(quantized["tracks_to_points/indptr"][:]),
+        ),
+        exact["tracks_to_points/data"][:],
+        atol=quantization["max_error"] + 1e-4,
+    )
+
+
+def test_convert_quantized_delta_fallback(make_sample_data: pd.DataFrame) -> None:
+    # the two points of track 4 are the whole range of the coordinates apart
+    make_sample_data.loc[4, "x"] = 1e6
+    bundle = build_bundle(make_sample_data, quantize=True, delta_encode=True)
+    data, _ = bundle.arrays["tracks_to_points/data"]
+    assert data.dtype == np.uint16
+    assert "delta" not in bundle.attrs["tracks_to_points/data"]["quantization"]
+
+    with pytest.raises(ValueError, match="requires quantize"):
+        build_bundle(make_sample_data, delta_encode=True)
+
+
 def test_dataframe_to_browser_with_missing_attributes(
     tmp_path: Path,
     make_sample_data: pd.DataFrame,
@@ -591,3 +851,159 @@ def test_convert_with_invalid_attribute_type(
             extra_cols=["x", "y"],
             attribute_types=["continuous", "invalid"],
         )
+
+
+def test_convert_file_directory_of_parts(
+    tmp_path: Path,
+    make_sample_data: pd.DataFrame,
+) -> None:
+    df = make_sample_data
+    df.to_csv(tmp_path / "sample_data.csv", index=False)
+
+    parts_dir = tmp_path / "parts"
+    parts_dir.mkdir()
+    for t, group in df.groupby("t"):
+        group.to_parquet(parts_dir / f"tracks_t{t:03d}.parquet", index=False)
+
+    parts_path = convert_file(input_file=parts_dir, out_dir=tmp_path, num_workers=2)
+    single_path = convert_file(input_file=tmp_path / "sample_data.csv")
+
+    assert parts_path.name == "parts_bundle.zarr"
+    parts_group = zarr.open(parts_path)
+    single_group = zarr.open(single_path)
+    np.testing.assert_allclose(parts_group["points"][:], single_group["points"][:])
+    assert (
+        parts_group["tracks_to_points/indptr"].shape
+        == single_group["tracks_to_points/indptr"].shape
+    )
+
+
+def test_convert_file_glob_with_reconcile_track_ids(
+    tmp_path: Path,
+    make_sample_data: pd.DataFrame,
+) -> None:
+    df = make_sample_data
+    # two tiles with identical, tile-local track ids
+    df.to_csv(tmp_path / "tile_0.csv", index=False)
+    df.to_csv(tmp_path / "tile_1.csv", index=False)
+
+    zarr_path = convert_file(
+        input_file=tmp_path / "tile_*.csv",
+        reconcile_track_ids=True,
+    )
+
+    group = zarr.open(zarr_path)
+    n_tracks = df["track_id"].nunique()
+    assert group["tracks_to_points/indptr"].shape == (2 * n_tracks + 1,)
+    assert group["tracks_to_points/indices"].shape == (2 * len(df),)
+    # lineages stay within each tile: {1, 2, 3}, {1, 2}, {1, 3}, {4} per tile
+    assert group["tracks_to_tracks/indices"].shape == (2 * 8,)
+
+
+def test_convert_file_glob_without_matches(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="No CSV or Parquet files found"):
+        convert_file(input_file=tmp_path / "missing_*.csv")
+
+
+def test_convert_file_with_glob_characters_in_name(
+    tmp_path: Path, make_sample_data: pd.DataFrame
+) -> None:
+    # an existing file is read as is, even if its name looks like a glob pattern
+    input_file = tmp_path / "tracks[1].csv"
+    make_sample_data.to_csv(input_file, index=False)
+
+    zarr_path = convert_file(input_file, out_dir=tmp_path)
+
+    assert zarr_path.name == "tracks[1]_bundle.zarr"
+    group = zarr.open(zarr_path)
+    assert group["tracks_to_points/indices"].shape == (len(make_sample_data),)
+
+
+def test_convert_file_precompress(tmp_path: Path, make_sample_data: pd.DataFrame):
+    df = make_sample_data
+    input_file = tmp_path / "sample_data.csv"
+    df.to_csv(input_file, index=False)
+
+    zarr_path = convert_file(input_file, out_dir=tmp_path, precompress=True)
+
+    sidecar = zarr_path / "points" / ".zarray.gz"
+    assert sidecar.exists()
+    assert (
+        gzip.decompress(sidecar.read_bytes())
+        == (zarr_path / "points" / ".zarray").read_bytes()
+    )
+    # chunks compressed by zarr are not compressed again
+    assert not (zarr_path / "points" / "0.0.gz").exists()
+
+
+def test_progressive_bundle_writer(tmp_path: Path, make_sample_data: pd.DataFrame):
+    zarr_path = convert_dataframe_to_zarr(
+        make_sample_data.copy(), tmp_path / "converted.zarr"
+    )
+
+    writer = ProgressiveBundleWriter(tmp_path / "progressive.zarr", block_rows=1)
+    written = []
+    write = writer.bundle.on_add
+    writer.bundle.on_add = lambda path: (written.append(path), write(path))
+    assert is_pending(str(writer.zarr_path / "points" / ".zarray"))
+    try:
+        build_bundle(make_sample_data, bundle=writer.bundle)
+    finally:
+        writer.close()
+    assert not is_pending(str(writer.zarr_path / "points" / ".zarray"))
+
+    # the points are written first, the lineage last
+    assert written.index("points") < written.index("tracks_to_points/indices")
+    assert written[-1] == "tracks_to_tracks/data"
+    # the bundle is the same as a converted one
+    files = sorted(p.relative_to(zarr_path) for p in zarr_path.rglob("*"))
+    assert files == sorted(
+        p.relative_to(writer.zarr_path) for p in writer.zarr_path.rglob("*")
+    )
+    for name in files:
+        if (zarr_path / name).is_file():
+            assert (zarr_path / name).read_bytes() == (
+                writer.zarr_path / name
+            ).read_bytes(), name
+
+
+@pytest.mark.parametrize("with_attributes", [False, True])
+def test_progressive_bundle_writer_before_lineage(
+    tmp_path: Path, make_sample_data: pd.DataFrame, with_attributes: bool
+) -> None:
+    writer = ProgressiveBundleWriter(tmp_path / "progressive.zarr")
+    path = writer.zarr_path
+    opened = {}
+
+    def progress(stage: str) -> None:
+        writer.progress(stage)
+        if stage != "lineage":
+            return
+        # everything the viewer opens when it loads the bundle is written before the
+        # lineage, which it only opens once a track is selected
+        for name in [
+            "points",
+            "points_to_tracks/indptr",
+            "points_to_tracks/indices",
+            "tracks_to_points/indptr",
+            "tracks_to_points/indices",
+            "tracks_to_points/data",
+        ]:
+            assert (path / name / ".zarray").is_file(), name
+        assert not (path / "tracks_to_tracks" / "indptr" / ".zarray").exists()
+        start = time.monotonic()
+        opened["attributes"] = wait_for_file(
+            str(path / "attributes" / ".zarray"), timeout=10
+        )
+        assert time.monotonic() - start < 5
+
+    try:
+        build_bundle(
+            make_sample_data,
+            extra_cols=["z"] if with_attributes else [],
+            bundle=writer.bundle,
+            progress=progress,
+        )
+    finally:
+        writer.close()
+    assert opened["attributes"] == with_attributes
@@ -0,0 +1,88 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+from intracktive.convert import convert_dataframe_to_zarr
+from intracktive.loadtest import _chunk_range, loadtest_cli, run_loadtest
+from intracktive.server import serve_directory
+
+
+@pytest.mark.parametrize(
+    "start,stop,chunk_size,expected",
+    [
+        (0, 10, 4, [0, 1, 2]),
+        (4, 8, 4, [1]),
+        (3, 5, 4, [0, 1]),
+        (5, 5, 4, []),
+    ],
+)
+def test_chunk_range(start: int, stop: int, chunk_size: int, expected: list) -> None:
+    assert list(_chunk_range(start, stop, chunk_size)) == expected
+
+
+def test_run_loadtest(tmp_path: Path, make_sample_data: pd.DataFrame) -> None:
+    convert_dataframe_to_zarr(make_sample_data, tmp_path / "sample.zarr")
+    url = serve_directory(tmp_path, port=8600, threaded=True, metrics_log_interval=0)
+
+    report = run_loadtest(f"{url}/sample.zarr", n_viewers=3, duration=1.0)
+
+    assert report["viewers"] == 3
+    assert report["requests"] > 0
+    assert report["errors"] == 0
+    assert report["requests_per_second"] > 0
+    assert report["actions"]["playback"] > 0
+    assert report["actions"]["lineage"] > 0
+    assert report["latency"]["p50"] <= report["latency"]["p99"]
+    # the lineage selections go through all the sparse arrays
+    assert "points" in report["groups"]
+    assert "tracks_to_tracks/indices" in report["groups"]
+    assert "tracks_to_points/data" in report["groups"]
+
+
+def test_run_loadtest_ragged(tmp_path: Path, make_sample_data: pd.DataFrame) -> None:
+    make_sample_data["area"] = [1.0, 2.0, 3.0, 4.0, 5.0]
+    convert_dataframe_to_zarr(
+        make_sample_data, tmp_path / "sample.zarr", extra_cols=["area"], ragged=True
+    )
+    url = serve_directory(tmp_path, port=9100, threaded=True, metrics_log_interval=0)
+
+    report = run_loadtest(f"{url}/sample.zarr", n_viewers=2, duration=1.0)
+
+    assert report["requests"] > 0
+    assert report["errors"] == 0
+    assert report["actions"]["lineage"] > 0
+    assert "time_offsets" in report["groups"]
+    assert "tracks_to_points/data" in report["groups"]
+
+
+def test_loadtest_cli_local_bundle(
+    tmp_path: Path, make_sample_data: pd.DataFrame
+) -> None:
+    convert_dataframe_to_zarr(make_sample_data, tmp_path / "sample.zarr")
+    report_path = tmp_path / "report.json"
+
+    result = CliRunner().invoke(
+        loadtest_cli,
+        [
+            str(tmp_path / "sample.zarr"),
+            "--viewers",
+            "2",
+            "--duration",
+            "0.5",
+            "--report",
+            str(report_path),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    report = json.loads(report_path.read_text())
+    assert report["viewers"] == 2
+    assert report["requests"] > 0
+
+
+def test_loadtest_cli_invalid_bundle(tmp_path: Path) -> None:
+    result = CliRunner().invoke(loadtest_cli, [str(tmp_path / "missing.zarr")])
+    assert result.exit_code != 0
+    assert "neither a URL nor a bundle directory" in result.output
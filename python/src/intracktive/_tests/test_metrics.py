@@ -0,0 +1,44 @@
+import pytest
+from intracktive.metrics import ServerMetrics, request_group
+from intracktive.server import ChunkCache
+
+
+@pytest.mark.parametrize(
+    "url_path,expected",
+    [
+        ("/bundle.zarr/points/12.0", "points"),
+        ("/data/bundle.zarr/attributes/3.1", "attributes"),
+        ("/bundle.zarr/tracks_to_points/indptr/0", "tracks_to_points/indptr"),
+        ("/bundle.zarr/points_to_tracks/indices/.zarray", "points_to_tracks/indices"),
+        ("/bundle.zarr/query/lineage?points=1,2", "query/lineage"),
+        ("/bundle.zarr/.zattrs", "metadata"),
+        ("/index.html", "other"),
+    ],
+)
+def test_request_group(url_path: str, expected: str) -> None:
+    assert request_group(url_path) == expected
+
+
+def test_server_metrics_render() -> None:
+    metrics = ServerMetrics(ChunkCache(1024))
+    metrics.connection_opened()
+    for i in range(100):
+        metrics.observe("/bundle.zarr/points/0.0", 200, 10, (i + 1) / 1000)
+    metrics.observe("/bundle.zarr/points/1.0", 404, 0, 0.5)
+
+    summary = metrics.summary()["points"]
+    assert summary["requests"] == 101
+    assert summary["bytes"] == 1000
+    assert summary["p50"] == pytest.approx(0.051)
+    assert summary["p99"] == pytest.approx(0.1)
+
+    text = metrics.render()
+    assert 'intracktive_requests_total{group="points",status="200"} 100' in text
+    assert 'intracktive_requests_total{group="points",status="404"} 1' in text
+    assert 'intracktive_response_bytes_total{group="points"} 1000' in text
+    assert 'intracktive_request_duration_seconds_count{group="points"} 101' in text
+    assert (
+        'intracktive_request_duration_seconds{group="points",quantile="0.95"}' in text
+    )
+    assert "intracktive_connections_in_flight 1" in text
+    assert "intracktive_cache_hits_total 0" in text
@@ -0,0 +1,612 @@
+import gzip
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import zarr
+from intracktive.client import fetch_array_chunks, fetch_chunks
+from intracktive.convert import convert_dataframe_to_zarr
+from intracktive.server import (
+    KEEP_ALIVE_TIMEOUT,
+    ChunkCache,
+    PooledHTTPServer,
+    begin_pending_bundle,
+    complete_pending_directory,
+    decode_chunk_frames,
+    encode_chunk_frames,
+    end_pending_bundle,
+    notify_pending_bundles,
+    parse_accept_encoding,
+    parse_range_header,
+    serve_directory,
+    wait_for_file,
+)
+
+CONTENT = bytes(range(256)) * 4  # 1024 bytes
+# metadata of an uncompressed array, whose chunks are compressed on the fly
+ZARRAY = json.dumps(
+    {
+        "chunks": [1, 1024],
+        "compressor": None,
+        "dimension_separator": ".",
+        "dtype": "|u1",
+        "fill_value": 0,
+        "filters": None,
+        "order": "C",
+        "shape": [1, 1024],
+        "zarr_format": 2,
+    },
+    indent=8,
+)
+
+
+@pytest.fixture(params=["threaded", "async"])
+def served_dir(tmp_path: Path, request: pytest.FixtureRequest) -> str:
+    (tmp_path / "bundle.zarr").mkdir()
+    (tmp_path / "bundle.zarr" / "0.0").write_bytes(CONTENT)
+    (tmp_path / "bundle.zarr" / ".zarray").write_text(ZARRAY)
+    return serve_directory(tmp_path, port=8100, threaded=True, engine=request.param)
+
+
+@pytest.fixture(params=["threaded", "async"])
+def served_bundle(
+    tmp_path: Path, make_sample_data: pd.DataFrame, request: pytest.FixtureRequest
+) -> str:
+    convert_dataframe_to_zarr(make_sample_data, tmp_path / "sample.zarr")
+    url = serve_directory(tmp_path, port=8500, threaded=True, engine=request.param)
+    return f"{url}/sample.zarr"
+
+
+def _get(url: str, headers: dict | None = None):
+    request = urllib.request.Request(url, headers=headers or {})
+    with urllib.request.urlopen(request) as response:
+        return response.status, response.headers, response.read()
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("bytes=0-99", [(0, 99)]),
+        ("bytes=1000-", [(1000, 1023)]),
+        ("bytes=-24", [(1000, 1023)]),
+        ("bytes=1000-5000", [(1000, 1023)]),
+        ("bytes=0-0,10-19", [(0, 0), (10, 19)]),
+        ("bytes=2000-", []),
+        ("bytes=5-2", None),
+        ("items=0-10", None),
+        ("bytes=abc", None),
+    ],
+)
+def test_parse_range_header(value: str, expected: list | None) -> None:
+    assert parse_range_header(value, 1024) == expected
+
+
+@pytest.mark.parametrize("value", ["bytes=-10", "bytes=0-", "bytes=0-0"])
+def test_parse_range_header_empty_file(value: str) -> None:
+    assert parse_range_header(value, 0) == []
+
+
+def test_server_full_file(served_dir: str) -> None:
+    status, headers, body = _get(f"{served_dir}/bundle.zarr/0.0")
+    assert status == 200
+    assert body == CONTENT
+    assert headers["Accept-Ranges"] == "bytes"
+    assert headers["Access-Control-Allow-Origin"] == "*"
+
+
+def test_server_single_range(served_dir: str) -> None:
+    status, headers, body = _get(
+        f"{served_dir}/bundle.zarr/0.0", {"Range": "bytes=10-19"}
+    )
+    assert status == 206
+    assert headers["Content-Range"] == "bytes 10-19/1024"
+    assert body == CONTENT[10:20]
+
+
+def test_server_multi_range(served_dir: str) -> None:
+    status, headers, body = _get(
+        f"{served_dir}/bundle.zarr/0.0", {"Range": "bytes=0-3,-4"}
+    )
+    assert status == 206
+    assert headers["Content-Type"].startswith("multipart/byteranges")
+    assert int(headers["Content-Length"]) == len(body)
+    assert b"Content-Range: bytes 0-3/1024" in body
+    assert b"Content-Range: bytes 1020-1023/1024" in body
+    assert CONTENT[:4] in body and CONTENT[-4:] in body
+
+
+def test_server_range_not_satisfiable(served_dir: str) -> None:
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _get(f"{served_dir}/bundle.zarr/0.0", {"Range": "bytes=4096-"})
+    assert e.value.code == 416
+    assert e.value.headers["Content-Range"] == "bytes */1024"
+
+
+def test_server_range_of_empty_file(served_dir: str, tmp_path: Path) -> None:
+    (tmp_path / "bundle.zarr" / "0.1").write_bytes(b"")
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _get(f"{served_dir}/bundle.zarr/0.1", {"Range": "bytes=-10"})
+    assert e.value.code == 416
+    assert e.value.headers["Content-Range"] == "bytes */0"
+
+
+def test_server_if_range_mismatch(served_dir: str) -> None:
+    status, _, body = _get(
+        f"{served_dir}/bundle.zarr/0.0",
+        {"Range": "bytes=0-9", "If-Range": "Thu, 01 Jan 1970 00:00:00 GMT"},
+    )
+    assert status == 200
+    assert body == CONTENT
+
+
+def _request(url: str, path: str, headers: dict | None = None):
+    url = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(url.hostname, url.port)
+    try:
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.headers, response.read()
+    finally:
+        connection.close()
+
+
+def test_server_caching_headers(served_dir: str) -> None:
+    _, headers, _ = _get(f"{served_dir}/bundle.zarr/0.0")
+    assert headers["ETag"].startswith('"')
+    assert headers["Cache-Control"] == "public, no-cache"
+    assert "Last-Modified" in headers
+
+    _, metadata_headers, body = _get(f"{served_dir}/bundle.zarr/.zarray")
+    assert body == ZARRAY.encode()
+    assert metadata_headers["Cache-Control"] == "public, no-cache"
+    assert metadata_headers["ETag"] != headers["ETag"]
+
+
+def test_server_bundle_overwritten(
+    served_bundle: str, tmp_path: Path, make_sample_data: pd.DataFrame
+) -> None:
+    url = f"{served_bundle}/points/0.0"
+    _, headers, body = _get(url)
+    assert headers["Cache-Control"] == "public, no-cache"
+
+    # the same URL now has other contents: the revalidation of the cached chunk fails
+    make_sample_data["x"] += 100.0
+    convert_dataframe_to_zarr(
+        make_sample_data, tmp_path / "sample.zarr", overwrite_zarr=True
+    )
+    status, new_headers, new_body = _get(url, {"If-None-Match": headers["ETag"]})
+    assert status == 200
+    assert new_headers["ETag"] != headers["ETag"]
+    assert new_body == (tmp_path / "sample.zarr" / "points" / "0.0").read_bytes()
+    assert new_body != body
+
+
+def test_server_not_modified(served_dir: str) -> None:
+    _, headers, _ = _get(f"{served_dir}/bundle.zarr/0.0")
+    etag, last_modified = headers["ETag"], headers["Last-Modified"]
+
+    status, not_modified_headers, body = _request(
+        served_dir, "/bundle.zarr/0.0", {"If-None-Match": f'"other", {etag}'}
+    )
+    assert status == 304
+    assert body == b""
+    assert not_modified_headers["ETag"] == etag
+    assert not_modified_headers["Cache-Control"] == headers["Cache-Control"]
+
+    status, _, _ = _request(
+        served_dir, "/bundle.zarr/0.0", {"If-Modified-Since": last_modified}
+    )
+    assert status == 304
+
+    # a non-matching If-None-Match takes precedence over If-Modified-Since
+    status, _, body = _request(
+        served_dir,
+        "/bundle.zarr/0.0",
+        {"If-None-Match": '"other"', "If-Modified-Since": last_modified},
+    )
+    assert status == 200
+    assert body == CONTENT
+
+
+def test_server_if_range_etag(served_dir: str) -> None:
+    _, headers, _ = _get(f"{served_dir}/bundle.zarr/0.0")
+    status, _, body = _get(
+        f"{served_dir}/bundle.zarr/0.0",
+        {"Range": "bytes=0-9", "If-Range": headers["ETag"]},
+    )
+    assert status == 206
+    assert body == CONTENT[:10]
+
+
+def test_parse_accept_encoding() -> None:
+    assert parse_accept_encoding("gzip, deflate, br;q=0.5, zstd;q=0") == {
+        "gzip": 1.0,
+        "deflate": 1.0,
+        "br": 0.5,
+        "zstd": 0.0,
+    }
+
+
+def test_server_gzip_on_the_fly(served_dir: str) -> None:
+    _, identity_headers, _ = _get(f"{served_dir}/bundle.zarr/0.0")
+    status, headers, body = _request(
+        served_dir, "/bundle.zarr/0.0", {"Accept-Encoding": "gzip, deflate"}
+    )
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["Vary"] == "Accept-Encoding"
+    assert int(headers["Content-Length"]) == len(body) < len(CONTENT)
+    assert gzip.decompress(body) == CONTENT
+    assert headers["ETag"] != identity_headers["ETag"]
+
+    status, _, _ = _request(
+        served_dir,
+        "/bundle.zarr/0.0",
+        {"Accept-Encoding": "gzip", "If-None-Match": headers["ETag"]},
+    )
+    assert status == 304
+
+    # range requests are answered with the identity encoding
+    status, headers, body = _request(
+        served_dir,
+        "/bundle.zarr/0.0",
+        {"Accept-Encoding": "gzip", "Range": "bytes=0-9"},
+    )
+    assert status == 206
+    assert "Content-Encoding" not in headers
+    assert body == CONTENT[:10]
+
+
+def test_server_precompressed_sidecar(served_dir: str, tmp_path: Path) -> None:
+    zarray = tmp_path / "bundle.zarr" / ".zarray"
+    sidecar = tmp_path / "bundle.zarr" / ".zarray.br"
+    sidecar.write_bytes(b"brotli-compressed")
+
+    status, headers, body = _request(
+        served_dir, "/bundle.zarr/.zarray", {"Accept-Encoding": "gzip, br"}
+    )
+    assert status == 200
+    assert headers["Content-Encoding"] == "br"
+    assert body == b"brotli-compressed"
+
+    # sidecars older than the file they compress are ignored
+    mtime = zarray.stat().st_mtime
+    os.utime(sidecar, (mtime - 10, mtime - 10))
+    status, headers, body = _request(
+        served_dir, "/bundle.zarr/.zarray", {"Accept-Encoding": "gzip, br"}
+    )
+    assert headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == ZARRAY.encode()
+
+
+def test_server_keep_alive(served_dir: str) -> None:
+    url = urllib.parse.urlsplit(served_dir)
+    connection = http.client.HTTPConnection(url.hostname, url.port)
+    try:
+        for method in ["GET", "OPTIONS", "GET"]:
+            connection.request(method, "/bundle.zarr/0.0")
+            response = connection.getresponse()
+            body = response.read()
+            assert response.version == 11
+            assert not response.will_close
+        assert body == CONTENT
+
+        # error responses keep the connection open as well
+        connection.request("GET", "/bundle.zarr/missing")
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 404
+        assert not response.will_close
+    finally:
+        connection.close()
+
+
+def test_server_bounded_worker_pool(tmp_path: Path) -> None:
+    (tmp_path / "0.0").write_bytes(CONTENT)
+    url = serve_directory(tmp_path, port=8200, threaded=True, max_workers=2)
+
+    n_threads = threading.active_count()
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        bodies = list(
+            executor.map(
+                lambda _: _get(f"{url}/0.0", {"Connection": "close"})[2], range(64)
+            )
+        )
+
+    assert all(body == CONTENT for body in bodies)
+    # no thread is spawned per request by the server
+    assert threading.active_count() <= n_threads
+
+
+def test_server_idle_connections_yield_workers(tmp_path: Path) -> None:
+    (tmp_path / "0.0").write_bytes(CONTENT)
+    url = urllib.parse.urlsplit(
+        serve_directory(tmp_path, port=9200, threaded=True, max_workers=2)
+    )
+
+    # idle persistent connections on every worker of the pool
+    idle = [http.client.HTTPConnection(url.hostname, url.port) for _ in range(2)]
+    try:
+        for connection in idle:
+            connection.request("GET", "/0.0")
+            connection.getresponse().read()
+
+        start = time.monotonic()
+        status, _, body = _request(f"http://{url.netloc}", "/0.0")
+        assert status == 200 and body == CONTENT
+        # served without waiting for the idle connections to time out
+        assert time.monotonic() - start < KEEP_ALIVE_TIMEOUT / 2
+    finally:
+        for connection in idle:
+            connection.close()
+
+
+def test_server_pipelined_requests(tmp_path: Path) -> None:
+    (tmp_path / "0.0").write_bytes(CONTENT)
+    url = urllib.parse.urlsplit(serve_directory(tmp_path, port=9210, threaded=True))
+
+    with socket.create_connection((url.hostname, url.port), timeout=5) as connection:
+        request = b"GET /0.0 HTTP/1.1\r\nHost: localhost\r\n\r\n"
+        connection.sendall(request * 2)
+        response = connection.makefile("rb")
+        for _ in range(2):
+            assert response.readline().startswith(b"HTTP/1.1 200")
+            headers = http.client.parse_headers(response)
+            assert response.read(int(headers["Content-Length"])) == CONTENT
+
+
+def test_pooled_http_server_close(tmp_path: Path) -> None:
+    server = PooledHTTPServer(("127.0.0.1", 0), None, max_workers=3)
+    server.server_close()
+    for worker in server._workers:
+        worker.join(timeout=1)
+        assert not worker.is_alive()
+
+
+def test_async_server_concurrent_connections(tmp_path: Path) -> None:
+    (tmp_path / "0.0").write_bytes(CONTENT)
+    url = urllib.parse.urlsplit(
+        serve_directory(tmp_path, port=8300, threaded=True, engine="async")
+    )
+
+    # many simultaneous persistent connections are served by a single event loop
+    connections = [
+        http.client.HTTPConnection(url.hostname, url.port) for _ in range(64)
+    ]
+    try:
+        for connection in connections:
+            connection.request("GET", "/0.0")
+        for connection in connections:
+            response = connection.getresponse()
+            assert response.status == 200
+            assert response.read() == CONTENT
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-1", "1_0", "10000000000"])
+def test_async_server_bad_content_length(tmp_path: Path, content_length: str) -> None:
+    (tmp_path / "0.0").write_bytes(CONTENT)
+    url = urllib.parse.urlsplit(
+        serve_directory(tmp_path, port=9220, threaded=True, engine="async")
+    )
+
+    with socket.create_connection((url.hostname, url.port), timeout=5) as connection:
+        connection.sendall(
+            b"GET /0.0 HTTP/1.1\r\nHost: localhost\r\n"
+            + f"Content-Length: {content_length}\r\n\r\n".encode()
+        )
+        response = connection.makefile("rb")
+        assert response.readline().startswith(b"HTTP/1.1 400")
+        headers = http.client.parse_headers(response)
+        assert headers["Connection"] == "close"
+        assert response.read() == b""
+
+    # a small body is drained, the connection stays usable
+    with socket.create_connection((url.hostname, url.port), timeout=5) as connection:
+        request = b"GET /0.0 HTTP/1.1\r\nHost: localhost\r\nContent-Length: 2\r\n\r\nab"
+        connection.sendall(request * 2)
+        response = connection.makefile("rb")
+        for _ in range(2):
+            assert response.readline().startswith(b"HTTP/1.1 200")
+            headers = http.client.parse_headers(response)
+            assert response.read(int(headers["Content-Length"])) == CONTENT
+
+
+def test_serve_directory_unknown_engine(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Unknown server engine"):
+        serve_directory(tmp_path, port=8400, engine="forking")
+
+
+def test_chunk_cache_lru(tmp_path: Path) -> None:
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.0"
+        path.write_bytes(CONTENT)
+        paths.append(str(path))
+
+    cache = ChunkCache(max_bytes=2 * len(CONTENT))
+    for path in paths[:2]:
+        assert cache.get(path, os.stat(path)) == CONTENT
+    assert cache.lookup(paths[0], os.stat(paths[0])) == CONTENT
+
+    # paths[1] is the least recently used entry
+    cache.get(paths[2], os.stat(paths[2]))
+    assert cache.lookup(paths[1], os.stat(paths[1])) is None
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 3,
+        "coalesced": 0,
+        "evictions": 1,
+        "entries": 2,
+        "size": 2 * len(CONTENT),
+        "max_bytes": 2 * len(CONTENT),
+    }
+
+    # files larger than the cache are not cached
+    assert ChunkCache(max_bytes=16).get(paths[0], os.stat(paths[0])) is None
+
+
+def test_chunk_cache_invalidation(tmp_path: Path) -> None:
+    path = tmp_path / "0.0"
+    path.write_bytes(CONTENT)
+    cache = ChunkCache(max_bytes=1024 * 1024)
+    assert cache.get(str(path), os.stat(path)) == CONTENT
+
+    path.write_bytes(CONTENT[:10])
+    assert cache.get(str(path), os.stat(path)) == CONTENT[:10]
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["size"] == 10
+
+
+def test_chunk_cache_coalescing(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "0.0"
+    path.write_bytes(CONTENT)
+    n_reads = 0
+
+    def slow_open(*args, **kwargs):
+        nonlocal n_reads
+        n_reads += 1
+        time.sleep(0.2)
+        return open(*args, **kwargs)
+
+    monkeypatch.setattr("intracktive.server.open", slow_open, raising=False)
+    cache = ChunkCache(max_bytes=1024 * 1024)
+    fs = os.stat(path)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: cache.get(str(path), fs), range(8)))
+
+    assert all(result == CONTENT for result in results)
+    assert n_reads == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] + stats["coalesced"] == 7
+
+
+def test_server_cache_serves_rewritten_file(served_dir: str, tmp_path: Path) -> None:
+    assert _get(f"{served_dir}/bundle.zarr/0.0")[2] == CONTENT
+    (tmp_path / "bundle.zarr" / "0.0").write_bytes(CONTENT[:512])
+    assert _get(f"{served_dir}/bundle.zarr/0.0")[2] == CONTENT[:512]
+
+
+def test_server_query_lineage(served_bundle: str) -> None:
+    status, headers, body = _get(f"{served_bundle}/query/lineage?points=4,0")
+    assert status == 200
+    assert headers["Content-Type"] == "application/json"
+    assert headers["Access-Control-Allow-Origin"] == "*"
+    result = json.loads(body)
+    assert result["point_track_ids"] == [[2], [0]]
+    assert [track["track_id"] for track in result["tracks"]] == [0, 1, 2]
+
+    for query, code in [
+        ("lineage?points=a,b", 400),
+        ("lineage", 400),
+        ("lineage?points=100", 400),
+    ]:
+        with pytest.raises(urllib.error.HTTPError) as e:
+            _get(f"{served_bundle}/query/{query}")
+        assert e.value.code == code
+        assert "error" in json.loads(e.value.read())
+
+    with pytest.raises(urllib.error.HTTPError) as e:
+        _get(f"{served_bundle}/missing.zarr/query/lineage?points=1")
+    assert e.value.code == 404
+
+
+def test_chunk_frames_roundtrip() -> None:
+    chunks = [("points/0.0", b"abc"), ("points/1.0", None), ("points/2.0", b"")]
+    assert decode_chunk_frames(encode_chunk_frames(chunks)) == dict(chunks)
+
+
+def test_server_query_chunks(served_bundle: str, tmp_path: Path) -> None:
+    chunks = fetch_chunks(served_bundle, ["points/0.0", "points/1.0", "points/9.0"])
+    assert chunks["points/0.0"] == (tmp_path / "sample.zarr/points/0.0").read_bytes()
+    assert chunks["points/9.0"] is None
+
+    arrays = fetch_array_chunks(served_bundle, "points", [(0, 0), (1, 0)])
+    points = zarr.open_array(tmp_path / "sample.zarr/points", mode="r")[:]
+    np.testing.assert_array_equal(arrays[(0, 0)], points[:1])
+    np.testing.assert_array_equal(arrays[(1, 0)], points[1:2])
+
+    for keys in ["../secret", "points/../../secret", ""]:
+        with pytest.raises(urllib.error.HTTPError) as e:
+            _get(f"{served_bundle}/query/chunks?keys={keys}")
+        assert e.value.code == 400
+
+
+def test_server_metrics_endpoint(
+    served_bundle: str, request: pytest.FixtureRequest
+) -> None:
+    url = urllib.parse.urlsplit(served_bundle)
+    _get(f"{served_bundle}/points/0.0")
+    _get(f"{served_bundle}/points/0.0")
+    status, headers, body = _get(f"{url.scheme}://{url.netloc}/metrics")
+    assert status == 200
+    assert headers["Content-Type"].startswith("text/plain")
+    text = body.decode()
+    assert 'intracktive_requests_total{group="points",status="200"} 2' in text
+    assert 'intracktive_request_duration_seconds{group="points",quantile="0.5"}' in text
+    assert "intracktive_connections_in_flight" in text
+    # the async engine sends files with sendfile rather than from the chunk cache
+    hits = 0 if request.node.callspec.params["served_bundle"] == "async" else 1
+    assert f"intracktive_cache_hits_total {hits}" in text
+
+
+def test_wait_for_file(tmp_path: Path) -> None:
+    bundle_path = tmp_path / "pending.zarr"
+    (bundle_path / "points").mkdir(parents=True)
+    chunk = bundle_path / "points" / "0.0"
+    # not a bundle being written
+    assert not wait_for_file(str(chunk))
+
+    begin_pending_bundle(str(bundle_path))
+    try:
+        assert not wait_for_file(str(chunk), timeout=0.05)
+        threading.Timer(0.1, chunk.write_bytes, [b"chunk"]).start()
+        threading.Timer(0.2, notify_pending_bundles).start()
+        assert wait_for_file(str(chunk), timeout=10)
+
+        complete_pending_directory(str(bundle_path), "points")
+        start = time.monotonic()
+        assert not wait_for_file(str(bundle_path / "points" / "1.0"), timeout=10)
+        assert time.monotonic() - start < 1
+    finally:
+        end_pending_bundle(str(bundle_path))
+
+
+@pytest.mark.parametrize("engine", ["threaded", "async"])
+def test_server_holds_pending_files(tmp_path: Path, engine: str) -> None:
+    bundle_path = tmp_path / "pending.zarr"
+    bundle_path.mkdir()
+    begin_pending_bundle(str(bundle_path))
+    try:
+        url = serve_directory(tmp_path, port=9000, threaded=True, engine=engine)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            response = executor.submit(_get, f"{url}/pending.zarr/points/.zarray")
+            time.sleep(0.2)
+            assert not response.done()
+
+            (bundle_path / "points").mkdir()
+            (bundle_path / "points" / ".zarray").write_text(ZARRAY)
+            complete_pending_directory(str(bundle_path), "points")
+            status, _, body = response.result(timeout=10)
+        assert status == 200
+        assert body == ZARRAY.encode()
+    finally:
+        end_pending_bundle(str(bundle_path))
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _get(f"{url}/pending.zarr/points/0.0")
+    assert error.value.code == 404
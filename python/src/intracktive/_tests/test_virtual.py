@@ -0,0 +1,94 @@
+import json
+import urllib.request
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+import zarr
+from intracktive import zipbundle
+from intracktive.client import fetch_array_chunks
+from intracktive.convert import build_bundle, convert_file
+from intracktive.open import open_file
+from intracktive.server import serve_directory
+from intracktive.virtual import VirtualBundle, open_virtual_bundle
+
+
+@pytest.fixture
+def sample_csv(tmp_path: Path, make_sample_data: pd.DataFrame) -> Path:
+    make_sample_data["area"] = [1.0, 2.0, 3.0, 4.0, 5.0]
+    input_file = tmp_path / "sample_data.csv"
+    make_sample_data.to_csv(input_file, index=False)
+    return input_file
+
+
+@pytest.fixture
+def virtual_bundle(sample_csv: Path) -> VirtualBundle:
+    bundle = open_virtual_bundle(sample_csv, add_attribute="area")
+    yield bundle
+    zipbundle.unmount(bundle.path)
+
+
+def test_virtual_bundle_matches_conversion(
+    virtual_bundle: VirtualBundle, sample_csv: Path, tmp_path: Path
+) -> None:
+    zarr_path = convert_file(sample_csv, out_dir=tmp_path, add_attribute="area")
+
+    assert virtual_bundle.path == str(tmp_path.resolve() / "sample_data_virtual.zarr")
+    assert not Path(virtual_bundle.path).exists()
+    # the metadata and the chunks are the same as the ones written by zarr
+    files = [p for p in zarr_path.rglob("*") if p.is_file()]
+    assert any(p.name == "0.0" for p in files)
+    for path in files:
+        member = f"{virtual_bundle.path}/{path.relative_to(zarr_path).as_posix()}"
+        assert zipbundle.isfile(member)
+        assert zipbundle.read_bytes(member) == path.read_bytes()
+
+    assert zipbundle.isdir(f"{virtual_bundle.path}/tracks_to_points")
+    assert not zipbundle.isfile(f"{virtual_bundle.path}/points/2.0")
+    assert not zipbundle.isfile(f"{virtual_bundle.path}/points/0.1")
+    assert not zipbundle.isfile(f"{virtual_bundle.path}/points/x")
+
+
+def test_virtual_bundle_edge_chunks(make_sample_data: pd.DataFrame) -> None:
+    bundle = VirtualBundle(build_bundle(make_sample_data), "unused.zarr")
+    group = zarr.open_group(zarr.storage.MemoryStore(), mode="w", zarr_format=2)
+    data = bundle._arrays["tracks_to_points/data"]
+    array = group.create_array("data", data=data, chunks=(2048, 3))
+    # the last chunk of an array is padded like zarr does
+    assert (
+        bytes(bundle.read("tracks_to_points/data/0.0"))
+        == array.store_path.store._store_dict["data/0.0"].to_bytes()
+    )
+
+
+@pytest.mark.parametrize("engine", ["threaded", "async"])
+def test_serve_virtual_bundle(
+    virtual_bundle: VirtualBundle, sample_csv: Path, engine: str
+) -> None:
+    url = serve_directory(sample_csv.parent, port=8900, threaded=True, engine=engine)
+    bundle_url = f"{url}/{Path(virtual_bundle.path).name}"
+
+    with urllib.request.urlopen(f"{bundle_url}/attributes/.zattrs") as response:
+        assert json.loads(response.read())["attribute_names"] == ["area"]
+
+    chunks = fetch_array_chunks(bundle_url, "points", [(0, 0), (1, 0)])
+    assert chunks[(1, 0)].tolist() == [
+        [20.0, 40.0, 60.0, 60.0, 30.0, 90.0, 41.0, 42.0, 43.0]
+    ]
+
+    with urllib.request.urlopen(f"{bundle_url}/query/lineage?points=0") as response:
+        assert json.loads(response.read())["point_track_ids"] == [[0]]
+
+
+def test_open_virtual(sample_csv: Path, tmp_path: Path) -> None:
+    with patch("intracktive.open.zarr_to_browser") as mock_zarr_to_browser:
+        zarr_path = open_file(sample_csv, no_browser=True, virtual=True)
+        mock_zarr_to_browser.assert_called_once()
+    try:
+        assert zarr_path.name == "sample_data_virtual.zarr"
+        assert zipbundle.isdir(str(zarr_path / "points"))
+        # nothing is written
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["sample_data.csv"]
+    finally:
+        zipbundle.unmount(str(zarr_path))
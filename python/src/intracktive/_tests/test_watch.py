@@ -0,0 +1,124 @@
+import functools
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import click
+import pandas as pd
+import pytest
+import zarr
+from intracktive import convert
+from intracktive.convert import convert_file
+from intracktive.open import open_file
+from intracktive.watch import BundleWatcher, input_signature
+
+
+@pytest.fixture
+def sample_csv(tmp_path: Path, make_sample_data: pd.DataFrame) -> Path:
+    input_file = tmp_path / "sample_data.csv"
+    make_sample_data.to_csv(input_file, index=False)
+    return input_file
+
+
+def _move_points(input_file: Path, offset: float) -> None:
+    df = pd.read_csv(input_file)
+    df["x"] += offset
+    df.to_csv(input_file, index=False)
+
+
+def test_input_signature(sample_csv: Path) -> None:
+    signature = input_signature(sample_csv)
+    assert signature == input_signature(sample_csv)
+    _move_points(sample_csv, 1000.0)
+    assert signature != input_signature(sample_csv)
+    assert input_signature(sample_csv.parent / "missing.csv") == ()
+
+
+def test_reconvert(sample_csv: Path) -> None:
+    zarr_path = convert_file(sample_csv)
+    watcher = BundleWatcher(sample_csv, zarr_path)
+
+    # without a catalog server, the new bundle is next to the served one
+    with (
+        patch("intracktive.watch.shared_bundle_url", return_value=None),
+        patch.object(
+            convert, "_transitive_closure", wraps=convert._transitive_closure
+        ) as closure,
+    ):
+        first = watcher.reconvert()
+        calls = closure.call_count
+        assert calls > 0
+
+        # the tracks did not change: the lineage is reused
+        _move_points(sample_csv, 1.0)
+        second = watcher.reconvert()
+        assert closure.call_count == calls
+
+    assert first.name == "sample_data_bundle_1.zarr"
+    assert second.name == "sample_data_bundle_2.zarr"
+    assert zarr.open_group(second, mode="r").attrs["watched"]
+    assert zarr.open_group(first, mode="r").attrs["superseded_by"] == (
+        "../sample_data_bundle_2.zarr/"
+    )
+    assert zarr.open_group(second, mode="r")["points"][1, 2] == pytest.approx(61.0)
+    # the previous version is kept while the viewer switches, the one before is deleted
+    assert not zarr_path.exists()
+    assert first.exists()
+
+    # a deleted version is never reused, its chunks may be cached by the browser
+    third = watcher.reconvert()
+    assert third.name == "sample_data_bundle_3.zarr"
+
+
+def test_watcher_thread(sample_csv: Path) -> None:
+    zarr_path = convert_file(sample_csv)
+    watcher = BundleWatcher(sample_csv, zarr_path, interval=0.05)
+    watcher.start()
+    try:
+        _move_points(sample_csv, 1.0)
+        deadline = time.monotonic() + 30
+        while len(watcher.versions) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        watcher.stop()
+
+    assert watcher.versions == [
+        zarr_path,
+        zarr_path.with_name("sample_data_bundle_1.zarr"),
+    ]
+    assert "superseded_by" in zarr.open_group(zarr_path, mode="r").attrs
+
+
+def test_open_watch(sample_csv: Path) -> None:
+    with patch("intracktive.open.zarr_to_browser"):
+        zarr_path = open_file(sample_csv, no_browser=True, watch=True)
+    assert zarr.open_group(zarr_path, mode="r").attrs["watched"]
+
+    with pytest.raises(click.UsageError):
+        open_file(zarr_path, no_browser=True, watch=True)
+
+
+def test_open_watch_returns_latest_version(sample_csv: Path) -> None:
+    def serve_while_changing(zarr_path: Path, **kwargs) -> None:
+        # reconverted twice while served: the first bundle is deleted
+        for revision in (1, 2):
+            _move_points(sample_csv, 1.0)
+            version = zarr_path.with_name(f"sample_data_bundle_{revision}.zarr")
+            deadline = time.monotonic() + 30
+            while not version.exists() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.2)
+
+    with (
+        patch("intracktive.open.zarr_to_browser", side_effect=serve_while_changing),
+        patch(
+            "intracktive.open.BundleWatcher",
+            functools.partial(BundleWatcher, interval=0.05),
+        ),
+        patch("intracktive.watch.shared_bundle_url", return_value=None),
+    ):
+        zarr_path = open_file(sample_csv, no_browser=True, watch=True)
+
+    assert zarr_path.name == "sample_data_bundle_2.zarr"
+    assert zarr_path.exists()
+    assert not (sample_csv.parent / "sample_data_bundle.zarr").exists()
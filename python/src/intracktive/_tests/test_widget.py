@@ -11,6 +11,7 @@ from intracktive.widget import IntracktiveWidget
 
 def test_intracktive_widget_2D(
     make_napari_viewer: Callable[[], napari.Viewer],
+    qtbot,
     request,
     make_sample_data: pd.DataFrame,
 ):
@@ -32,6 +33,8 @@ def test_intracktive_widget_2D(
     with patch.object(webbrowser, "open", return_value=True) as mock_browser:
         try:
             widget._run_btn_click()
+            # the conversion runs in a background worker
+            qtbot.waitUntil(lambda: widget._worker is None, timeout=30000)
             mock_browser.assert_called_once()
         except Exception as e:
             pytest.fail(f"Button click failed with error: {e}")
@@ -42,6 +45,7 @@ def test_intracktive_widget_2D(
 
 def test_intracktive_widget_2D_with_provided_zarr_path(
     make_napari_viewer: Callable[[], napari.Viewer],
+    qtbot,
     request,
     make_sample_data: pd.DataFrame,
     tmp_path: Path,
@@ -65,6 +69,8 @@ def test_intracktive_widget_2D_with_provided_zarr_path(
         try:
             widget._file_dialog.value = tmp_path
             widget._run_btn_click()
+            # the conversion runs in a background worker
+            qtbot.waitUntil(lambda: widget._worker is None, timeout=30000)
             mock_browser.assert_called_once()
         except Exception as e:
             pytest.fail(f"Button click failed with error: {e}")
@@ -75,6 +81,7 @@ def test_intracktive_widget_2D_with_provided_zarr_path(
 
 def test_intracktive_widget_2D_without_graph(
     make_napari_viewer: Callable[[], napari.Viewer],
+    qtbot,
     request,
     make_sample_data: pd.DataFrame,
 ):
@@ -94,6 +101,8 @@ def test_intracktive_widget_2D_without_graph(
     with patch.object(webbrowser, "open", return_value=True) as mock_browser:
         try:
             widget._run_btn_click()
+            # the conversion runs in a background worker
+            qtbot.waitUntil(lambda: widget._worker is None, timeout=30000)
             mock_browser.assert_called_once()
         except Exception as e:
             pytest.fail(f"Button click failed with error: {e}")
@@ -104,6 +113,7 @@ def test_intracktive_widget_2D_without_graph(
 
 def test_intracktive_widget_3D(
     make_napari_viewer: Callable[[], napari.Viewer],
+    qtbot,
     request,
     make_sample_data: pd.DataFrame,
 ):
@@ -125,6 +135,8 @@ def test_intracktive_widget_3D(
     with patch.object(webbrowser, "open", return_value=True) as mock_browser:
         try:
             widget._run_btn_click()
+            # the conversion runs in a background worker
+            qtbot.waitUntil(lambda: widget._worker is None, timeout=30000)
             mock_browser.assert_called_once()
         except Exception as e:
             pytest.fail(f"Button click failed with error: {e}")
@@ -153,3 +165,35 @@ def test_intracktive_widget_no_tracks_layer(
 
     if request.config.getoption("--show-napari-viewer"):
         napari.run()
+
+
+def test_intracktive_widget_cancel(
+    make_napari_viewer: Callable[[], napari.Viewer],
+    qtbot,
+    make_sample_data: pd.DataFrame,
+):
+    df = make_sample_data
+
+    viewer = make_napari_viewer()
+    widget = IntracktiveWidget()
+    viewer.window.add_dock_widget(widget)
+    viewer.add_tracks(df[["track_id", "t", "y", "x"]], name="Tracks")
+
+    def convert(data, properties, graph, zarr_dir, progress):
+        # cancelled while the conversion runs, it stops at the start of the next stage
+        widget._cancelled.set()
+        progress("relabeling")
+        pytest.fail("The conversion was not cancelled")
+
+    with (
+        patch.object(webbrowser, "open", return_value=True) as mock_browser,
+        patch("intracktive.widget.tracks_layer_to_bundle", side_effect=convert),
+    ):
+        widget._run_btn_click()
+        assert widget._cancel_btn.visible
+        assert not widget._run_btn.enabled
+        qtbot.waitUntil(lambda: widget._worker is None, timeout=30000)
+        mock_browser.assert_not_called()
+
+    assert not widget._cancel_btn.visible
+    assert widget._run_btn.enabled
@@ -0,0 +1,130 @@
+import gzip
+import json
+import urllib.request
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+import zarr
+from intracktive import zipbundle
+from intracktive.catalog import BundleCatalog
+from intracktive.client import fetch_array_chunks
+from intracktive.convert import convert_dataframe_to_zarr, convert_file
+from intracktive.open import open_file
+from intracktive.server import serve_directory
+
+
+@pytest.fixture
+def zip_bundle(tmp_path: Path, make_sample_data: pd.DataFrame) -> Path:
+    zarr_path = convert_dataframe_to_zarr(make_sample_data, tmp_path / "sample.zarr")
+    return zipbundle.pack_bundle(zarr_path, tmp_path / "sample.zarr.zip")
+
+
+def test_zip_bundle_index(zip_bundle: Path, tmp_path: Path) -> None:
+    bundle = zipbundle.ZipBundle(str(zip_bundle))
+    with zipfile.ZipFile(zip_bundle) as archive:
+        names = archive.namelist()
+        assert all(
+            info.compress_type == zipfile.ZIP_STORED for info in archive.infolist()
+        )
+        for name in names:
+            assert bytes(bundle.read(name)) == archive.read(name)
+    assert set(bundle.members) == set(names)
+    assert {"points", "tracks_to_points", "tracks_to_points/data"} <= bundle.directories
+
+    zarr_path = tmp_path / "sample.zarr"
+    assert bytes(bundle.read("points/0.0")) == (zarr_path / "points/0.0").read_bytes()
+
+
+def test_zip_bundle_paths(zip_bundle: Path, tmp_path: Path) -> None:
+    member = f"{zip_bundle}/points/.zarray"
+    expected = (tmp_path / "sample.zarr" / "points" / ".zarray").read_bytes()
+
+    assert zipbundle.split_zip_path(member) == (str(zip_bundle), "points/.zarray")
+    assert zipbundle.isfile(member)
+    assert zipbundle.isdir(f"{zip_bundle}/points")
+    assert zipbundle.isdir(f"{zip_bundle}/")
+    assert not zipbundle.isfile(f"{zip_bundle}/points/missing")
+    assert zipbundle.stat(member).st_size == len(expected)
+    assert zipbundle.stat(member).st_mtime_ns == zip_bundle.stat().st_mtime_ns
+    assert zipbundle.read_bytes(member) == expected
+    with pytest.raises(FileNotFoundError):
+        zipbundle.stat(str(tmp_path / "missing.zip" / "points"))
+
+    f, fs = zipbundle.open_binary(member)
+    with f:
+        f.seek(2)
+        assert f.read(5) == expected[2:7]
+        assert fs.st_size == len(expected)
+
+
+def test_compressed_zip_is_refused(tmp_path: Path) -> None:
+    path = tmp_path / "deflated.zip"
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("points/.zarray", "{}")
+    with pytest.raises(ValueError, match="not an uncompressed zip file"):
+        zipbundle.ZipBundle(str(path))
+    assert not zipbundle.isfile(f"{path}/points/.zarray")
+
+
+def test_convert_file_zip(tmp_path: Path, make_sample_data: pd.DataFrame) -> None:
+    input_file = tmp_path / "sample_data.csv"
+    make_sample_data.to_csv(input_file, index=False)
+
+    zip_path = convert_file(input_file, out_dir=tmp_path, zip_bundle=True)
+    assert zip_path.name == "sample_data_bundle.zarr.zip"
+    assert not (tmp_path / "sample_data_bundle.zarr").exists()
+    # a second conversion does not overwrite the first one
+    assert convert_file(input_file, out_dir=tmp_path, zip_bundle=True) != zip_path
+
+    group = zarr.open_group(zarr.storage.ZipStore(zip_path, mode="r"), mode="r")
+    assert group["points"].shape == (2, 9)
+
+
+@pytest.mark.parametrize("engine", ["threaded", "async"])
+def test_serve_zip_bundle(zip_bundle: Path, tmp_path: Path, engine: str) -> None:
+    url = serve_directory(tmp_path, port=8800, threaded=True, engine=engine)
+    bundle_url = f"{url}/{zip_bundle.name}"
+    zarr_path = tmp_path / "sample.zarr"
+
+    with urllib.request.urlopen(f"{bundle_url}/points/0.0") as response:
+        assert response.read() == (zarr_path / "points" / "0.0").read_bytes()
+
+    request = urllib.request.Request(
+        f"{bundle_url}/points/.zarray", headers={"Range": "bytes=0-9"}
+    )
+    with urllib.request.urlopen(request) as response:
+        assert response.status == 206
+        assert response.read() == (zarr_path / "points" / ".zarray").read_bytes()[:10]
+
+    request = urllib.request.Request(
+        f"{bundle_url}/points/.zarray", headers={"Accept-Encoding": "gzip"}
+    )
+    with urllib.request.urlopen(request) as response:
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(response.read()))["shape"] == [2, 9]
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{bundle_url}/points/5.0")
+    assert error.value.code == 404
+
+    with urllib.request.urlopen(f"{bundle_url}/query/lineage?points=0") as response:
+        assert json.loads(response.read())["point_track_ids"] == [[0]]
+    chunks = fetch_array_chunks(bundle_url, "points", [(0, 0), (1, 0)])
+    assert chunks[(1, 0)].shape == (1, 9)
+
+
+def test_open_zip_bundle(zip_bundle: Path) -> None:
+    with patch("intracktive.open.zarr_to_browser") as mock_zarr_to_browser:
+        assert open_file(zip_bundle, no_browser=True) == zip_bundle
+        mock_zarr_to_browser.assert_called_once()
+
+
+def test_catalog_zip_bundle(zip_bundle: Path) -> None:
+    catalog = BundleCatalog()
+    assert catalog.add(zip_bundle) == "sample.zarr.zip"
+    summary = catalog.summaries()[0]
+    assert summary["num_times"] == 2
+    assert summary["num_tracks"] == 4
@@ -0,0 +1,567 @@
+import asyncio
+import contextvars
+import email.utils
+import html
+import http.client
+import io
+import logging
+import mimetypes
+import os
+import threading
+import time
+import urllib.parse
+import uuid
+from http import HTTPStatus
+from pathlib import Path
+from typing import BinaryIO
+
+from intracktive import zipbundle
+from intracktive.metrics import METRICS_PATH, PROMETHEUS_CONTENT_TYPE, ServerMetrics
+from intracktive.server import (
+    CATALOG_PATH,
+    CORS_HEADERS,
+    KEEP_ALIVE_TIMEOUT,
+    ChunkCache,
+    caching_headers,
+    compress_file,
+    if_range_matches,
+    is_not_modified,
+    is_pending,
+    negotiate_encoding,
+    parse_query_target,
+    parse_range_header,
+    run_query,
+    translate_path,
+    wait_for_file,
+)
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+MAX_HEADER_SIZE = 64 * 1024
+# requests served here have no body: larger ones are rejected rather than buffered
+MAX_REQUEST_BODY_SIZE = 64 * 1024
+SERVER_VERSION = "intracktive-async"
+# body size of the response being sent on a connection (each connection runs in its own task)
+_response_length: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "response_length", default=0
+)
+
+
+class _BadRequest(Exception):
+    """
+    A request that is answered with 400 (Bad Request), closing the connection.
+    """
+
+
+class _Request:
+    def __init__(self, method: str, target: str, version: str, headers) -> None:
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("Connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+class AsyncDirectoryServer:
+    """
+    Serve a directory over HTTP/1.1 with asyncio, using zero-copy sendfile for file contents.
+
+    A single event loop handles all connections, which makes thousands of concurrent
+    (persistent) connections cheap, while the filesystem is accessed in worker threads.
+    Responses carry the same CORS headers and support the same Range/If-Range/If-Modified-Since
+    semantics as CORSRequestHandler. The chunk cache only holds the responses compressed on
+    the fly: files are sent from the page cache with sendfile instead.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        enable_logging: bool = False,
+        chunk_cache: ChunkCache | None = None,
+        metrics: ServerMetrics | None = None,
+        catalog=None,
+    ) -> None:
+        self.directory = str(directory)
+        self.enable_logging = enable_logging
+        self.chunk_cache = chunk_cache
+        self.metrics = metrics
+        self.catalog = catalog
+
+    def translate_path(self, url_path: str) -> str:
+        if self.catalog is not None:
+            return self.catalog.translate_path(url_path)
+        return translate_path(self.directory, url_path)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        peer = writer.get_extra_info("peername")
+        if self.metrics is not None:
+            self.metrics.connection_opened()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _BadRequest as error:
+                    if self.enable_logging:
+                        LOG.info(
+                            "%s - bad request: %s", peer[0] if peer else "-", error
+                        )
+                    await self._send(writer, HTTPStatus.BAD_REQUEST, [], False)
+                    break
+                if request is None:
+                    break
+                keep_alive = await self._handle_request(request, writer, peer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if self.metrics is not None:
+                self.metrics.connection_closed()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> _Request | None:
+        try:
+            data = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), timeout=KEEP_ALIVE_TIMEOUT
+            )
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None
+        except asyncio.LimitOverrunError:
+            return None
+
+        request_line, _, header_data = data.partition(b"\r\n")
+        words = request_line.decode("latin-1").split()
+        if len(words) != 3:
+            return None
+        method, target, version = words
+        headers = http.client.parse_headers(io.BytesIO(header_data))
+
+        # requests served here have no body, but drain it to keep the connection usable
+        value = (headers.get("Content-Length") or "0").strip()
+        if not value.isascii() or not value.isdigit():
+            raise _BadRequest(f"invalid Content-Length {value!r}")
+        content_length = int(value)
+        if content_length > MAX_REQUEST_BODY_SIZE:
+            raise _BadRequest(f"request body of {content_length} bytes")
+        if content_length > 0:
+            await reader.readexactly(content_length)
+
+        return _Request(method, target, version, headers)
+
+    async def _handle_request(
+        self, request: _Request, writer: asyncio.StreamWriter, peer
+    ) -> bool:
+        start = time.monotonic()
+        _response_length.set(0)
+        keep_alive = request.keep_alive
+        if request.method == "OPTIONS":
+            status = await self._send(writer, HTTPStatus.OK, [], keep_alive)
+        elif (
+            request.method == "GET"
+            and self.metrics is not None
+            and request.target.split("?", 1)[0] == METRICS_PATH
+        ):
+            status = await self._send(
+                writer,
+                HTTPStatus.OK,
+                [
+                    ("Content-Type", PROMETHEUS_CONTENT_TYPE),
+                    ("Cache-Control", "no-store"),
+                ],
+                keep_alive,
+                body=self.metrics.render().encode("utf-8"),
+            )
+        elif (
+            request.method == "GET"
+            and self.catalog is not None
+            and request.target.split("?", 1)[0] == CATALOG_PATH
+        ):
+            body = await asyncio.to_thread(self.catalog.to_json)
+            status = await self._send(
+                writer,
+                HTTPStatus.OK,
+                [("Content-Type", "application/json"), ("Cache-Control", "no-store")],
+                keep_alive,
+                body=body,
+            )
+        elif request.method == "GET" and (query := parse_query_target(request.target)):
+            bundle_url, name, params = query
+            # queries read zarr arrays, run them outside of the event loop
+            status, headers, body = await asyncio.to_thread(
+                run_query, self.translate_path(bundle_url), name, params
+            )
+            status = await self._send(writer, status, headers, keep_alive, body=body)
+        elif request.method in ("GET", "HEAD"):
+            status = await self._send_path(request, writer, keep_alive)
+        else:
+            status = await self._send(
+                writer,
+                HTTPStatus.NOT_IMPLEMENTED,
+                [],
+                keep_alive,
+            )
+
+        if self.metrics is not None:
+            self.metrics.observe(
+                request.target,
+                status,
+                0 if request.method == "HEAD" else _response_length.get(),
+                time.monotonic() - start,
+            )
+        if self.enable_logging:
+            LOG.info(
+                '%s - "%s %s %s" %d',
+                peer[0] if peer else "-",
+                request.method,
+                request.target,
+                request.version,
+                status,
+            )
+        return keep_alive
+
+    async def _send(
+        self,
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        headers: list[tuple[str, str]],
+        keep_alive: bool,
+        body: bytes = b"",
+        content_length: int | None = None,
+    ) -> int:
+        """
+        Write the status line, headers and an optional in-memory body.
+        """
+        lines = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Server: {SERVER_VERSION}",
+            f"Date: {email.utils.formatdate(time.time(), usegmt=True)}",
+        ]
+        lines += [f"{keyword}: {value}" for keyword, value in headers + CORS_HEADERS]
+        if status != HTTPStatus.NOT_MODIFIED:
+            length = len(body) if content_length is None else content_length
+            lines.append(f"Content-Length: {length}")
+            _response_length.set(length)
+        if not keep_alive:
+            lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+        return status.value
+
+    async def _send_path(
+        self, request: _Request, writer: asyncio.StreamWriter, keep_alive: bool
+    ) -> int:
+        translated = self.translate_path(request.target)
+        head_only = request.method == "HEAD"
+
+        # the filesystem may be slow (network storage): never block the event loop on it
+        path, is_dir = await asyncio.to_thread(self._resolve_path, translated)
+        if is_dir:
+            parts = urllib.parse.urlsplit(request.target)
+            if not parts.path.endswith("/"):
+                location = urllib.parse.urlunsplit(
+                    (parts[0], parts[1], parts[2] + "/", parts[3], parts[4])
+                )
+                return await self._send(
+                    writer,
+                    HTTPStatus.MOVED_PERMANENTLY,
+                    [("Location", location)],
+                    keep_alive,
+                )
+            if path == translated:
+                body = await asyncio.to_thread(
+                    self._list_directory, path, request.target
+                )
+                return await self._send(
+                    writer,
+                    HTTPStatus.OK,
+                    [("Content-Type", "text/html; charset=utf-8")],
+                    keep_alive,
+                    body=b"" if head_only else body,
+                    content_length=len(body),
+                )
+
+        opened = await asyncio.to_thread(self._open_path, path, request.headers)
+        if opened is None:
+            return await self._send(writer, HTTPStatus.NOT_FOUND, [], keep_alive)
+        fs, encoding, source, size = opened
+        if isinstance(source, bytes):
+            return await self._send_file(
+                request, writer, keep_alive, path, fs, source, size, encoding
+            )
+
+        with source:
+            # members of zip bundles are sent from the memory-mapped archive
+            if isinstance(source, zipbundle.MemberFile):
+                source = source.getbuffer()
+            return await self._send_file(
+                request, writer, keep_alive, path, fs, source, size, encoding
+            )
+
+    def _resolve_path(self, path: str) -> tuple[str, bool]:
+        """
+        Path of the file to send for a translated path, and whether the path is a directory
+        (the path of its index file, if it has one). Blocking: waits for the files of a bundle
+        being written.
+        """
+        if zipbundle.isdir(path):
+            for index in ("index.html", "index.htm"):
+                if zipbundle.isfile(os.path.join(path, index)):
+                    return os.path.join(path, index), True
+            return path, True
+        if is_pending(path) and not path.endswith("/"):
+            # a file of a bundle being written, which may not be written yet
+            wait_for_file(path)
+        return path, False
+
+    def _open_path(
+        self, path: str, headers
+    ) -> tuple[os.stat_result, str | None, BinaryIO | bytes, int] | None:
+        """
+        Open the file to send (blocking), or None if it does not exist.
+
+        Returns the status of the file, the negotiated content encoding, and the source of the
+        body with its size: the file itself or its precompressed sidecar, left open for
+        sendfile, or the contents compressed on the fly (which are cached). Plain files are
+        never read into the chunk cache, so they are always sent zero-copy.
+        """
+        if path.endswith("/") or not zipbundle.isfile(path):
+            return None
+        try:
+            fs = zipbundle.stat(path)
+            encoding, sidecar = negotiate_encoding(headers, path, fs)
+            if encoding is not None and sidecar is None:
+                data = None
+                if self.chunk_cache is not None:
+                    data = self.chunk_cache.lookup(path, fs, encoding)
+                if data is None:
+                    data = compress_file(path, fs, self.chunk_cache)
+                return fs, encoding, data, len(data)
+            f, source_fs = zipbundle.open_binary(sidecar or path)
+        except OSError:
+            return None
+        return fs, encoding, f, source_fs.st_size
+
+    async def _send_file(
+        self,
+        request: _Request,
+        writer: asyncio.StreamWriter,
+        keep_alive: bool,
+        path: str,
+        fs: os.stat_result,
+        source: BinaryIO | bytes | memoryview,
+        size: int,
+        encoding: str | None = None,
+    ) -> int:
+        """
+        Send a file answering conditional and Range requests.
+
+        The body is read from `source` (an open file object, or cached contents) of `size` bytes,
+        which is the file at `path` (with status `fs`) in the given content encoding.
+        """
+        head_only = request.method == "HEAD"
+        ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        validators = caching_headers(path, fs, encoding)
+        headers = [("Accept-Ranges", "bytes")] + validators
+
+        # preconditions are evaluated before the Range header
+        if is_not_modified(request.headers, fs, encoding):
+            return await self._send(
+                writer, HTTPStatus.NOT_MODIFIED, validators, keep_alive
+            )
+        if encoding is not None:
+            headers.append(("Content-Encoding", encoding))
+
+        ranges = None
+        if "Range" in request.headers and if_range_matches(request.headers, fs):
+            ranges = parse_range_header(request.headers["Range"], size)
+
+        if ranges == []:
+            return await self._send(
+                writer,
+                HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                [("Content-Range", f"bytes */{size}")],
+                keep_alive,
+            )
+
+        if ranges is None:
+            status = await self._send(
+                writer,
+                HTTPStatus.OK,
+                [("Content-Type", ctype)] + headers,
+                keep_alive,
+                content_length=size,
+            )
+            if not head_only:
+                await self._send_body(writer, source, 0, size)
+            return status
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            status = await self._send(
+                writer,
+                HTTPStatus.PARTIAL_CONTENT,
+                [
+                    ("Content-Type", ctype),
+                    ("Content-Range", f"bytes {start}-{end}/{size}"),
+                ]
+                + headers,
+                keep_alive,
+                content_length=end - start + 1,
+            )
+            if not head_only:
+                await self._send_body(writer, source, start, end - start + 1)
+            return status
+
+        boundary = uuid.uuid4().hex
+        part_headers = [
+            (
+                f"\r\n--{boundary}\r\n"
+                f"Content-Type: {ctype}\r\n"
+                f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+            ).encode("latin-1")
+            for start, end in ranges
+        ]
+        trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        length = len(trailer) + sum(
+            len(part) + end - start + 1
+            for part, (start, end) in zip(part_headers, ranges)
+        )
+        status = await self._send(
+            writer,
+            HTTPStatus.PARTIAL_CONTENT,
+            [("Content-Type", f"multipart/byteranges; boundary={boundary}")] + headers,
+            keep_alive,
+            content_length=length,
+        )
+        if not head_only:
+            for part, (start, end) in zip(part_headers, ranges):
+                writer.write(part)
+                await self._send_body(writer, source, start, end - start + 1)
+            writer.write(trailer)
+            await writer.drain()
+        return status
+
+    async def _send_body(
+        self,
+        writer: asyncio.StreamWriter,
+        source: BinaryIO | bytes | memoryview,
+        offset: int,
+        count: int,
+    ) -> None:
+        if isinstance(source, (bytes, memoryview)):
+            writer.write(memoryview(source)[offset : offset + count])
+            await writer.drain()
+            return
+        # zero-copy (os.sendfile) on plain sockets, falls back to read/write otherwise
+        await writer.drain()
+        loop = asyncio.get_running_loop()
+        await loop.sendfile(writer.transport, source, offset, count)
+
+    def _list_directory(self, path: str, url_path: str) -> bytes:
+        try:
+            names = sorted(os.listdir(path), key=lambda name: name.lower())
+        except OSError:
+            names = []
+        display_path = html.escape(urllib.parse.unquote(url_path.split("?", 1)[0]))
+        items = []
+        for name in names:
+            link = name + "/" if os.path.isdir(os.path.join(path, name)) else name
+            items.append(
+                f'<li><a href="{urllib.parse.quote(link)}">{html.escape(link)}</a></li>'
+            )
+        return (
+            "<!DOCTYPE HTML>\n<html>\n<head>\n<meta charset='utf-8'>\n"
+            f"<title>Directory listing for {display_path}</title>\n</head>\n<body>\n"
+            f"<h1>Directory listing for {display_path}</h1>\n<hr>\n<ul>\n"
+            + "\n".join(items)
+            + "\n</ul>\n<hr>\n</body>\n</html>\n"
+        ).encode("utf-8", "surrogateescape")
+
+
+def serve_directory_async(
+    path: Path,
+    host: str,
+    port: int,
+    threaded: bool = True,
+    enable_request_logging: bool = False,
+    chunk_cache: ChunkCache | None = None,
+    metrics: ServerMetrics | None = None,
+    catalog=None,
+) -> None:
+    """
+    Serve a directory with the asyncio engine, in a background thread or blocking.
+
+    Parameters
+    ----------
+    path : Path
+        The directory to serve.
+    host : str
+        The host name or IP address.
+    port : int
+        The port number to serve on.
+    threaded : bool
+        Whether to run the event loop in a separate thread, by default True.
+    enable_request_logging : bool
+        Whether to enable request logging, by default False.
+    chunk_cache : ChunkCache | None
+        In-memory cache of file contents, by default None (always read from disk).
+    metrics : ServerMetrics | None
+        Request metrics, served at /metrics, by default None (not collected).
+    catalog : BundleCatalog | None
+        Catalog of bundles served instead of the directory, by default None.
+    """
+    server = AsyncDirectoryServer(
+        path,
+        enable_logging=enable_request_logging,
+        chunk_cache=chunk_cache,
+        metrics=metrics,
+        catalog=catalog,
+    )
+    loop = asyncio.new_event_loop()
+    # Bind before starting the (background) loop, so the URL is reachable once returned
+    aio_server = loop.run_until_complete(
+        asyncio.start_server(
+            server.handle_connection, host, port, limit=MAX_HEADER_SIZE, backlog=1024
+        )
+    )
+
+    def start_server():
+        asyncio.set_event_loop(loop)
+        LOG.info(
+            "Serving %s at http://%s:%s (async engine)", catalog or path, host, port
+        )
+        try:
+            LOG.info("Server running...")
+            loop.run_until_complete(aio_server.serve_forever())
+        except KeyboardInterrupt:
+            LOG.info("Server interrupted, shutting down.")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            LOG.error("An error occurred: %s", e)
+        finally:
+            aio_server.close()
+            loop.close()
+            if metrics is not None:
+                metrics.log_summary()
+            if chunk_cache is not None:
+                LOG.info("Chunk cache statistics: %s", chunk_cache.stats())
+
+    if threaded:
+        server_thread = threading.Thread(target=start_server, daemon=True)
+        server_thread.start()
+    else:
+        start_server()
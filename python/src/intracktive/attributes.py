@@ -0,0 +1,444 @@
+import logging
+import time
+from pathlib import Path
+from typing import Iterable
+
+import click
+import numpy as np
+import pandas as pd
+import zarr
+from intracktive import zipbundle
+from intracktive.bundle import BundleReader
+from intracktive.convert import (
+    INF_SPACE,
+    RAGGED_CHUNK_ROWS,
+    REQUIRED_COLUMNS,
+    VALID_ATTRIBUTE_TYPES,
+    encode_string_column,
+    get_col_type,
+    normalize_attribute,
+    read_tracks_file,
+)
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+# how the rows of a table are matched with the points of a bundle: by (track_id, t), by the
+# order of the points in the converted table, or by (track_id, t) if the table has both columns
+MATCH_BY = ("auto", "track", "order")
+
+
+def _open_bundle_for_update(zarr_path: Path) -> tuple[BundleReader, zarr.Group]:
+    zarr_path = Path(zarr_path)
+    if zipbundle.is_zip_bundle(zarr_path) or zipbundle.mounted(str(zarr_path)):
+        raise ValueError(
+            f"{zarr_path} is not a bundle directory, the attributes of zip and in-memory "
+            "bundles cannot be changed"
+        )
+    reader = BundleReader(zarr_path)
+    group = zarr.open_group(zarr_path.as_posix(), mode="r+", zarr_format=2)
+    return reader, group
+
+
+def _is_ragged(group: zarr.Group) -> bool:
+    return group["points"].attrs.get("layout") == "ragged"
+
+
+def _index_of(values: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    Index of each key in the array of unique values, -1 for the keys that are not in it.
+    """
+    order = np.argsort(values)
+    position = np.searchsorted(values[order], keys).clip(0, max(len(values) - 1, 0))
+    index = np.full(len(keys), -1, dtype=np.int64)
+    if len(values):
+        found = values[order][position] == keys
+        index[found] = order[position][found]
+    return index
+
+
+def match_points(zarr_path: Path, table: pd.DataFrame, by: str = "auto") -> np.ndarray:
+    """
+    Point id (see `BundleReader.query_lineage`) of each row of a table.
+
+    Parameters
+    ----------
+    zarr_path : Path
+        Path of the bundle
+    table : pd.DataFrame
+        One row per point of the bundle, with the `track_id` and `t` columns (as in the converted
+        table), or in the order of the rows of the converted table
+    by : str, optional
+        "track" to match the rows by (track_id, t), "order" by their order (the points of each
+        time point in the order of the converted table, sorted by `t` if the table has it),
+        by default "auto": "track" if the table has the `track_id` and `t` columns
+
+    Returns
+    -------
+    np.ndarray
+        Point id of each row
+
+    Raises
+    ------
+    ValueError
+        If the rows are not exactly the points of the bundle
+    """
+    if by not in MATCH_BY:
+        raise ValueError(f"by must be one of {MATCH_BY}, got '{by}'")
+    if by == "auto":
+        by = "track" if {"track_id", "t"} <= set(table.columns) else "order"
+
+    reader = BundleReader(zarr_path)
+    group = zarr.open_group(Path(zarr_path).as_posix(), mode="r")
+    # padding points do not belong to any track, each other point to a single one
+    point_ids = np.flatnonzero(np.diff(reader.points_to_tracks_indptr) > 0)
+    if len(table) != len(point_ids):
+        raise ValueError(
+            f"The table has {len(table)} rows, the bundle has {len(point_ids)} points"
+        )
+
+    if by == "order":
+        if "t" not in table.columns:
+            return point_ids
+        # the points of each time point are stored in the order of the rows
+        row_order = np.argsort(table["t"].to_numpy(), kind="stable")
+        times, counts = np.unique(table["t"].to_numpy(), return_counts=True)
+        stored_counts = np.bincount(
+            reader.time_of_points(point_ids), minlength=reader.num_times
+        )
+        if "times" in group and not np.array_equal(times, group["times"][:]):
+            raise ValueError("The times of the table are not the times of the bundle")
+        if not np.array_equal(counts, stored_counts):
+            raise ValueError(
+                "The number of rows per time point of the table is not the number of "
+                "points per time point of the bundle"
+            )
+        matched = np.empty(len(table), dtype=np.int64)
+        matched[row_order] = point_ids
+        return matched
+
+    if "track_ids" not in group or "times" not in group:
+        raise ValueError(
+            f"{zarr_path} does not store the original track ids and times, reconvert it or "
+            "match the rows of the table by order"
+        )
+    for col in ("track_id", "t"):
+        if col not in table.columns:
+            raise ValueError(f"Column '{col}' not found in the table (case sensitive!)")
+
+    # key (track index, time index) of each point and of each row
+    track_index = reader.points_to_tracks_indices[:].astype(np.int64)
+    point_keys = track_index * reader.num_times + reader.time_of_points(point_ids)
+    row_keys = np.full(len(table), -1, dtype=np.int64)
+    rows_track_index = _index_of(
+        group["track_ids"][:], table["track_id"].to_numpy(dtype=np.int64)
+    )
+    rows_time_index = _index_of(group["times"][:], table["t"].to_numpy(dtype=np.int64))
+    found = (rows_track_index >= 0) & (rows_time_index >= 0)
+    row_keys[found] = (
+        rows_track_index[found] * reader.num_times + rows_time_index[found]
+    )
+
+    order = np.argsort(point_keys)
+    position = np.searchsorted(point_keys[order], row_keys).clip(0, len(order) - 1)
+    found &= point_keys[order][position] == row_keys
+    if not found.all():
+        raise ValueError(
+            f"{np.count_nonzero(~found)} rows of the table match no point of the bundle"
+        )
+    matched = point_ids[order[position]]
+    if len(np.unique(matched)) != len(matched):
+        raise ValueError("Some points of the bundle match several rows of the table")
+    return matched
+
+
+def add_attributes(
+    zarr_path: Path,
+    table: pd.DataFrame,
+    columns: Iterable[str] | None = None,
+    attribute_types: Iterable[str] = (),
+    by: str = "auto",
+    replace: bool = False,
+) -> list[str]:
+    """
+    Add columns of a table as attributes of an existing bundle, without reconverting it.
+
+    Only the values of the new attributes are written (normalized like `build_bundle` does),
+    in new chunks of `attributes`: each attribute has its own block of columns (see
+    `attribute_columns` in the attributes of the array), which is never reused after the
+    attribute is removed, as the viewer caches the chunks. The `attributes` of bundles
+    converted before each attribute had its own chunks are rechunked first.
+
+    Parameters
+    ----------
+    zarr_path : Path
+        Path of the bundle (a directory)
+    table : pd.DataFrame
+        One row per point of the bundle, see `match_points`
+    columns : Iterable[str] | None, optional
+        Columns to add as attributes, by default all the columns but the columns of the tracks
+    attribute_types : Iterable[str], optional
+        Type of each column ("continuous", "categorical" or "hex"), by default detected
+    by : str, optional
+        How the rows are matched with the points, see `match_points`, by default "auto"
+    replace : bool, optional
+        Whether to replace the attributes of the bundle with the same names, by default False
+
+    Returns
+    -------
+    list[str]
+        Names of the attributes of the bundle
+    """
+    start = time.monotonic()
+    if columns is None:
+        columns = table.columns.difference(REQUIRED_COLUMNS).to_list()
+    columns = list(columns)
+    if not columns:
+        raise ValueError("No columns to add as attributes")
+    missing = [col for col in columns if col not in table.columns]
+    if missing:
+        raise ValueError(
+            f"Columns not found in the table (case sensitive!): {', '.join(missing)}"
+        )
+    attribute_types = list(attribute_types)
+    if len(attribute_types) != len(columns):
+        attribute_types = [get_col_type(table[col]) for col in columns]
+    invalid_types = [t for t in attribute_types if t not in VALID_ATTRIBUTE_TYPES]
+    if invalid_types:
+        raise ValueError(
+            f"Invalid attribute type(s): {invalid_types}. "
+            f"Valid types are: {VALID_ATTRIBUTE_TYPES}"
+        )
+
+    reader, group = _open_bundle_for_update(zarr_path)
+    current = (dict(group["attributes"].attrs) if "attributes" in group else {}).get(
+        "attribute_names", []
+    )
+    existing = [col for col in columns if col in current]
+    if existing and not replace:
+        raise ValueError(
+            f"Attributes already in the bundle: {', '.join(existing)} (remove them first)"
+        )
+    matched = match_points(zarr_path, table, by=by)
+
+    ragged = _is_ragged(group)
+    num_point_ids = int(reader.time_offsets[-1])
+    # values of each new attribute, in the layout of `attributes`
+    table = table[columns].copy()
+    string_mappings = {}
+    blocks = []
+    for col, col_type in zip(columns, attribute_types):
+        mapping = encode_string_column(table, col)
+        if mapping is not None:
+            string_mappings[col] = mapping
+        attribute_array = np.full(num_point_ids, INF_SPACE, dtype=np.float32)
+        attribute_array[matched] = table[col].to_numpy(dtype=np.float32)
+        if not ragged:
+            attribute_array = attribute_array.reshape(reader.num_times, -1)
+        if col_type in ["continuous", "categorical"]:
+            attribute_array = normalize_attribute(attribute_array, col)
+        blocks.append(attribute_array)
+
+    if existing:
+        remove_attributes(zarr_path, existing)
+
+    # a block of columns per attribute: one column (ragged) or max points per time point
+    width = 1 if ragged else reader.max_points_per_time_point
+    chunks = (RAGGED_CHUNK_ROWS, 1) if ragged else (1, width)
+    if ragged:
+        new_values = np.column_stack(blocks)
+    else:
+        new_values = np.hstack(blocks)
+
+    if "attributes" not in group:
+        array = group.create_array(
+            "attributes",
+            data=new_values,
+            chunks=chunks,
+        )
+        attrs = {
+            "attribute_names": [],
+            "attribute_types": [],
+            "pre_normalized": True,
+        }
+        first_column = 0
+    else:
+        array = group["attributes"]
+        attrs = dict(array.attrs)
+        if array.chunks[1] != width:
+            # bundles converted before the attributes were chunked per attribute: appending
+            # columns would rewrite the chunks of the other attributes in place
+            LOG.info(f"Rechunking the attributes of {zarr_path} per attribute")
+            array = group.create_array(
+                "attributes",
+                data=array[:],
+                chunks=chunks,
+                attributes=dict(attrs),
+                overwrite=True,
+            )
+        first_column = array.shape[1] // width
+        array.resize((array.shape[0], array.shape[1] + new_values.shape[1]))
+        array[:, first_column * width :] = new_values
+
+    # the metadata is updated last: the viewer only reads the listed columns
+    names = list(attrs.get("attribute_names", []))
+    attrs["attribute_columns"] = attrs.get("attribute_columns", list(range(len(names))))
+    attrs["attribute_columns"] += list(range(first_column, first_column + len(columns)))
+    attrs["attribute_names"] = names + columns
+    attrs["attribute_types"] = list(attrs.get("attribute_types", [])) + attribute_types
+    if string_mappings:
+        attrs["string_mappings"] = {
+            **attrs.get("string_mappings", {}),
+            **string_mappings,
+        }
+    array.attrs.put(attrs)
+
+    LOG.info(
+        f"Added the attributes {', '.join(columns)} to {zarr_path} in {time.monotonic() - start} seconds"
+    )
+    return attrs["attribute_names"]
+
+
+def remove_attributes(zarr_path: Path, names: Iterable[str]) -> list[str]:
+    """
+    Remove attributes of an existing bundle, and delete their chunks.
+
+    Parameters
+    ----------
+    zarr_path : Path
+        Path of the bundle (a directory)
+    names : Iterable[str]
+        Names of the attributes to remove
+
+    Returns
+    -------
+    list[str]
+        Names of the remaining attributes of the bundle
+    """
+    names = list(names)
+    reader, group = _open_bundle_for_update(zarr_path)
+    attrs = dict(group["attributes"].attrs) if "attributes" in group else {}
+    current = list(attrs.get("attribute_names", []))
+    missing = [name for name in names if name not in current]
+    if missing:
+        raise ValueError(f"Attributes not in the bundle: {', '.join(missing)}")
+
+    array = group["attributes"]
+    columns = attrs.get("attribute_columns", list(range(len(current))))
+    types = list(attrs.get("attribute_types", []))
+    removed = [columns[current.index(name)] for name in names]
+    keep = [i for i, name in enumerate(current) if name not in names]
+    attrs["attribute_names"] = [current[i] for i in keep]
+    attrs["attribute_types"] = [types[i] for i in keep if i < len(types)]
+    attrs["attribute_columns"] = [columns[i] for i in keep]
+    mappings = {
+        name: mapping
+        for name, mapping in attrs.get("string_mappings", {}).items()
+        if name not in names
+    }
+    if mappings:
+        attrs["string_mappings"] = mappings
+    else:
+        attrs.pop("string_mappings", None)
+    # the metadata is updated first: the viewer stops reading the removed columns
+    array.attrs.put(attrs)
+
+    # chunks filled with the fill value are deleted, their columns are never reused
+    width = 1 if _is_ragged(group) else reader.max_points_per_time_point
+    for column in removed:
+        array[:, column * width : (column + 1) * width] = array.fill_value
+
+    LOG.info(f"Removed the attributes {', '.join(names)} from {zarr_path}")
+    return attrs["attribute_names"]
+
+
+@click.group("attributes")
+def attributes_cli() -> None:
+    """
+    Add or remove the attributes of an existing bundle.
+    """
+
+
+@attributes_cli.command("add")
+@click.argument("bundle", type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.argument("table", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--add_all_attributes",
+    is_flag=True,
+    help="Boolean indicating whether to add all columns of TABLE but track_id, t, z, y, x and parent_track_id as attributes",
+    default=False,
+    type=bool,
+)
+@click.option(
+    "--add_attribute",
+    type=str,
+    default=None,
+    help="Comma-separated list of column names to add as attributes (e.g., 'cell_size,diameter,type,label')",
+)
+@click.option(
+    "--add_hex_attribute",
+    type=str,
+    default=None,
+    help="Comma-separated list of column names to add as HEX attributes (e.i., columns with hexInt values, only internal use')",
+)
+@click.option(
+    "--by",
+    type=click.Choice(MATCH_BY),
+    default="auto",
+    help="How the rows of TABLE are matched with the points: by (track_id, t), or by their order in the converted table (default: auto, by (track_id, t) if TABLE has both columns)",
+)
+@click.option(
+    "--replace",
+    is_flag=True,
+    help="Boolean indicating whether to replace the attributes of the bundle with the same names",
+    default=False,
+    type=bool,
+)
+def attributes_add_cli(
+    bundle: Path,
+    table: Path,
+    add_all_attributes: bool,
+    add_attribute: str | None,
+    add_hex_attribute: str | None,
+    by: str,
+    replace: bool,
+) -> None:
+    """
+    Add columns of TABLE (a CSV/Parquet/GEFF file with a row per point) as attributes of BUNDLE.
+    """
+    try:
+        table_df, columns, col_types = read_tracks_file(
+            table,
+            add_all_attributes=add_all_attributes,
+            add_attribute=add_attribute,
+            add_hex_attribute=add_hex_attribute,
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="TABLE")
+    if not columns:
+        raise click.UsageError(
+            "No attributes to add, use --add_all_attributes, --add_attribute or --add_hex_attribute"
+        )
+    try:
+        names = add_attributes(
+            bundle, table_df, columns, col_types, by=by, replace=replace
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(", ".join(names))
+
+
+@attributes_cli.command("remove")
+@click.argument("bundle", type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.argument("names", type=str)
+def attributes_remove_cli(bundle: Path, names: str) -> None:
+    """
+    Remove the attributes NAMES (comma-separated) of BUNDLE.
+    """
+    try:
+        remaining = remove_attributes(
+            bundle, [name.strip() for name in names.split(",")]
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(", ".join(remaining))
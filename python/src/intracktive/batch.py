@@ -0,0 +1,278 @@
+import json
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import click
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+# Rough peak memory of a conversion relative to the size of its input on disk
+# (pandas DataFrame + dense points/attributes arrays + sparse matrices)
+MEMORY_PER_INPUT_BYTE = 10
+REPORT_NAME = "convert_batch_report.json"
+
+
+def read_manifest(manifest_path: Path) -> list[dict]:
+    """
+    Read a batch conversion manifest.
+
+    The manifest is a JSON file containing a list of entries (or an object with a "datasets" list).
+    Each entry is either a path to an input file, or an object with an "input_file" key plus
+    any keyword argument of `convert_file` (e.g., "add_radius", "add_attribute", "out_dir").
+    Relative paths are resolved with respect to the directory of the manifest.
+
+    Parameters
+    ----------
+    manifest_path : Path
+        Path to the JSON manifest
+
+    Returns
+    -------
+    list[dict]
+        List of entries with at least the "input_file" key
+    """
+    manifest_path = Path(manifest_path)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get("datasets", [])
+    if not isinstance(manifest, list):
+        raise ValueError(
+            f"Manifest {manifest_path} must contain a list of datasets to convert"
+        )
+
+    entries = []
+    for i, entry in enumerate(manifest):
+        if isinstance(entry, str):
+            entry = {"input_file": entry}
+        if not isinstance(entry, dict) or "input_file" not in entry:
+            raise ValueError(
+                f"Manifest entry {i} must be a path or an object with an 'input_file' key"
+            )
+        entry = dict(entry)
+        for key in ("input_file", "out_dir"):
+            if entry.get(key) is not None:
+                path = Path(entry[key]).expanduser()
+                if not path.is_absolute():
+                    path = manifest_path.parent / path
+                entry[key] = path
+        entries.append(entry)
+
+    return entries
+
+
+def estimate_memory(input_path: Path) -> int:
+    """
+    Estimate the peak memory (in bytes) needed to convert an input file, directory or glob pattern.
+    """
+    input_path = Path(input_path)
+    if input_path.is_file():
+        size = input_path.stat().st_size
+    elif input_path.is_dir():
+        size = sum(p.stat().st_size for p in input_path.rglob("*") if p.is_file())
+    else:
+        size = sum(
+            p.stat().st_size
+            for p in input_path.parent.glob(input_path.name)
+            if p.is_file()
+        )
+    return size * MEMORY_PER_INPUT_BYTE
+
+
+def _convert_entry(entry: dict) -> dict:
+    """
+    Convert a single manifest entry, executed in a worker process.
+    """
+    # imported in the worker, so the heavy dependencies are loaded once per worker process
+    from intracktive.convert import convert_file
+
+    start = time.monotonic()
+    result = {"input_file": str(entry["input_file"])}
+    try:
+        zarr_path = convert_file(**entry)
+        result.update(status="ok", zarr_path=str(zarr_path))
+    except Exception as e:
+        result.update(
+            status="failed",
+            error=f"{type(e).__name__}: {e}",
+            traceback=traceback.format_exc(),
+        )
+    result["seconds"] = time.monotonic() - start
+    return result
+
+
+def convert_batch(
+    entries: list[dict],
+    out_dir: Path | None = None,
+    max_workers: int | None = None,
+    memory_budget_gb: float | None = None,
+    report_path: Path | None = None,
+) -> list[dict]:
+    """
+    Convert multiple datasets in a pool of worker processes.
+
+    Parameters
+    ----------
+    entries : list[dict]
+        Datasets to convert, as returned by `read_manifest`
+    out_dir : Path | None, optional
+        Default output directory for entries without their own "out_dir", by default None
+        (the parent directory of each input)
+    max_workers : int | None, optional
+        Maximum number of concurrent conversions, by default None (number of CPUs)
+    memory_budget_gb : float | None, optional
+        Approximate memory budget in GB shared by the running conversions, by default None (no limit).
+        A conversion only starts when its estimated memory fits in the remaining budget
+        (a single conversion is always allowed to run, even if it exceeds the budget).
+    report_path : Path | None, optional
+        Path of the JSON summary report, by default None (no report written)
+
+    Returns
+    -------
+    list[dict]
+        One result per entry (in manifest order) with the keys "input_file", "status" ("ok" or "failed"),
+        "seconds", and "zarr_path" or "error"
+    """
+    start = time.monotonic()
+    entries = [dict(entry) for entry in entries]
+    for entry in entries:
+        if out_dir is not None and entry.get("out_dir") is None:
+            entry["out_dir"] = Path(out_dir)
+
+    budget = None if memory_budget_gb is None else memory_budget_gb * 1024**3
+    estimates = [estimate_memory(entry["input_file"]) for entry in entries]
+
+    results: list[dict | None] = [None] * len(entries)
+    pending = list(range(len(entries)))
+    running: dict[Future, int] = {}
+    reserved = 0
+
+    n_slots = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=n_slots) as executor:
+        while pending or running:
+            # submit as many conversions as the worker slots and memory budget allow
+            while pending and len(running) < n_slots:
+                fitting = [
+                    i
+                    for i in pending
+                    if budget is None
+                    or not running
+                    or reserved + estimates[i] <= budget
+                ]
+                if not fitting:
+                    break
+                i = fitting[0]
+                pending.remove(i)
+                reserved += estimates[i]
+                running[executor.submit(_convert_entry, entries[i])] = i
+                LOG.info(f"Started converting {entries[i]['input_file']}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                reserved -= estimates[i]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    # e.g. the worker process was killed because it ran out of memory
+                    results[i] = {
+                        "input_file": str(entries[i]["input_file"]),
+                        "status": "failed",
+                        "error": f"{type(e).__name__}: {e}",
+                        "seconds": 0.0,
+                    }
+                LOG.info(
+                    f"Converting {results[i]['input_file']} {results[i]['status']} "
+                    f"in {results[i]['seconds']:.1f} seconds"
+                )
+
+    n_failed = sum(result["status"] != "ok" for result in results)
+    LOG.info(
+        f"Converted {len(results) - n_failed}/{len(results)} datasets "
+        f"in {time.monotonic() - start} seconds ({n_failed} failed)"
+    )
+
+    if report_path is not None:
+        report = {
+            "total_seconds": time.monotonic() - start,
+            "n_datasets": len(results),
+            "n_failed": n_failed,
+            "datasets": results,
+        }
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        LOG.info(f"Report written to {report_path}")
+
+    return results
+
+
+@click.command(name="convert-batch")
+@click.argument(
+    "manifest",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--out_dir",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=None,
+    help="Default output directory for datasets without their own 'out_dir' (optional, defaults to the parent dir of each input)",
+)
+@click.option(
+    "--max_workers",
+    type=int,
+    default=None,
+    help="Maximum number of concurrent conversions (default: number of CPUs)",
+)
+@click.option(
+    "--memory_budget_gb",
+    type=float,
+    default=None,
+    help="Approximate memory budget in GB shared by the concurrent conversions (default: no limit)",
+)
+@click.option(
+    "--report",
+    "report_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help=f"Path of the JSON summary report (default: {REPORT_NAME} next to the manifest)",
+)
+def convert_batch_cli(
+    manifest: Path,
+    out_dir: Path | None,
+    max_workers: int | None,
+    memory_budget_gb: float | None,
+    report_path: Path | None,
+) -> None:
+    """
+    Convert multiple CSV/Parquet/GEFF files listed in a manifest in parallel.
+
+    Arguments:
+        MANIFEST: JSON file with a list of input paths, or of objects with an
+        "input_file" key plus per-dataset options of `intracktive convert`
+        (e.g., {"input_file": "embryo1.csv", "add_radius": true})
+    """
+    if report_path is None:
+        report_path = manifest.parent / REPORT_NAME
+
+    results = convert_batch(
+        read_manifest(manifest),
+        out_dir=out_dir,
+        max_workers=max_workers,
+        memory_budget_gb=memory_budget_gb,
+        report_path=report_path,
+    )
+
+    if any(result["status"] != "ok" for result in results):
+        raise click.ClickException(
+            f"Some datasets failed to convert, see the report at {report_path}"
+        )
+
+
+if __name__ == "__main__":
+    convert_batch_cli()
@@ -0,0 +1,223 @@
+import functools
+import logging
+from pathlib import Path
+
+import numpy as np
+import zarr
+from intracktive import zipbundle
+from intracktive.quantize import decode_coordinates
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+SPARSE_GROUPS = ["points_to_tracks", "tracks_to_points", "tracks_to_tracks"]
+
+
+def _row_selection(
+    indptr: np.ndarray, rows: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Indices of the stored values of some rows of a CSR matrix.
+
+    Parameters
+    ----------
+    indptr : np.ndarray
+        Index pointer array of the CSR matrix
+    rows : np.ndarray
+        Rows to select
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Concatenated indices of the values of all rows, and the number of values per row
+    """
+    starts = indptr[rows].astype(np.int64)
+    lengths = indptr[rows + 1].astype(np.int64) - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum(), dtype=np.int64), lengths
+
+
+class BundleReader:
+    """
+    Read-only access to the sparse track arrays of an inTRACKtive Zarr bundle.
+
+    The index pointer arrays and the (small) lineage matrix are loaded in memory once,
+    the large `indices` and `data` arrays are only read for the requested rows,
+    so zarr only decodes the chunks that are needed.
+    """
+
+    def __init__(self, zarr_path: Path) -> None:
+        self.zarr_path = Path(zarr_path)
+        virtual_bundle = zipbundle.mounted(str(self.zarr_path))
+        if virtual_bundle is not None:
+            store = virtual_bundle.store()
+        elif zipbundle.is_zip_bundle(self.zarr_path):
+            store = zarr.storage.ZipStore(self.zarr_path, mode="r")
+        else:
+            store = self.zarr_path.as_posix()
+        group = zarr.open_group(store, mode="r")
+        for name in SPARSE_GROUPS:
+            if name not in group:
+                raise ValueError(f"{zarr_path} is not an inTRACKtive bundle: no {name}")
+
+        # ragged bundles (version 2) store the first point id of each time point, the ids of
+        # padded bundles are `time index * max points per time point + index in the time point`
+        self.version = group.attrs.get("bundle_version", 1)
+        if "time_offsets" in group:
+            self.time_offsets = group["time_offsets"][:].astype(np.int64)
+            self.max_points_per_time_point = int(
+                np.diff(self.time_offsets).max(initial=0)
+            )
+        else:
+            self.max_points_per_time_point = group["points"].shape[1] // group[
+                "points"
+            ].attrs.get("values_per_point", 3)
+            self.time_offsets = (
+                np.arange(group["points"].shape[0] + 1, dtype=np.int64)
+                * self.max_points_per_time_point
+            )
+
+        self.points_to_tracks_indptr = group["points_to_tracks/indptr"][:]
+        self.points_to_tracks_indices = group["points_to_tracks/indices"]
+        self.tracks_to_points_indptr = group["tracks_to_points/indptr"][:]
+        self.tracks_to_points_indices = group["tracks_to_points/indices"]
+        self.tracks_to_points_data = group["tracks_to_points/data"]
+        # quantized (and delta encoded) coordinates, see `intracktive.quantize`
+        self.tracks_to_points_quantization = self.tracks_to_points_data.attrs.get(
+            "quantization"
+        )
+        self.tracks_to_tracks_indptr = group["tracks_to_tracks/indptr"][:]
+        self.tracks_to_tracks_indices = group["tracks_to_tracks/indices"][:]
+        self.tracks_to_tracks_data = group["tracks_to_tracks/data"][:]
+
+    @property
+    def num_points(self) -> int:
+        return len(self.points_to_tracks_indptr) - 1
+
+    @property
+    def num_times(self) -> int:
+        return len(self.time_offsets) - 1
+
+    def time_of_points(self, point_ids: np.ndarray) -> np.ndarray:
+        """
+        Time index of each point, in both layouts of the points.
+        """
+        point_ids = np.asarray(point_ids, dtype=np.int64)
+        return np.searchsorted(self.time_offsets, point_ids, side="right") - 1
+
+    @property
+    def num_tracks(self) -> int:
+        return len(self.tracks_to_points_indptr) - 1
+
+    def track_ids_for_points(self, point_ids: np.ndarray) -> list[np.ndarray]:
+        """
+        Track ids (0-based, as used by the viewer) of each point.
+        """
+        point_ids = np.asarray(point_ids, dtype=np.int64)
+        selection, lengths = _row_selection(self.points_to_tracks_indptr, point_ids)
+        indices = self.points_to_tracks_indices.get_orthogonal_selection(selection)
+        return np.split(indices, np.cumsum(lengths)[:-1])
+
+    def lineage(self, track_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        All ancestors and descendants of some tracks (including the tracks themselves).
+
+        Parameters
+        ----------
+        track_ids : np.ndarray
+            Track ids (0-based)
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            Sorted unique ids of the tracks in the lineages, and the id of their parent track
+            (as stored in the bundle, i.e. the original 1-based `parent_track_id`)
+        """
+        track_ids = np.asarray(track_ids, dtype=np.int64)
+        selection, _ = _row_selection(self.tracks_to_tracks_indptr, track_ids)
+        related, first = np.unique(
+            self.tracks_to_tracks_indices[selection], return_index=True
+        )
+        return related, self.tracks_to_tracks_data[selection][first]
+
+    def points_for_tracks(
+        self, track_ids: np.ndarray
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Positions (n, 3) and point ids (n,) of the points of each track.
+        """
+        track_ids = np.asarray(track_ids, dtype=np.int64)
+        selection, lengths = _row_selection(self.tracks_to_points_indptr, track_ids)
+        splits = np.cumsum(lengths)[:-1]
+        positions = decode_coordinates(
+            self.tracks_to_points_data.get_orthogonal_selection(
+                (selection, slice(None))
+            ),
+            self.tracks_to_points_quantization,
+            lengths,
+        )
+        point_ids = self.tracks_to_points_indices.get_orthogonal_selection(selection)
+        return list(zip(np.split(positions, splits), np.split(point_ids, splits)))
+
+    def query_lineage(self, point_ids: list[int]) -> dict:
+        """
+        Tracks of the lineages of the selected points, with their parents and polylines.
+
+        This is the result of the sequence of sparse array fetches done by the viewer when
+        selecting cells (points -> tracks -> lineage tracks -> points of each track), in one call.
+
+        Parameters
+        ----------
+        point_ids : list[int]
+            Selected point ids (`time index * max points per time point + index in the time point`,
+            or `time_offsets[time index] + index in the time point` for ragged bundles)
+
+        Returns
+        -------
+        dict
+            {"point_ids": [...], "point_track_ids": [[...] per point], "tracks": [{"track_id",
+            "parent_track_id", "point_ids", "positions" (flat list of the coordinates)}]}
+        """
+        point_ids = np.asarray(point_ids, dtype=np.int64)
+        if np.any((point_ids < 0) | (point_ids >= self.num_points)):
+            raise ValueError(
+                f"Point ids must be in [0, {self.num_points}), got {point_ids.tolist()}"
+            )
+
+        point_track_ids = self.track_ids_for_points(point_ids)
+        roots = np.unique(np.concatenate([np.empty(0, np.int64), *point_track_ids]))
+        related, parents = self.lineage(roots)
+        tracks = [
+            {
+                "track_id": int(track_id),
+                "parent_track_id": int(parent),
+                "point_ids": ids.tolist(),
+                "positions": positions.ravel().tolist(),
+            }
+            for track_id, parent, (positions, ids) in zip(
+                related, parents, self.points_for_tracks(related)
+            )
+        ]
+        return {
+            "point_ids": point_ids.tolist(),
+            "point_track_ids": [ids.tolist() for ids in point_track_ids],
+            "tracks": tracks,
+        }
+
+
+@functools.lru_cache(maxsize=16)
+def _open_bundle(zarr_path: Path, version: int) -> BundleReader:
+    return BundleReader(zarr_path)
+
+
+def open_bundle(zarr_path: Path) -> BundleReader:
+    """
+    Open a bundle for reading, reusing the reader of previous calls while the bundle is unchanged.
+    """
+    zarr_path = Path(zarr_path)
+    # the metadata (or the whole zip bundle) is rewritten when the bundle is (re)converted
+    if zipbundle.is_zip_bundle(zarr_path):
+        version = zarr_path.stat().st_mtime_ns
+    else:
+        version = zipbundle.stat(str(zarr_path / ".zattrs")).st_mtime_ns
+    return _open_bundle(zarr_path, version)
@@ -0,0 +1,497 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+import click
+from intracktive import zipbundle
+from intracktive.server import (
+    DEFAULT_CACHE_SIZE_MB,
+    DEFAULT_HOST,
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_METRICS_LOG_INTERVAL,
+    is_pending,
+    start_server,
+    translate_path,
+)
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+# folders of a bundle, as checked by `intracktive open`
+REQUIRED_FOLDERS = [
+    "points",
+    "points_to_tracks",
+    "tracks_to_points",
+    "tracks_to_tracks",
+]
+# minimum number of seconds between two checks of the registry file for changes
+RELOAD_INTERVAL = 1.0
+_NAME_RE = re.compile(r"^[A-Za-z0-9_\-][A-Za-z0-9_.\-]*$")
+
+
+def _read_json(path: Path) -> dict:
+    try:
+        return json.loads(zipbundle.read_bytes(str(path)))
+    except (OSError, ValueError):
+        return {}
+
+
+def bundle_summary(zarr_path: Path) -> dict:
+    """
+    Summary of a bundle, read from its Zarr metadata only (no chunk is read).
+
+    Parameters
+    ----------
+    zarr_path : Path
+        Path of the bundle
+
+    Returns
+    -------
+    dict
+        Number of time points, of points (in total and at most per time point) and of tracks,
+        number of spatial dimensions, and the names and types of the attributes.
+        Values missing from the metadata are None.
+    """
+    zarr_path = Path(zarr_path)
+    points = _read_json(zarr_path / "points" / ".zarray")
+    points_attrs = _read_json(zarr_path / "points" / ".zattrs")
+    indptr = _read_json(zarr_path / "tracks_to_points" / "indptr" / ".zarray")
+    indices = _read_json(zarr_path / "tracks_to_points" / "indices" / ".zarray")
+    attributes_attrs = _read_json(zarr_path / "attributes" / ".zattrs")
+    root_attrs = _read_json(zarr_path / ".zattrs")
+
+    values_per_point = points_attrs.get("values_per_point", 3)
+    shape = points.get("shape")
+    num_times = shape[0] if shape else None
+    max_points = shape[1] // values_per_point if shape else None
+    if points_attrs.get("layout") == "ragged":
+        # one row per point, the number of time points is in the metadata of the offsets
+        offsets = _read_json(zarr_path / "time_offsets" / ".zarray")
+        num_times = offsets["shape"][0] - 1 if "shape" in offsets else None
+        max_points = points_attrs.get("max_points_per_time_point")
+    return {
+        "num_times": num_times,
+        "max_points_per_time_point": max_points,
+        "num_points": indices["shape"][0] if "shape" in indices else None,
+        "num_tracks": indptr["shape"][0] - 1 if "shape" in indptr else None,
+        "ndim": points_attrs.get("ndim"),
+        "attributes": attributes_attrs.get("attribute_names", []),
+        "attribute_types": attributes_attrs.get("attribute_types", []),
+        "intracktive_version": root_attrs.get("intracktive_version"),
+        "bundle_version": root_attrs.get("bundle_version", 1),
+    }
+
+
+class BundleCatalog:
+    """
+    Registry of the bundles served by a single server, each under /<name>/.
+
+    Bundles are added and removed while the server is running, either with `add`/`remove`,
+    or by editing the registry file (JSON, {"bundles": {name: path}}), which is reloaded
+    when it changes. The summary of each bundle (see `bundle_summary`) is computed when the
+    bundle is added, and served with the list of bundles at /catalog.json.
+    """
+
+    def __init__(self, registry: Path | None = None) -> None:
+        self.registry = None if registry is None else Path(registry).resolve()
+        self._lock = threading.Lock()
+        self._bundles: dict[str, Path] = {}
+        # path -> (.zattrs mtime, summary)
+        self._summaries: dict[Path, tuple[int, dict]] = {}
+        self._registry_mtime: int | None = None
+        self._last_check = 0.0
+        if self.registry is not None and self.registry.exists():
+            self._load_registry()
+
+    def __repr__(self) -> str:
+        return f"catalog of {len(self)} bundles"
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._bundles)
+
+    def __contains__(self, name: str) -> bool:
+        self.refresh()
+        return name in self._bundles
+
+    def names(self) -> list[str]:
+        self.refresh()
+        with self._lock:
+            return sorted(self._bundles)
+
+    def resolve(self, name: str) -> Path | None:
+        """
+        Path of a bundle, or None if no bundle is registered under this name.
+        """
+        self.refresh()
+        return self._bundles.get(name)
+
+    def add(self, zarr_path: Path, name: str | None = None) -> str:
+        """
+        Register a bundle, or return its name if it is already registered.
+
+        Parameters
+        ----------
+        zarr_path : Path
+            Path of the bundle
+        name : str | None, optional
+            Name of the bundle in the URLs, by default the file name of the bundle,
+            made unique with a numbered suffix (e.g. 'tracks.zarr', 'tracks-2.zarr')
+
+        Returns
+        -------
+        str
+            Name of the bundle
+        """
+        zarr_path = Path(zarr_path).resolve()
+        missing = [
+            f for f in REQUIRED_FOLDERS if not zipbundle.isdir(str(zarr_path / f))
+        ]
+        # a bundle being written (see `server.begin_pending_bundle`) is complete later
+        if missing and not is_pending(str(zarr_path / REQUIRED_FOLDERS[0])):
+            raise ValueError(
+                f"{zarr_path} is not an inTRACKtive bundle: missing {', '.join(missing)}"
+            )
+        if name is not None and not _NAME_RE.match(name):
+            raise ValueError(
+                f"Invalid bundle name '{name}': use letters, digits, '.', '_' and '-'"
+            )
+
+        self.refresh()
+        with self._lock:
+            for existing, path in self._bundles.items():
+                if path == zarr_path and name in (None, existing):
+                    return existing
+
+            if name is None:
+                name = zarr_path.name
+                stem, suffix = os.path.splitext(name)
+                counter = 2
+                while name in self._bundles:
+                    name = f"{stem}-{counter}{suffix}"
+                    counter += 1
+            elif name in self._bundles:
+                raise ValueError(
+                    f"A bundle is already registered as '{name}': {self._bundles[name]}"
+                )
+
+            self._summary(zarr_path)
+            self._bundles[name] = zarr_path
+            self._save_registry()
+        LOG.info(f"Added bundle {zarr_path} as '{name}'")
+        return name
+
+    def remove(self, name: str) -> None:
+        """
+        Unregister a bundle (its files are not deleted).
+        """
+        self.refresh()
+        with self._lock:
+            if name not in self._bundles:
+                raise KeyError(f"No bundle registered as '{name}'")
+            del self._bundles[name]
+            self._save_registry()
+        LOG.info(f"Removed bundle '{name}'")
+
+    def summaries(self) -> list[dict]:
+        """
+        Name, URL (relative to the server), path and summary of each bundle.
+        """
+        self.refresh()
+        with self._lock:
+            bundles = sorted(self._bundles.items())
+            return [
+                {
+                    "name": name,
+                    "url": f"{urllib.parse.quote(name)}/",
+                    "path": str(path),
+                    **self._summary(path),
+                }
+                for name, path in bundles
+            ]
+
+    def to_json(self) -> bytes:
+        return json.dumps({"bundles": self.summaries()}, indent=2).encode("utf-8")
+
+    def translate_path(self, url_path: str) -> str:
+        """
+        Translate a URL path (/<name>/<key>) to a path in the bundle registered as <name>,
+        or to an empty path (not found) if there is no such bundle.
+        """
+        path = url_path.split("?", 1)[0].split("#", 1)[0]
+        name, _, rest = path.lstrip("/").partition("/")
+        zarr_path = self.resolve(urllib.parse.unquote(name))
+        if zarr_path is None:
+            return ""
+        if not rest and not path.endswith("/"):
+            return str(zarr_path)
+        return translate_path(str(zarr_path), "/" + rest)
+
+    def refresh(self) -> None:
+        """
+        Reload the registry file if it changed (checked at most every RELOAD_INTERVAL seconds).
+        """
+        if self.registry is None:
+            return
+        now = time.monotonic()
+        if now - self._last_check < RELOAD_INTERVAL:
+            return
+        self._last_check = now
+        try:
+            mtime = self.registry.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._registry_mtime:
+            self._load_registry()
+
+    def _load_registry(self) -> None:
+        with self._lock:
+            self._registry_mtime = self.registry.stat().st_mtime_ns
+            entries = _read_json(self.registry).get("bundles", {})
+            bundles = {}
+            for name, path in entries.items():
+                # relative paths are relative to the registry file
+                path = (self.registry.parent / path).resolve()
+                if not _NAME_RE.match(name) or not zipbundle.isdir(
+                    str(path / "points")
+                ):
+                    LOG.warning(f"Skipping invalid bundle '{name}' at {path}")
+                    continue
+                bundles[name] = path
+            added = bundles.keys() - self._bundles.keys()
+            removed = self._bundles.keys() - bundles.keys()
+            self._bundles = bundles
+        if added or removed:
+            LOG.info(
+                f"Reloaded {self.registry}: added {sorted(added)}, removed {sorted(removed)}"
+            )
+
+    def _save_registry(self) -> None:
+        # called with the lock held
+        if self.registry is None:
+            return
+        content = {"bundles": {name: str(path) for name, path in self._bundles.items()}}
+        tmp_path = self.registry.with_name(self.registry.name + ".tmp")
+        tmp_path.write_text(json.dumps(content, indent=2, sort_keys=True))
+        os.replace(tmp_path, self.registry)
+        self._registry_mtime = self.registry.stat().st_mtime_ns
+
+    def _summary(self, zarr_path: Path) -> dict:
+        # recomputed when the bundle is (re)converted, which rewrites its metadata
+        try:
+            version = zipbundle.stat(str(zarr_path / ".zattrs")).st_mtime_ns
+        except OSError:
+            version = 0
+        cached = self._summaries.get(zarr_path)
+        if cached is None or cached[0] != version:
+            cached = (version, bundle_summary(zarr_path))
+            self._summaries[zarr_path] = cached
+        return cached[1]
+
+
+def serve_catalog(
+    catalog: BundleCatalog,
+    host: str = DEFAULT_HOST,
+    port: int = 8000,
+    threaded: bool = True,
+    enable_request_logging: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    engine: str = "threaded",
+    cache_size_mb: float = DEFAULT_CACHE_SIZE_MB,
+    metrics_log_interval: float = DEFAULT_METRICS_LOG_INTERVAL,
+) -> str:
+    """
+    Serve all the bundles of a catalog from a single server, sharing its cache and worker pool.
+
+    The parameters are the same as `serve_directory`, the bundles are served under /<name>/
+    and their summary at /catalog.json.
+
+    Returns
+    -------
+    str
+        The URL of the server.
+    """
+    root = catalog.registry.parent if catalog.registry is not None else Path.cwd()
+    return start_server(
+        root,
+        host,
+        port,
+        threaded=threaded,
+        enable_request_logging=enable_request_logging,
+        max_workers=max_workers,
+        engine=engine,
+        cache_size_mb=cache_size_mb,
+        metrics_log_interval=metrics_log_interval,
+        catalog=catalog,
+    )
+
+
+_shared_lock = threading.Lock()
+_shared_catalog: BundleCatalog | None = None
+_shared_url: str | None = None
+
+
+def serve_bundle(zarr_path: Path, host: str = DEFAULT_HOST, port: int = 8000) -> str:
+    """
+    Serve a bundle from the catalog server of this process, started on first use,
+    so that opening many bundles does not start a server (and use a port) for each of them.
+
+    Parameters
+    ----------
+    zarr_path : Path
+        Path of the bundle
+    host : str, optional
+        Host of the server, by default 127.0.0.1 (only used when starting the server)
+    port : int, optional
+        First port tried when starting the server, by default 8000
+
+    Returns
+    -------
+    str
+        URL of the bundle, with a trailing slash
+    """
+    global _shared_catalog, _shared_url
+    with _shared_lock:
+        if _shared_catalog is None:
+            catalog = BundleCatalog()
+            _shared_url = serve_catalog(
+                catalog, host, port, threaded=True, metrics_log_interval=0
+            )
+            _shared_catalog = catalog
+    name = _shared_catalog.add(zarr_path)
+    return f"{_shared_url}/{urllib.parse.quote(name)}/"
+
+
+def shared_bundle_url(zarr_path: Path) -> str | None:
+    """
+    Serve a bundle from the catalog server of this process (see `serve_bundle`) if it is
+    started, returning the URL of the bundle, or None if the server is not started.
+    """
+    with _shared_lock:
+        started = _shared_catalog is not None
+    return serve_bundle(zarr_path) if started else None
+
+
+def release_bundle(zarr_path: Path) -> None:
+    """
+    Unregister a bundle from the catalog server of this process, if it is registered.
+    """
+    with _shared_lock:
+        catalog = _shared_catalog
+    if catalog is None:
+        return
+    zarr_path = Path(zarr_path).resolve()
+    for name in catalog.names():
+        if catalog.resolve(name) == zarr_path:
+            catalog.remove(name)
+
+
+@click.group("catalog")
+def catalog_cli() -> None:
+    """
+    Serve many bundles on one port from a registry of bundles.
+    """
+
+
+@catalog_cli.command("serve")
+@click.argument("registry", type=click.Path(dir_okay=False, path_type=Path))
+@click.option(
+    "--host",
+    type=str,
+    default=DEFAULT_HOST,
+    help="The host name or IP address (default: 127.0.0.1)",
+)
+@click.option(
+    "--port", type=int, default=8000, help="The port number to serve on (default: 8000)"
+)
+@click.option(
+    "--max_workers",
+    type=int,
+    default=DEFAULT_MAX_WORKERS,
+    help=f"Number of worker threads handling connections (default: {DEFAULT_MAX_WORKERS})",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["threaded", "async"]),
+    default="threaded",
+    help="Server implementation, see `intracktive serve --help` (default: threaded)",
+)
+@click.option(
+    "--cache_size_mb",
+    type=float,
+    default=DEFAULT_CACHE_SIZE_MB,
+    help=f"Size in MB of the in-memory cache of chunk files shared by all bundles, 0 to disable (default: {DEFAULT_CACHE_SIZE_MB})",
+)
+@click.option(
+    "--metrics_log_interval",
+    type=float,
+    default=DEFAULT_METRICS_LOG_INTERVAL,
+    help=f"Seconds between summary logs of the request metrics, 0 to disable (default: {DEFAULT_METRICS_LOG_INTERVAL})",
+)
+def catalog_serve_cli(
+    registry: Path,
+    host: str,
+    port: int,
+    max_workers: int,
+    engine: str,
+    cache_size_mb: float,
+    metrics_log_interval: float,
+) -> None:
+    """
+    Serve the bundles listed in REGISTRY (a JSON file, created if needed) under /<name>/,
+    with their summary at /catalog.json. Changes to REGISTRY (e.g. with `intracktive catalog add`)
+    are picked up without restarting the server.
+    """
+    if not registry.exists():
+        registry.write_text(json.dumps({"bundles": {}}, indent=2))
+    catalog = BundleCatalog(registry)
+    serve_catalog(
+        catalog,
+        host,
+        port,
+        threaded=False,
+        max_workers=max_workers,
+        engine=engine,
+        cache_size_mb=cache_size_mb,
+        metrics_log_interval=metrics_log_interval,
+    )
+
+
+@catalog_cli.command("add")
+@click.argument("registry", type=click.Path(dir_okay=False, path_type=Path))
+@click.argument("bundle", type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--name",
+    type=str,
+    default=None,
+    help="Name of the bundle in the URLs (default: the file name of the bundle)",
+)
+def catalog_add_cli(registry: Path, bundle: Path, name: str | None) -> None:
+    """
+    Add BUNDLE to REGISTRY (created if needed).
+    """
+    try:
+        name = BundleCatalog(registry).add(bundle, name=name)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="BUNDLE")
+    click.echo(name)
+
+
+@catalog_cli.command("remove")
+@click.argument(
+    "registry", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.argument("name", type=str)
+def catalog_remove_cli(registry: Path, name: str) -> None:
+    """
+    Remove the bundle NAME from REGISTRY.
+    """
+    try:
+        BundleCatalog(registry).remove(name)
+    except KeyError as e:
+        raise click.ClickException(e.args[0])
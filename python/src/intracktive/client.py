@@ -0,0 +1,120 @@
+import json
+import urllib.parse
+import urllib.request
+
+import numcodecs
+import numpy as np
+from intracktive.server import MAX_BATCH_CHUNKS, decode_chunk_frames
+
+DEFAULT_TIMEOUT = 30.0
+
+
+def fetch_chunks(
+    bundle_url: str, keys: list[str], timeout: float = DEFAULT_TIMEOUT
+) -> dict[str, bytes | None]:
+    """
+    Fetch multiple chunk files of a bundle served by `intracktive serve` in as few requests as possible.
+
+    Parameters
+    ----------
+    bundle_url : str
+        URL of the bundle, e.g. 'http://127.0.0.1:8000/tracks_bundle.zarr'
+    keys : list[str]
+        Paths of the chunk files relative to the bundle, e.g. ['points/0.0', 'points/1.0']
+    timeout : float, optional
+        Timeout of each request in seconds, by default 30
+
+    Returns
+    -------
+    dict[str, bytes | None]
+        Contents of each chunk file as stored (compressed), or None for missing chunks
+        (chunks that only contain the fill value are not written by zarr)
+    """
+    chunks = {}
+    for start in range(0, len(keys), MAX_BATCH_CHUNKS):
+        query = urllib.parse.urlencode(
+            {"keys": ",".join(keys[start : start + MAX_BATCH_CHUNKS])}
+        )
+        url = f"{bundle_url.rstrip('/')}/query/chunks?{query}"
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            chunks.update(decode_chunk_frames(response.read()))
+    return chunks
+
+
+def chunk_key(array_path: str, meta: dict, index: tuple[int, ...]) -> str:
+    """
+    Key of a chunk of a Zarr v2 array relative to the bundle, e.g. 'points/12.0'.
+    """
+    separator = meta.get("dimension_separator") or "."
+    return f"{array_path.strip('/')}/{separator.join(map(str, index))}"
+
+
+def decode_chunk(meta: dict, data: bytes | None) -> np.ndarray:
+    """
+    Decode a chunk of a Zarr v2 array.
+
+    Parameters
+    ----------
+    meta : dict
+        Metadata of the array (contents of its `.zarray`)
+    data : bytes | None
+        Chunk as stored, or None for a missing chunk (filled with the fill value)
+
+    Returns
+    -------
+    np.ndarray
+        Chunk with the chunk shape of the array
+    """
+    dtype = np.dtype(meta["dtype"])
+    shape = tuple(meta["chunks"])
+    if data is None:
+        fill_value = meta.get("fill_value")
+        return np.full(shape, 0 if fill_value is None else fill_value, dtype=dtype)
+
+    compressor = meta.get("compressor")
+    if compressor:
+        data = numcodecs.get_codec(compressor).decode(data)
+    for f in reversed(meta.get("filters") or []):
+        data = numcodecs.get_codec(f).decode(data)
+    return (
+        np.frombuffer(data, dtype=dtype)
+        .reshape(shape, order=meta.get("order", "C"))
+        .copy()
+    )
+
+
+def fetch_array_chunks(
+    bundle_url: str,
+    array_path: str,
+    chunk_indices: list[tuple[int, ...]],
+    timeout: float = DEFAULT_TIMEOUT,
+) -> dict[tuple[int, ...], np.ndarray]:
+    """
+    Fetch and decode multiple chunks of a (Zarr v2) array of a bundle in a single request.
+
+    Parameters
+    ----------
+    bundle_url : str
+        URL of the bundle, e.g. 'http://127.0.0.1:8000/tracks_bundle.zarr'
+    array_path : str
+        Path of the array in the bundle, e.g. 'points' or 'tracks_to_points/data'
+    chunk_indices : list[tuple[int, ...]]
+        Grid indices of the chunks, e.g. [(t, 0) for t in range(10, 20)] for the points
+        of time points 10 to 19
+    timeout : float, optional
+        Timeout of each request in seconds, by default 30
+
+    Returns
+    -------
+    dict[tuple[int, ...], np.ndarray]
+        Decoded chunk of each grid index, with the chunk shape of the array
+    """
+    array_url = f"{bundle_url.rstrip('/')}/{array_path.strip('/')}"
+    with urllib.request.urlopen(f"{array_url}/.zarray", timeout=timeout) as response:
+        meta = json.loads(response.read())
+
+    keys = {chunk_key(array_path, meta, index): tuple(index) for index in chunk_indices}
+    return {
+        keys[key]: decode_chunk(meta, data)
+        for key, data in fetch_chunks(bundle_url, list(keys), timeout=timeout).items()
+    }
@@ -1,28 +1,86 @@
+import atexit
+import glob
+import gzip
+import hashlib
 import logging
+import shutil
 import tempfile
 import time
+import weakref
 import webbrowser
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable
 
 import click
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv
+import pyarrow.parquet
 import zarr
+from intracktive import zipbundle
 from intracktive.__about__ import __version__
+from intracktive.catalog import release_bundle, serve_bundle
 from intracktive.createHash import generate_viewer_state_hash
 from intracktive.geff import is_geff_dataset, read_geff_to_df
-from intracktive.server import DEFAULT_HOST, find_available_port, serve_directory
+from intracktive.quantize import (
+    delta_encode_values,
+    quantization_params,
+    quantize_values,
+)
+from intracktive.server import (
+    DEFAULT_HOST,
+    MIN_COMPRESS_SIZE,
+    SIDECAR_ENCODINGS,
+    begin_pending_bundle,
+    complete_pending_directory,
+    end_pending_bundle,
+    find_available_port,
+    is_compressible,
+    notify_pending_bundles,
+    serve_directory,
+)
+from intracktive.zipbundle import ZIP_SUFFIX, pack_bundle
 from scipy.sparse import csr_matrix, lil_matrix
 from skimage.util._map_array import ArrayMap
 
 REQUIRED_COLUMNS = ["track_id", "t", "z", "y", "x", "parent_track_id"]
 INF_SPACE = -9999.9
 VALID_ATTRIBUTE_TYPES = ["continuous", "categorical", "hex"]
+TABLE_EXTENSIONS = [".csv", ".parquet"]
+GLOB_CHARACTERS = ("*", "?", "[")
+# rows (e.g. time points of `points`) of an array written at once by `ProgressiveBundleWriter`
+PROGRESSIVE_BLOCK_ROWS = 64
+# stages of a conversion, in order, reported to the `progress` callback of the conversion functions
+CONVERSION_STAGES = (
+    "relabeling",
+    "points",
+    "attributes",
+    "sparse arrays",
+    "lineage",
+    "writing",
+)
+# version of the bundles with the ragged layout of the points (see `build_bundle`), stored in
+# their root attributes as `bundle_version`; bundles without it are padded (version 1)
+RAGGED_BUNDLE_VERSION = 2
+# rows (points) of a chunk of the arrays of a ragged bundle
+RAGGED_CHUNK_ROWS = 4096
+# number of in-memory bundles of DataFrames opened with `dataframe_to_browser` kept mounted
+DATAFRAME_CACHE_SIZE = 8
 
 LOG = logging.getLogger(__name__)
 LOG.setLevel(logging.INFO)
 
+# virtual bundles of the DataFrames opened with `dataframe_to_browser`, by fingerprint
+_dataframe_bundles: OrderedDict = OrderedDict()
+# private directory where they are mounted, made once per process
+_dataframe_dir: Path | None = None
+# bundles of the napari tracks converted with `tracks_layer_to_bundle`, by identity of their data
+_layer_bundles: OrderedDict = OrderedDict()
+
 # Note: Zarr 3.x introduced a new storage format that changes the directory structure:
 # - Zarr 2.x: .zarray, .zattrs, and numerical chunk files (0.0, 1.0, etc.)
 # - Zarr 3.x: zarr.json, and c/ directory with numbered subdirectories (0, 1, 2, etc.)
@@ -64,6 +122,87 @@ def _transitive_closure(
     return graph
 
 
+def _relabel_tracks(
+    track_ids: np.ndarray, parent_track_ids: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Relabel the track ids from 1 to N, in order of first appearance (-1 stays -1).
+    """
+    uniq_track_ids = pd.unique(track_ids)
+    extended_uniq_track_ids = np.append(
+        uniq_track_ids, -1
+    )  # include -1 for orphaned tracklets
+    fwd_map = ArrayMap(
+        extended_uniq_track_ids, np.append(np.arange(1, 1 + len(uniq_track_ids)), -1)
+    )
+    # orphaned are set to 0 according to skimage convention
+    return fwd_map[track_ids], fwd_map[parent_track_ids]
+
+
+def _lineage_matrix(
+    track_ids: np.ndarray, parent_track_ids: np.ndarray, n_tracklets: int
+) -> csr_matrix:
+    """
+    Matrix of the ancestors and descendants of each track (`tracks_to_tracks`), whose values
+    are the parent track id of the related track.
+
+    Parameters
+    ----------
+    track_ids, parent_track_ids : np.ndarray
+        Unique edges (relabeled track id, parent track id) of the tracks
+    n_tracklets : int
+        Number of tracks
+    """
+    has_parent = parent_track_ids > 0  # only the tracks with a parent
+    children = track_ids[has_parent]
+    parents = parent_track_ids[has_parent]
+
+    tracks_to_children = lil_matrix((n_tracklets, n_tracklets), dtype=np.int32)
+    tracks_to_children[children - 1, parents - 1] = 1
+    tracks_to_children = _transitive_closure(tracks_to_children, "forward")
+
+    tracks_to_parents = lil_matrix((n_tracklets, n_tracklets), dtype=np.int32)
+    tracks_to_parents[parents - 1, children - 1] = 1
+    tracks_to_parents = _transitive_closure(tracks_to_parents, "backward")
+
+    tracks_to_tracks = (tracks_to_parents + tracks_to_children).tolil()
+    tracks_edges_map = {int(k): int(v) for k, v in zip(track_ids, parent_track_ids)}
+
+    non_zero = tracks_to_tracks.nonzero()
+
+    for i in range(len(non_zero[0])):
+        tracks_to_tracks[non_zero[0][i], non_zero[1][i]] = tracks_edges_map[
+            non_zero[1][i] + 1
+        ]
+
+    return tracks_to_tracks.tocsr()
+
+
+def _cached_stage(
+    stage_cache: dict | None, name: str, inputs: tuple[np.ndarray, ...], compute
+):
+    """
+    Result of a stage of `build_bundle`, reused from `stage_cache` when the inputs of the stage
+    are the same as in the previous build (e.g. when a file is reconverted after its coordinates
+    changed, the relabeling and the lineage are reused).
+    """
+    if stage_cache is None:
+        return compute()
+    digest = hashlib.blake2b(digest_size=16)
+    for array in inputs:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype}{array.shape}".encode())
+        digest.update(array.view(np.uint8).ravel())
+    key = digest.hexdigest()
+    cached = stage_cache.get(name)
+    if cached is not None and cached[0] == key:
+        LOG.info(f"Reusing the {name} of the previous conversion")
+        return cached[1]
+    result = compute()
+    stage_cache[name] = (key, result)
+    return result
+
+
 def get_unique_zarr_path(zarr_path: Path) -> Path:
     """
     Ensure the Zarr path is unique by appending a counter to the name
@@ -214,37 +353,176 @@ def validate_coordinates(df, threshold=-9000):
     return False
 
 
-def convert_dataframe_to_zarr(
+class BundleData:
+    """
+    Arrays and attributes of a bundle, before they are written to a Zarr store.
+
+    Groups and arrays are added in the order they are built by `build_bundle`, which calls
+    `on_add` (if given) with the path of each of them, e.g. to write them as soon as they are
+    built (see `ProgressiveBundleWriter`).
+
+    Attributes
+    ----------
+    arrays : dict[str, tuple[np.ndarray, tuple[int, ...] | None]]
+        Data and chunk shape (None for the chunks chosen by zarr) of each array,
+        by path in the bundle (e.g. 'tracks_to_points/indices'), in the order they are added
+    groups : list[str]
+        Paths of the groups of the bundle (e.g. 'tracks_to_points')
+    attrs : dict[str, dict]
+        Attributes of the bundle ('' for the top-level group), of its groups and of its arrays
+    """
+
+    def __init__(self, on_add: Callable[[str], None] | None = None) -> None:
+        self.arrays: dict[str, tuple[np.ndarray, tuple[int, ...] | None]] = {}
+        self.groups: list[str] = []
+        self.attrs: dict[str, dict] = {"": {}}
+        self.on_add = on_add
+
+    def add_array(
+        self,
+        path: str,
+        data: np.ndarray,
+        chunks: tuple[int, ...] | None = None,
+        attrs: dict | None = None,
+    ) -> None:
+        self.arrays[path] = (data, chunks)
+        self.attrs[path] = dict(attrs or {})
+        if self.on_add is not None:
+            self.on_add(path)
+
+    def add_group(self, path: str, attrs: dict | None = None) -> None:
+        self.groups.append(path)
+        self.attrs[path] = dict(attrs or {})
+        if self.on_add is not None:
+            self.on_add(path)
+
+
+def encode_string_column(df: pd.DataFrame, col: str) -> dict | None:
+    """
+    Encode a column of strings to integer codes (in place), for a categorical attribute.
+
+    Returns
+    -------
+    dict | None
+        The string of each code, or None if the column does not contain strings
+    """
+    if pd.api.types.is_string_dtype(df[col]) or pd.api.types.is_object_dtype(df[col]):
+        # Check if actually contains strings
+        if df[col].dropna().apply(lambda x: isinstance(x, str)).any():
+            LOG.info(f"Encoding string column '{col}' to integers")
+            # Convert to categorical and get codes
+            df[col] = df[col].astype("category")
+            mapping = {i: cat for i, cat in enumerate(df[col].cat.categories)}
+            df[col] = df[col].cat.codes.astype(float)
+            return mapping
+    return None
+
+
+def normalize_attribute(attribute_array: np.ndarray, col: str) -> np.ndarray:
+    """
+    Normalize the values of a continuous or categorical attribute to [0, 1], leaving the
+    INF_SPACE padding as is.
+    """
+    # Handle infinite and NaN values BEFORE normalization
+    neg_inf_mask = np.isneginf(attribute_array)
+    pos_inf_mask = np.isposinf(attribute_array)
+    nan_mask = np.isnan(attribute_array)
+    has_inf_or_nan = np.any(neg_inf_mask) or np.any(pos_inf_mask) or np.any(nan_mask)
+
+    if has_inf_or_nan:
+        # Set problematic values to safe values before normalization
+        attribute_array[neg_inf_mask] = 0.0
+        attribute_array[pos_inf_mask] = 1.0
+        attribute_array[nan_mask] = 0.0
+
+        LOG.info(
+            f"Attribute '{col}' had infinite or NaN values: -inf→0, +inf→1, NaN→0.0"
+        )
+
+    # Now normalize all values (excluding INF_SPACE values)
+    # Get only the actual data values (not the padding INF_SPACE values)
+    actual_data_mask = attribute_array != INF_SPACE
+    if np.any(actual_data_mask):
+        actual_data = attribute_array[actual_data_mask]
+        attr_min = actual_data.min()
+        attr_max = actual_data.max()
+
+        # Check for constant data
+        if attr_max == attr_min:
+            # For constant data, set all actual data values to 0.5 (middle of range)
+            attribute_array[actual_data_mask] = 0.5
+        else:
+            # Normalize only the actual data values
+            attribute_array[actual_data_mask] = (actual_data - attr_min) / (
+                attr_max - attr_min
+            )
+    else:
+        # No actual data, set everything to 0.5
+        attribute_array = np.full_like(attribute_array, 0.5)
+
+    return attribute_array
+
+
+def build_bundle(
     df: pd.DataFrame,
-    zarr_path: Path,
     add_radius: bool = False,
     extra_cols: Iterable[str] = (),
     attribute_types: Iterable[str] = (),
     calc_velocity: bool = False,
     velocity_smoothing_windowsize: int = 1,
-    overwrite_zarr: bool = False,
-) -> Path:
+    bundle: BundleData | None = None,
+    stage_cache: dict | None = None,
+    progress: Callable[[str], None] | None = None,
+    ragged: bool = False,
+    quantize: bool = False,
+    delta_encode: bool = False,
+) -> BundleData:
     """
-    Convert a DataFrame of tracks to a sparse Zarr store
+    Build the arrays of a bundle from a DataFrame of tracks, without writing them.
+
+    The arrays are added to the bundle as soon as they are built: the points and attributes
+    first, then the sparse arrays, and the lineage (`tracks_to_tracks`) last.
+
+    By default, `points` has one row per time point, padded with `INF_SPACE` to the number of
+    points of the busiest time point, and the id of a point is
+    `time index * max points per time point + index in the time point`.
+    With the ragged layout (bundle version `RAGGED_BUNDLE_VERSION`), `points` has one row per
+    point, the points of the time index `t` are the rows `time_offsets[t]:time_offsets[t + 1]`,
+    and the id of a point is its row. `attributes` has the same layout as `points`, with the
+    attributes side by side (in the order of `attribute_names`), chunked per attribute.
+
+    With `quantize`, the coordinates of `points` and `tracks_to_points/data` are stored as
+    uint16, the coordinate of a stored value `q` being `q * scale + offset`, with `scale`,
+    `offset` and the error bound `max_error` (`scale / 2`, i.e. 1 / 131068 of the range of the
+    coordinates) in the `quantization` attribute of the arrays (see `intracktive.quantize`).
+    With `delta_encode`, `tracks_to_points/data` stores the difference between the consecutive
+    points of each track instead, as int16 (`"delta": true` in its `quantization` attribute).
+
+    See `convert_dataframe_to_zarr` for the other parameters.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        DataFrame containing the tracks must have the following columns:
-        - track_id: int
-        - t: int
-        - z: float
-        - y: float
-        - x: float
-        - parent_track_id: int
-    zarr_path : Path
-        Path to the zarr store, including name of Zarr store ('example: /path/to/zarr_bundle.zarr')
-    extra_cols : Iterable[str], optional
-        List of extra columns to include in the Zarr store, by default ()
-    overwrite_zarr : bool, optional
-        Whether to overwrite an existing Zarr store at the specified path.
-        If False (default), a unique path will be generated by appending a counter.
-        If True, the existing Zarr store will be overwritten.
+    bundle : BundleData | None, optional
+        Bundle to add the arrays to, by default a new one
+    stage_cache : dict | None, optional
+        Results of the relabeling and lineage stages of a previous build, reused when their
+        inputs did not change, and updated (by default, no cache)
+    progress : Callable[[str], None] | None, optional
+        Called with the name of each stage of `CONVERSION_STAGES` when it starts (all but
+        "writing"). An exception raised by the callback aborts the build, e.g. to cancel it.
+    ragged : bool, optional
+        Whether to store the points without padding, with their offset per time point,
+        by default False
+    quantize : bool, optional
+        Whether to store the coordinates as 16-bit integers, by default False
+    delta_encode : bool, optional
+        Whether to delta encode the quantized coordinates of the points of the tracks,
+        by default False (requires `quantize`)
+
+    Returns
+    -------
+    BundleData
+        Arrays and attributes of the bundle
     """
     start = time.monotonic()
 
@@ -267,6 +545,9 @@ def convert_dataframe_to_zarr(
     if calc_velocity and velocity_smoothing_windowsize < 1:
         raise ValueError("velocity_smoothing_windowsize must be >= 1")
 
+    if delta_encode and not quantize:
+        raise ValueError("delta_encode requires quantize")
+
     points_cols = (
         ["z", "y", "x", "radius"] if add_radius else ["z", "y", "x"]
     )  # columns to store in the points array
@@ -314,86 +595,148 @@ def convert_dataframe_to_zarr(
         )
 
     start = time.monotonic()
+    if progress is not None:
+        progress("relabeling")
 
     n_time_points = len(df["t"].unique())
     max_values_per_time_point = int(df.groupby("t").size().max())
 
-    uniq_track_ids = df["track_id"].unique()
-    extended_uniq_track_ids = np.append(
-        uniq_track_ids, -1
-    )  # include -1 for orphaned tracklets
-    fwd_map = ArrayMap(
-        extended_uniq_track_ids, np.append(np.arange(1, 1 + len(uniq_track_ids)), -1)
+    track_ids = df["track_id"].to_numpy(copy=True)
+    parent_track_ids = df["parent_track_id"].to_numpy(copy=True)
+    # the tracks are relabeled in order of first appearance
+    original_track_ids = pd.unique(track_ids)
+    track_ids, parent_track_ids = _cached_stage(
+        stage_cache,
+        "relabeling",
+        (track_ids, parent_track_ids),
+        lambda: _relabel_tracks(track_ids, parent_track_ids),
     )
-
-    # relabeling from 0 to N-1
-    df.loc[:, "track_id"] = fwd_map[df["track_id"].to_numpy(copy=True)]
-    # orphaned are set to 0 according to skimage convention
-    df.loc[:, "parent_track_id"] = fwd_map[df["parent_track_id"].to_numpy(copy=True)]
+    df.loc[:, "track_id"] = track_ids
+    df.loc[:, "parent_track_id"] = parent_track_ids
 
     n_tracklets = df["track_id"].nunique()
     # (z, y, x) + extra_cols
     num_values_per_point = 4 if add_radius else 3
 
+    if progress is not None:
+        progress("points")
+
+    # Create a mapping from time values to consecutive integer indices
+    unique_times = sorted(df["t"].unique())
+    time_to_index = {time_val: idx for idx, time_val in enumerate(unique_times)}
+    # first point id of each time point (and the number of point ids)
+    if ragged:
+        time_offsets = np.zeros(n_time_points + 1, dtype=np.int32)
+        time_offsets[1:] = np.cumsum(df.groupby("t").size().to_numpy())
+    else:
+        time_offsets = np.arange(n_time_points + 1) * max_values_per_time_point
+    n_point_ids = int(time_offsets[-1])
+
     # store the points in an array
-    points_array = (
-        np.ones(
-            (n_time_points, num_values_per_point * max_values_per_time_point),
-            dtype=np.float32,
+    if ragged:
+        points_array = np.empty((n_point_ids, num_values_per_point), dtype=np.float32)
+        attribute_array_empty = np.full(n_point_ids, INF_SPACE, dtype=np.float32)
+    else:
+        points_array = (
+            np.ones(
+                (n_time_points, num_values_per_point * max_values_per_time_point),
+                dtype=np.float32,
+            )
+            * INF_SPACE
         )
-        * INF_SPACE
-    )
-    attribute_array_empty = (
-        np.ones(
-            (n_time_points, max_values_per_time_point),
-            dtype=np.float32,
+        attribute_array_empty = (
+            np.ones(
+                (n_time_points, max_values_per_time_point),
+                dtype=np.float32,
+            )
+            * INF_SPACE
         )
-        * INF_SPACE
-    )
     attribute_arrays = {}
 
-    points_to_tracks = lil_matrix(
-        (n_time_points * max_values_per_time_point, n_tracklets), dtype=np.int32
-    )
-
-    # Create a mapping from time values to consecutive integer indices
-    unique_times = sorted(df["t"].unique())
-    time_to_index = {time_val: idx for idx, time_val in enumerate(unique_times)}
+    points_to_tracks = lil_matrix((n_point_ids, n_tracklets), dtype=np.int32)
 
     # inserting points to buffer
     for t, group in df.groupby("t"):
         group_size = int(len(group))
         t_idx = time_to_index[t]
-        points_array[t_idx, : group_size * num_values_per_point] = (
-            group[points_cols].to_numpy().ravel()
-        )
-
-        points_ids = t_idx * max_values_per_time_point + np.arange(group_size)
+        points_ids = time_offsets[t_idx] + np.arange(group_size)
+        if ragged:
+            points_array[points_ids] = group[points_cols].to_numpy()
+        else:
+            points_array[t_idx, : group_size * num_values_per_point] = (
+                group[points_cols].to_numpy().ravel()
+            )
 
         points_to_tracks[points_ids, group["track_id"] - 1] = 1
 
+    if bundle is None:
+        bundle = BundleData()
+    # Add inTRACKtive version to the top-level group attributes
+    bundle.attrs[""]["intracktive_version"] = __version__
+    if ragged:
+        bundle.attrs[""]["bundle_version"] = RAGGED_BUNDLE_VERSION
+    for name in ("points_to_tracks", "tracks_to_points", "tracks_to_tracks"):
+        bundle.add_group(name, attrs={"sparse_format": "csr"})
+
+    mean = df[["z", "y", "x"]].mean()
+    extent = (df[["z", "y", "x"]] - mean).abs().max()
+    extent_xyz = extent.max()
+
+    points_attrs = {"values_per_point": num_values_per_point}
+    for col in ("z", "y", "x"):
+        points_attrs[f"mean_{col}"] = mean[col]
+    points_attrs["extent_xyz"] = extent_xyz
+    points_attrs["fields"] = points_cols
+    points_attrs["ndim"] = 2 if flag_2D else 3
+    stored_points = points_array
+    if quantize:
+        # the padding keeps its own value, outside of the range of the coordinates
+        valid_points = points_array != INF_SPACE
+        quantization = quantization_params(points_array[valid_points])
+        stored_points = quantize_values(points_array, quantization, valid_points)
+        points_attrs["quantization"] = quantization
+    if ragged:
+        points_attrs["layout"] = "ragged"
+        points_attrs["max_points_per_time_point"] = max_values_per_time_point
+        bundle.add_array(
+            "points",
+            stored_points,
+            chunks=(RAGGED_CHUNK_ROWS, num_values_per_point),
+            attrs=points_attrs,
+        )
+        bundle.add_array("time_offsets", time_offsets)
+    else:
+        bundle.add_array(
+            "points",
+            stored_points,
+            chunks=(1, points_array.shape[1]),
+            attrs=points_attrs,
+        )
+    # original track id of each track and time of each time index, to match the rows of a
+    # table of (track_id, t) with the points (see `intracktive.attributes`)
+    bundle.add_array("track_ids", original_track_ids)
+    bundle.add_array("times", np.asarray(unique_times))
+
+    if progress is not None:
+        progress("attributes")
+
     # Encode string categorical columns to integers
     string_mappings = {}
     for col in extra_cols:
-        if pd.api.types.is_string_dtype(df[col]) or pd.api.types.is_object_dtype(
-            df[col]
-        ):
-            # Check if actually contains strings
-            if df[col].dropna().apply(lambda x: isinstance(x, str)).any():
-                LOG.info(f"Encoding string column '{col}' to integers")
-                # Convert to categorical and get codes
-                df[col] = df[col].astype("category")
-                string_mappings[col] = {
-                    i: cat for i, cat in enumerate(df[col].cat.categories)
-                }
-                df[col] = df[col].cat.codes.astype(float)
+        mapping = encode_string_column(df, col)
+        if mapping is not None:
+            string_mappings[col] = mapping
 
     for col in extra_cols:
         attribute_array = attribute_array_empty.copy()
         for t, group in df.groupby("t"):
             group_size = int(len(group))
             t_idx = time_to_index[t]
-            attribute_array[t_idx, :group_size] = group[col].to_numpy().ravel()
+            if ragged:
+                offset = time_offsets[t_idx]
+                attribute_array[offset : offset + group_size] = group[col].to_numpy()
+            else:
+                attribute_array[t_idx, :group_size] = group[col].to_numpy().ravel()
 
         # Normalize the attribute if not pre-normalized and not a hex attribute
         col_idx = list(extra_cols).index(col)
@@ -401,230 +744,421 @@ def convert_dataframe_to_zarr(
 
         # Only normalize continuous and discrete types, not hex
         if col_type in ["continuous", "categorical"]:
-            # Handle infinite and NaN values BEFORE normalization
-            neg_inf_mask = np.isneginf(attribute_array)
-            pos_inf_mask = np.isposinf(attribute_array)
-            nan_mask = np.isnan(attribute_array)
-            has_inf_or_nan = (
-                np.any(neg_inf_mask) or np.any(pos_inf_mask) or np.any(nan_mask)
-            )
-
-            if has_inf_or_nan:
-                # Set problematic values to safe values before normalization
-                attribute_array[neg_inf_mask] = 0.0
-                attribute_array[pos_inf_mask] = 1.0
-                attribute_array[nan_mask] = 0.0
-
-                LOG.info(
-                    f"Attribute '{col}' had infinite or NaN values: -inf→0, +inf→1, NaN→0.0"
-                )
-
-            # Now normalize all values (excluding INF_SPACE values)
-            # Get only the actual data values (not the padding INF_SPACE values)
-            actual_data_mask = attribute_array != INF_SPACE
-            if np.any(actual_data_mask):
-                actual_data = attribute_array[actual_data_mask]
-                attr_min = actual_data.min()
-                attr_max = actual_data.max()
-
-                # Check for constant data
-                if attr_max == attr_min:
-                    # For constant data, set all actual data values to 0.5 (middle of range)
-                    attribute_array[actual_data_mask] = 0.5
-                else:
-                    # Normalize only the actual data values
-                    attribute_array[actual_data_mask] = (actual_data - attr_min) / (
-                        attr_max - attr_min
-                    )
-            else:
-                # No actual data, set everything to 0.5
-                attribute_array = np.full_like(attribute_array, 0.5)
+            attribute_array = normalize_attribute(attribute_array, col)
 
         attribute_arrays[col] = attribute_array
 
     LOG.info(f"Munged {len(df)} points in {time.monotonic() - start} seconds")
 
-    # creating mapping of tracklets parent-child relationship
-    tracks_edges_all = df[
-        ["track_id", "parent_track_id"]
-    ].drop_duplicates()  # all unique edges
-    tracks_edges = tracks_edges_all[
-        tracks_edges_all["parent_track_id"] > 0
-    ]  # only the tracks with a parent
-
-    tracks_to_children = lil_matrix((n_tracklets, n_tracklets), dtype=np.int32)
-    tracks_to_children[
-        tracks_edges["track_id"] - 1, tracks_edges["parent_track_id"] - 1
-    ] = 1
-    tracks_to_children = _transitive_closure(tracks_to_children, "forward")
-
-    tracks_to_parents = lil_matrix((n_tracklets, n_tracklets), dtype=np.int32)
-    tracks_to_parents[
-        tracks_edges["parent_track_id"] - 1, tracks_edges["track_id"] - 1
-    ] = 1
-    tracks_to_parents = _transitive_closure(tracks_to_parents, "backward")
-    start = time.monotonic()
-
-    tracks_to_tracks = (tracks_to_parents + tracks_to_children).tolil()
-    tracks_edges_map = {
-        int(k): int(v)
-        for k, v in zip(
-            tracks_edges_all["track_id"].to_numpy(),
-            tracks_edges_all["parent_track_id"].to_numpy(),
+    if len(extra_cols) > 0:
+        # each chunk holds the values of a single attribute, so the viewer only fetches the
+        # attribute used for coloring
+        if ragged:
+            # one column per attribute
+            attributes_matrix = np.column_stack(
+                [attribute_arrays[attr] for attr in attribute_arrays]
+            )
+            attributes_chunks = (RAGGED_CHUNK_ROWS, 1)
+        else:
+            # one block of max points per time point columns per attribute
+            attributes_matrix = np.hstack(
+                [attribute_arrays[attr] for attr in attribute_arrays]
+            )
+            attributes_chunks = (1, max_values_per_time_point)
+        attributes_attrs = {
+            "attribute_names": extra_cols,
+            "attribute_types": attribute_types,
+            "pre_normalized": True,  # Always True since normalization is handled here
+        }
+        if string_mappings:
+            attributes_attrs["string_mappings"] = string_mappings
+        bundle.add_array(
+            "attributes",
+            attributes_matrix,
+            chunks=attributes_chunks,
+            attrs=attributes_attrs,
         )
-    }
-
-    non_zero = tracks_to_tracks.nonzero()
 
-    for i in range(len(non_zero[0])):
-        tracks_to_tracks[non_zero[0][i], non_zero[1][i]] = tracks_edges_map[
-            non_zero[1][i] + 1
-        ]
+    start = time.monotonic()
+    if progress is not None:
+        progress("sparse arrays")
 
     # Convert to CSR format for efficient row slicing
     tracks_to_points = points_to_tracks.T.tocsr()
     points_to_tracks = points_to_tracks.tocsr()
-    tracks_to_tracks = tracks_to_tracks.tocsr()
-
-    LOG.info(
-        f"Parsed dataframe and converted to CSR data structures in {time.monotonic() - start} seconds"
-    )
-    start = time.monotonic()
 
-    # Ensure the Zarr path is unique (unless overwrite is requested)
-    if not overwrite_zarr:
-        zarr_path = get_unique_zarr_path(zarr_path)
+    bundle.add_array("points_to_tracks/indices", points_to_tracks.indices)
+    bundle.add_array("points_to_tracks/indptr", points_to_tracks.indptr)
 
-    LOG.info(f"Saving to Zarr at {zarr_path}")
+    # TODO: tracks_to_points may want to store xyz for the points, not just the indices
+    # this would make the indices array 3x (4x?) larger, but would eliminate the need to
+    # fetch coordinates again based on point IDs
+    bundle.add_array("tracks_to_points/indices", tracks_to_points.indices)
+    bundle.add_array("tracks_to_points/indptr", tracks_to_points.indptr)
+    if ragged:
+        tracks_to_points_xyz = points_array[tracks_to_points.indices, :3]
+    else:
+        tracks_to_points_xyz = np.zeros(
+            (len(tracks_to_points.indices), 3), dtype=np.float32
+        )
+        for i, ind in enumerate(tracks_to_points.indices):
+            t, n = divmod(ind, max_values_per_time_point)
+            tracks_to_points_xyz[i] = points_array[
+                t, num_values_per_point * n : num_values_per_point * (n + 1)
+            ][:3]
+
+    tracks_to_points_attrs = {}
+    if quantize:
+        tracks_to_points_xyz = quantize_values(tracks_to_points_xyz, quantization)
+        tracks_to_points_attrs["quantization"] = quantization
+        if delta_encode:
+            encoded = delta_encode_values(
+                tracks_to_points_xyz, np.diff(tracks_to_points.indptr)
+            )
+            if encoded is None:
+                LOG.warning(
+                    "Points of a track are too far apart to be delta encoded, "
+                    "storing tracks_to_points/data without delta encoding"
+                )
+            else:
+                tracks_to_points_xyz = encoded
+                tracks_to_points_attrs["quantization"] = {**quantization, "delta": True}
 
-    # save the points array
-    top_level_group: zarr.Group = zarr.group(
-        zarr_path.as_posix(),  # Direct path, no DirectoryStore wrapper
-        overwrite=True,
-        zarr_format=2,  # Use Zarr format 2 to maintain backward compatibility
+    # TODO: figure out better chunking?
+    bundle.add_array(
+        "tracks_to_points/data",
+        tracks_to_points_xyz,
+        chunks=(2048, 3),
+        attrs=tracks_to_points_attrs,
     )
 
-    # Add inTRACKtive version to the top-level group attributes
-    top_level_group.attrs["intracktive_version"] = __version__
+    if progress is not None:
+        progress("lineage")
 
-    points = top_level_group.create_array(
-        "points",
-        data=points_array,
-        chunks=(1, points_array.shape[1]),
+    # creating mapping of tracklets parent-child relationship
+    tracks_edges_all = df[
+        ["track_id", "parent_track_id"]
+    ].drop_duplicates()  # all unique edges
+    edge_track_ids = tracks_edges_all["track_id"].to_numpy()
+    edge_parent_track_ids = tracks_edges_all["parent_track_id"].to_numpy()
+    tracks_to_tracks = _cached_stage(
+        stage_cache,
+        "lineage",
+        (edge_track_ids, edge_parent_track_ids),
+        lambda: _lineage_matrix(edge_track_ids, edge_parent_track_ids, n_tracklets),
     )
-    points.attrs["values_per_point"] = num_values_per_point
 
-    if len(extra_cols) > 0:
-        attributes_matrix = np.hstack(
-            [attribute_arrays[attr] for attr in attribute_arrays]
-        )
-        attributes = top_level_group.create_array(
-            "attributes",
-            data=attributes_matrix,
-            chunks=(1, attribute_array.shape[1]),
-        )
-        attributes.attrs["attribute_names"] = extra_cols
-        attributes.attrs["attribute_types"] = attribute_types
-        attributes.attrs["pre_normalized"] = (
-            True  # Always True since normalization is handled here
-        )
-        if string_mappings:
-            attributes.attrs["string_mappings"] = string_mappings
+    bundle.add_array("tracks_to_tracks/indices", tracks_to_tracks.indices)
+    bundle.add_array("tracks_to_tracks/indptr", tracks_to_tracks.indptr)
+    bundle.add_array("tracks_to_tracks/data", tracks_to_tracks.data)
 
-    mean = df[["z", "y", "x"]].mean()
-    extent = (df[["z", "y", "x"]] - mean).abs().max()
-    extent_xyz = extent.max()
+    LOG.info(
+        f"Parsed dataframe and converted to CSR data structures in {time.monotonic() - start} seconds"
+    )
 
-    for col in ("z", "y", "x"):
-        points.attrs[f"mean_{col}"] = mean[col]
+    return bundle
 
-    points.attrs["extent_xyz"] = extent_xyz
-    points.attrs["fields"] = points_cols
-    points.attrs["ndim"] = 2 if flag_2D else 3
 
-    top_level_group.create_group("points_to_tracks")
-    top_level_group.create_group("tracks_to_points")
-    top_level_group.create_group("tracks_to_tracks")
+def write_bundle(bundle: BundleData, store, write_data: bool = True) -> zarr.Group:
+    """
+    Write the arrays of a bundle to a Zarr (v2) store.
 
-    # TODO: tracks_to_points may want to store xyz for the points, not just the indices
-    # this would make the indices array 3x (4x?) larger, but would eliminate the need to
-    # fetch coordinates again based on point IDs
-    tracks_to_points_zarr = top_level_group["tracks_to_points"]
-    tracks_to_points_zarr.attrs["sparse_format"] = "csr"
-    tracks_to_points_zarr.create_array("indices", data=tracks_to_points.indices)
-    tracks_to_points_zarr.create_array("indptr", data=tracks_to_points.indptr)
-    tracks_to_points_xyz = np.zeros(
-        (len(tracks_to_points.indices), 3), dtype=np.float32
-    )
-    for i, ind in enumerate(tracks_to_points.indices):
-        t, n = divmod(ind, max_values_per_time_point)
-        tracks_to_points_xyz[i] = points_array[
-            t, num_values_per_point * n : num_values_per_point * (n + 1)
-        ][:3]
+    Parameters
+    ----------
+    bundle : BundleData
+        Arrays and attributes of the bundle
+    store : str | zarr.abc.store.Store
+        Path of the Zarr store, or store
+    write_data : bool, optional
+        Whether to write the chunks of the arrays, by default True.
+        If False, only the metadata of the bundle is written.
 
-    # TODO: figure out better chunking?
-    tracks_to_points_zarr.create_array(
-        "data",
-        data=tracks_to_points_xyz,
-        chunks=(2048, 3),
+    Returns
+    -------
+    zarr.Group
+        Top-level group of the bundle
+    """
+    top_level_group: zarr.Group = zarr.group(
+        store,
+        overwrite=True,
+        zarr_format=2,  # Use Zarr format 2 to maintain backward compatibility
     )
+    top_level_group.attrs.update(bundle.attrs[""])
 
-    points_to_tracks_zarr = top_level_group["points_to_tracks"]
-    points_to_tracks_zarr.attrs["sparse_format"] = "csr"
-    points_to_tracks_zarr.create_array("indices", data=points_to_tracks.indices)
-    points_to_tracks_zarr.create_array("indptr", data=points_to_tracks.indptr)
-
-    tracks_to_tracks_zarr = top_level_group["tracks_to_tracks"]
-    tracks_to_tracks_zarr.attrs["sparse_format"] = "csr"
-    tracks_to_tracks_zarr.create_array("indices", data=tracks_to_tracks.indices)
-    tracks_to_tracks_zarr.create_array("indptr", data=tracks_to_tracks.indptr)
-    tracks_to_tracks_zarr.create_array("data", data=tracks_to_tracks.data)
+    for path in bundle.groups:
+        group = top_level_group.create_group(path)
+        if bundle.attrs.get(path):
+            group.attrs.update(bundle.attrs[path])
 
-    LOG.info(f"Saved to Zarr in {time.monotonic() - start} seconds")
+    for path, (data, chunks) in bundle.arrays.items():
+        chunks = "auto" if chunks is None else chunks
+        if write_data:
+            array = top_level_group.create_array(path, data=data, chunks=chunks)
+        else:
+            array = top_level_group.create_array(
+                path, shape=data.shape, dtype=data.dtype, chunks=chunks
+            )
+        if bundle.attrs.get(path):
+            array.attrs.update(bundle.attrs[path])
 
-    return zarr_path
+    return top_level_group
 
 
-def zarr_to_browser(
-    zarr_path: Path,
-    flag_open_browser: bool = True,
-    threaded: bool = True,
-) -> None:
+class ProgressiveBundleWriter:
     """
-    Open a Zarr store in inTRACKtive in the browser. This function will
-    1) host the zarr path as localhost, 2) open the localhost in the browser with inTRACKtive.
+    Write a bundle while it is built, so it can be served before the conversion is done.
+
+    Each group and array of `bundle` is written as soon as `build_bundle` adds it, the rows
+    of an array in blocks (so the first time points of `points` are written first).
+    The servers hold the requests for the files that are not written yet until they are
+    (see `server.begin_pending_bundle`), instead of answering 404. Pass `progress` to
+    `build_bundle`, so that the requests for the optional arrays the bundle does not have
+    (e.g. `attributes`) fail as soon as their stage is over, rather than at the end of the
+    conversion.
 
     Parameters
     ----------
     zarr_path : Path
-        The full path to the Zarr store (including the .zarr extension)
-    flag_open_browser : bool, optional
-        Whether to automatically open the browser, by default True
-    threaded : bool, optional
-        Whether to run the server in a separate thread, by default True
+        Path of the bundle, which is overwritten
+    block_rows : int, optional
+        Number of rows of an array written at once, by default 64
+
+    Examples
+    --------
+    >>> writer = ProgressiveBundleWriter(zarr_path)
+    >>> try:
+    ...     build_bundle(df, bundle=writer.bundle, progress=writer.progress)
+    ... finally:
+    ...     writer.close()
     """
-    zarr_dir = zarr_path.parent
 
-    # Check if a bundled frontend is available (packaged alongside the Python code).
-    # When available, we serve it from a local HTTP server so that the browser can
-    # load both the app and the Zarr data over HTTP.  This avoids the mixed-content
-    # block that Safari (and strict HTTPS contexts) enforce when an HTTPS page tries
-    # to fetch resources from an HTTP localhost server.
-    frontend_path = Path(__file__).parent / "frontend"
-    use_local_frontend = (
-        frontend_path.exists() and (frontend_path / "index.html").exists()
-    )
+    def __init__(self, zarr_path: Path, block_rows: int = PROGRESSIVE_BLOCK_ROWS):
+        self.zarr_path = Path(zarr_path)
+        self.block_rows = block_rows
+        self.bundle = BundleData(on_add=self._write)
+        self._path = self.zarr_path.as_posix()
+        self._started = False
+        begin_pending_bundle(self._path)
+        self.group: zarr.Group = zarr.group(self._path, overwrite=True, zarr_format=2)
+
+    def _write(self, path: str) -> None:
+        if not self._started:
+            # the attributes of the bundle are set before its first group or array is added
+            self.group.attrs.update(self.bundle.attrs[""])
+            complete_pending_directory(self._path, "")
+            self._started = True
+
+        attrs = self.bundle.attrs[path]
+        if path not in self.bundle.arrays:
+            self.group.create_group(path, attributes=attrs)
+            complete_pending_directory(self._path, path)
+            return
+
+        start = time.monotonic()
+        data, chunks = self.bundle.arrays[path]
+        array = self.group.create_array(
+            path,
+            shape=data.shape,
+            dtype=data.dtype,
+            chunks="auto" if chunks is None else chunks,
+            attributes=attrs,
+        )
+        step = array.chunks[0] * max(1, self.block_rows // array.chunks[0])
+        for row in range(0, data.shape[0], step):
+            array[row : row + step] = data[row : row + step]
+            # wake up the requests waiting for the chunks that were just written
+            notify_pending_bundles()
+        complete_pending_directory(self._path, path)
+        LOG.info(f"Wrote {path} in {time.monotonic() - start} seconds")
+
+    def progress(self, stage: str) -> None:
+        """
+        Called by `build_bundle` with the name of each stage when it starts.
+        """
+        if stage == "sparse arrays" and "attributes" not in self.bundle.arrays:
+            # the bundle has no attributes, the viewer does not need to wait for them
+            complete_pending_directory(self._path, "attributes")
+
+    def close(self) -> None:
+        """
+        End writing the bundle: requests for missing files now fail without waiting.
+        """
+        # rewritten, so the summary of the bundle in a catalog is updated
+        self.group.attrs.update(self.bundle.attrs[""])
+        end_pending_bundle(self._path)
 
-    # Calculate URLs before starting servers
-    host = DEFAULT_HOST
-    data_port = find_available_port(8000)
-    dataUrl = f"http://{host}:{data_port}/{zarr_path.name}/"
 
-    if use_local_frontend:
-        frontend_port = find_available_port(data_port + 1)
-        baseUrl = f"http://{host}:{frontend_port}"
-    else:
-        # Fall back to the externally-hosted HTTPS app.
+def convert_dataframe_to_zarr(
+    df: pd.DataFrame,
+    zarr_path: Path,
+    add_radius: bool = False,
+    extra_cols: Iterable[str] = (),
+    attribute_types: Iterable[str] = (),
+    calc_velocity: bool = False,
+    velocity_smoothing_windowsize: int = 1,
+    overwrite_zarr: bool = False,
+    progress: Callable[[str], None] | None = None,
+    ragged: bool = False,
+    quantize: bool = False,
+    delta_encode: bool = False,
+) -> Path:
+    """
+    Convert a DataFrame of tracks to a sparse Zarr store
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame containing the tracks must have the following columns:
+        - track_id: int
+        - t: int
+        - z: float
+        - y: float
+        - x: float
+        - parent_track_id: int
+    zarr_path : Path
+        Path to the zarr store, including name of Zarr store ('example: /path/to/zarr_bundle.zarr')
+    extra_cols : Iterable[str], optional
+        List of extra columns to include in the Zarr store, by default ()
+    overwrite_zarr : bool, optional
+        Whether to overwrite an existing Zarr store at the specified path.
+        If False (default), a unique path will be generated by appending a counter.
+        If True, the existing Zarr store will be overwritten.
+    progress : Callable[[str], None] | None, optional
+        Called with the name of each stage of `CONVERSION_STAGES` when it starts,
+        see `build_bundle`
+    ragged : bool, optional
+        Whether to store the points without padding (bundle version 2), see `build_bundle`,
+        by default False
+    quantize : bool, optional
+        Whether to store the coordinates as 16-bit integers, with an error of at most
+        1 / 131068 of their range, see `build_bundle`, by default False
+    delta_encode : bool, optional
+        Whether to also delta encode the coordinates of the points of the tracks, see
+        `build_bundle`, by default False
+    """
+    bundle = build_bundle(
+        df,
+        add_radius=add_radius,
+        extra_cols=extra_cols,
+        attribute_types=attribute_types,
+        calc_velocity=calc_velocity,
+        velocity_smoothing_windowsize=velocity_smoothing_windowsize,
+        progress=progress,
+        ragged=ragged,
+        quantize=quantize,
+        delta_encode=delta_encode,
+    )
+    start = time.monotonic()
+    if progress is not None:
+        progress("writing")
+
+    # Ensure the Zarr path is unique (unless overwrite is requested)
+    if not overwrite_zarr:
+        zarr_path = get_unique_zarr_path(zarr_path)
+
+    LOG.info(f"Saving to Zarr at {zarr_path}")
+
+    # Direct path, no DirectoryStore wrapper
+    write_bundle(bundle, zarr_path.as_posix())
+
+    LOG.info(f"Saved to Zarr in {time.monotonic() - start} seconds")
+
+    return zarr_path
+
+
+def write_compressed_sidecars(zarr_path: Path) -> list[Path]:
+    """
+    Write precompressed sidecar files next to the compressible files of a bundle.
+
+    For each Zarr metadata file and chunk of an uncompressed array, a gzip-compressed `.gz` file
+    (and a brotli-compressed `.br` file if the optional `brotli` package is installed) is written,
+    which `intracktive serve` sends to clients accepting that content encoding.
+
+    Parameters
+    ----------
+    zarr_path : Path
+        Path to the Zarr bundle
+
+    Returns
+    -------
+    list[Path]
+        Paths of the written sidecar files
+    """
+    start = time.monotonic()
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        LOG.info("brotli is not installed, only writing gzip sidecars")
+
+    suffixes = tuple(suffix for _, suffix in SIDECAR_ENCODINGS)
+    sidecars = []
+    for path in sorted(Path(zarr_path).rglob("*")):
+        if (
+            not path.is_file()
+            or path.suffix in suffixes
+            or path.stat().st_size < MIN_COMPRESS_SIZE
+            or not is_compressible(str(path))
+        ):
+            continue
+        data = path.read_bytes()
+        sidecar = path.with_name(path.name + ".gz")
+        sidecar.write_bytes(gzip.compress(data, compresslevel=9))
+        sidecars.append(sidecar)
+        if brotli is not None:
+            sidecar = path.with_name(path.name + ".br")
+            sidecar.write_bytes(brotli.compress(data))
+            sidecars.append(sidecar)
+
+    LOG.info(
+        f"Wrote {len(sidecars)} compressed sidecar files in {time.monotonic() - start} seconds"
+    )
+    return sidecars
+
+
+def zarr_to_browser(
+    zarr_path: Path,
+    flag_open_browser: bool = True,
+    threaded: bool = True,
+) -> None:
+    """
+    Open a Zarr store in inTRACKtive in the browser. This function will
+    1) host the zarr path as localhost, 2) open the localhost in the browser with inTRACKtive.
+
+    Parameters
+    ----------
+    zarr_path : Path
+        The full path to the Zarr store (including the .zarr extension)
+    flag_open_browser : bool, optional
+        Whether to automatically open the browser, by default True
+    threaded : bool, optional
+        Whether to run the server in a separate thread, by default True
+    """
+    zarr_dir = zarr_path.parent
+
+    # Check if a bundled frontend is available (packaged alongside the Python code).
+    # When available, we serve it from a local HTTP server so that the browser can
+    # load both the app and the Zarr data over HTTP.  This avoids the mixed-content
+    # block that Safari (and strict HTTPS contexts) enforce when an HTTPS page tries
+    # to fetch resources from an HTTP localhost server.
+    frontend_path = Path(__file__).parent / "frontend"
+    use_local_frontend = (
+        frontend_path.exists() and (frontend_path / "index.html").exists()
+    )
+
+    # Calculate URLs before starting servers
+    host = DEFAULT_HOST
+
+    if use_local_frontend:
+        # The data server runs in the background: it is shared by all the bundles opened
+        # by this process, instead of starting a server on a new port for each of them.
+        dataUrl = serve_bundle(zarr_path, host=host)
+        frontend_port = find_available_port(8000)
+        baseUrl = f"http://{host}:{frontend_port}"
+    else:
+        data_port = find_available_port(8000)
+        dataUrl = f"http://{host}:{data_port}/{zarr_path.name}/"
+        # Fall back to the externally-hosted HTTPS app.
         # NOTE: this does not work in Safari due to mixed-content restrictions.
         baseUrl = "https://intracktive.sf.czbiohub.org"
 
@@ -634,9 +1168,7 @@ def zarr_to_browser(
     LOG.info("full URL: %s", fullUrl)
 
     if use_local_frontend:
-        # Data server always runs in the background; the frontend server controls blocking.
-        serve_directory(path=zarr_dir, host=host, port=data_port, threaded=True)
-
+        # The (shared) data server runs in the background; the frontend server controls blocking.
         # Open browser before blocking frontend server (when not threaded)
         if flag_open_browser and not threaded:
             webbrowser.open(fullUrl)
@@ -663,9 +1195,130 @@ def zarr_to_browser(
         return dataUrl, fullUrl
 
 
+def dataframe_fingerprint(df: pd.DataFrame, *params) -> str:
+    """
+    Hash of the columns and the values of a DataFrame (and of conversion parameters),
+    to recognize a DataFrame converted before.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        repr((list(df.columns), [str(t) for t in df.dtypes], params)).encode()
+    )
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _dataframe_directory() -> Path:
+    """
+    Private (empty) temporary directory of the process where the DataFrame bundles are
+    mounted: it is served when no frontend is bundled, which must not expose other files.
+    """
+    global _dataframe_dir
+    if _dataframe_dir is None:
+        _dataframe_dir = Path(tempfile.mkdtemp(prefix="intracktive_"))
+        atexit.register(shutil.rmtree, _dataframe_dir, ignore_errors=True)
+    return _dataframe_dir
+
+
+def _dataframe_bundle(
+    df: pd.DataFrame,
+    extra_cols: Iterable[str],
+    attribute_types: Iterable[str],
+    add_radius: bool,
+    progress: Callable[[str], None] | None = None,
+):
+    """
+    Virtual bundle of a DataFrame, mounted in a private temporary directory, and reused while
+    the DataFrame and the parameters do not change.
+    """
+    # circular import: the virtual bundles are built by `build_bundle`
+    from intracktive.virtual import VirtualBundle
+
+    key = dataframe_fingerprint(df, list(extra_cols), list(attribute_types), add_radius)
+    bundle = _dataframe_bundles.get(key)
+    if bundle is not None and zipbundle.mounted(bundle.path) is bundle:
+        LOG.info(f"Reusing the bundle of the same DataFrame: {bundle.path}")
+        _dataframe_bundles.move_to_end(key)
+        return bundle
+
+    data = build_bundle(
+        df.copy(),
+        add_radius=add_radius,
+        extra_cols=extra_cols,
+        attribute_types=attribute_types,
+        progress=progress,
+    )
+    if progress is not None:
+        progress("writing")
+    bundle = VirtualBundle(
+        data, _dataframe_directory() / f"dataframe_{key[:16]}_bundle.zarr"
+    )
+    zipbundle.mount(bundle)
+    _dataframe_bundles[key] = bundle
+    while len(_dataframe_bundles) > DATAFRAME_CACHE_SIZE:
+        _, evicted = _dataframe_bundles.popitem(last=False)
+        release_bundle(evicted.path)
+        zipbundle.unmount(evicted.path)
+    return bundle
+
+
+def dataframe_to_bundle(
+    df: pd.DataFrame,
+    zarr_dir: Path | None = None,
+    extra_cols: Iterable[str] = (),
+    attribute_types: Iterable[str] = (),
+    add_radius: bool = False,
+    progress: Callable[[str], None] | None = None,
+) -> Path:
+    """
+    Convert a Tracks DataFrame to a bundle saved in the specified directory (if provided,
+    otherwise the bundle is kept in memory), without serving it.
+
+    See `dataframe_to_browser` for the parameters, and `build_bundle` for `progress`.
+
+    Returns
+    -------
+    Path
+        Path of the bundle (for an in-memory bundle, the path where it is mounted, which does
+        not exist on disk)
+    """
+    # check if extra_cols are in df
+    for col in extra_cols:
+        if col not in df.columns:
+            raise ValueError(
+                f"Column '{col}' not found in the DataFrame (case sensitive!)"
+            )
+
+    # if attribute_types is not provided, get it from the extra_cols
+    if not attribute_types:
+        attribute_types = [get_col_type(df[col]) for col in extra_cols]
+
+    if zarr_dir is None or str(zarr_dir) == ".":
+        start = time.monotonic()
+        zarr_path = Path(
+            _dataframe_bundle(
+                df, extra_cols, attribute_types, add_radius, progress=progress
+            ).path
+        )
+        LOG.info(
+            f"In-memory bundle used for localhost: {zarr_path} ({time.monotonic() - start} seconds)"
+        )
+        return zarr_path
+
+    LOG.info("Provided directory used for localhost: %s", zarr_dir)
+    return convert_dataframe_to_zarr(
+        df=df,
+        zarr_path=get_unique_zarr_path(Path(zarr_dir) / "zarr_bundle.zarr"),
+        extra_cols=extra_cols,
+        add_radius=add_radius,
+        attribute_types=attribute_types,
+        progress=progress,
+    )
+
+
 def dataframe_to_browser(
     df: pd.DataFrame,
-    zarr_dir: Path,
+    zarr_dir: Path | None = None,
     extra_cols: Iterable[str] = (),
     attribute_types: Iterable[str] = (),
     add_radius: bool = False,
@@ -673,15 +1326,21 @@ def dataframe_to_browser(
 ) -> None:
     """
     Open a Tracks DataFrame in inTRACKtive in the browser. In detail: this function
-    1) converts the DataFrame to Zarr, 2) saves the zarr in speficied path (if provided, otherwise temporary path),
-    3) host the outpat path as localhost, 4) open the localhost in the browser with inTRACKtive.
+    1) converts the DataFrame to Zarr, saved in the specified directory (if provided, otherwise
+    the bundle is kept in memory), 2) host the bundle as localhost, in a background thread,
+    3) open the localhost in the browser with inTRACKtive.
+
+    Without a directory, nothing is written to disk: the bundle is a virtual bundle (see
+    `intracktive.virtual`), whose chunks are encoded when the viewer requests them. Opening the
+    same DataFrame again (with the same parameters) reuses its bundle.
 
     Parameters
     ----------
     df : pd.DataFrame
         The DataFrame containing the tracks data. The required columns in the dataFrame are: ['track_id', 't', 'z', 'y', 'x', 'parent_track_id']
-    zarr_dir : Path
-        The directory to save the Zarr bundle, only the path to the folder is required (excluding the zarr_bundle.zarr filename)
+    zarr_dir : Path | None, optional
+        The directory to save the Zarr bundle, only the path to the folder is required (excluding the zarr_bundle.zarr filename),
+        by default None (the bundle is kept in memory)
     extra_cols : Iterable[str], optional
         List of extra columns to include in the Zarr store, by default empty list
     attribute_types : Iterable[str], optional
@@ -691,35 +1350,132 @@ def dataframe_to_browser(
     flag_open_browser: bool, optional
         Whether to automatically open the browser, by default True
     """
-    if str(zarr_dir) in (".", None):
-        with tempfile.TemporaryDirectory() as temp_dir:
-            zarr_dir = Path(temp_dir)
-            LOG.info("Temporary directory used for localhost: %s", zarr_dir)
-    else:
-        LOG.info("Provided directory used for localhost: %s", zarr_dir)
-
-    # check if extra_cols are in df
-    for col in extra_cols:
-        if col not in df.columns:
-            raise ValueError(
-                f"Column '{col}' not found in the DataFrame (case sensitive!)"
-            )
-
-    # if attribute_types is not provided, get it from the extra_cols
-    if not attribute_types:
-        attribute_types = [get_col_type(df[col]) for col in extra_cols]
-
-    zarr_path = get_unique_zarr_path(zarr_dir / "zarr_bundle.zarr")
-    zarr_dir_with_storename = convert_dataframe_to_zarr(
-        df=df,
-        zarr_path=zarr_path,
+    zarr_path = dataframe_to_bundle(
+        df,
+        zarr_dir,
         extra_cols=extra_cols,
-        add_radius=add_radius,
         attribute_types=attribute_types,
+        add_radius=add_radius,
     )
 
     # Use the new zarr_to_browser function
-    zarr_to_browser(zarr_dir_with_storename, flag_open_browser)
+    zarr_to_browser(zarr_path, flag_open_browser)
+
+
+def tracks_layer_to_dataframe(
+    data: np.ndarray,
+    properties: dict[str, np.ndarray] | None = None,
+    graph: dict | None = None,
+) -> pd.DataFrame:
+    """
+    DataFrame of the tracks of a napari Tracks layer, with its properties as extra columns.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        (N, 4) array of (track_id, t, y, x) or (N, 5) array of (track_id, t, z, y, x)
+    properties : dict[str, np.ndarray] | None, optional
+        Values of the properties of the N points, by name
+    graph : dict | None, optional
+        Parent track(s) of the tracks that have one, by track id (napari `Tracks.graph`),
+        only the first parent is used
+
+    Returns
+    -------
+    pd.DataFrame
+        The tracks, with `parent_track_id` set to -1 for the tracks without parent
+    """
+    data = np.asarray(data)
+    if data.ndim != 2 or data.shape[1] not in (4, 5):
+        raise ValueError(
+            f"Tracks data must be an (N, 4) or (N, 5) array, got shape {data.shape}"
+        )
+    columns = (
+        ["track_id", "t", "y", "x"] if data.shape[1] == 4 else REQUIRED_COLUMNS[:5]
+    )
+    track_ids = data[:, 0].astype(np.int64)
+    # columns are copied: the conversion relabels the tracks in place
+    df = pd.DataFrame({col: data[:, i] for i, col in enumerate(columns)})
+    df["track_id"] = track_ids
+    df["t"] = data[:, 1].astype(np.int64)
+
+    parent_track_ids = np.full(len(data), -1, dtype=np.int64)
+    if graph:
+        children = np.fromiter(graph.keys(), dtype=np.int64, count=len(graph))
+        parents = np.fromiter(
+            (
+                (p[0] if len(p) else -1)
+                if isinstance(p, (list, tuple, np.ndarray))
+                else p
+                for p in graph.values()
+            ),
+            dtype=np.int64,
+            count=len(graph),
+        )
+        order = np.argsort(children)
+        children, parents = children[order], parents[order]
+        index = np.clip(np.searchsorted(children, track_ids), 0, len(children) - 1)
+        found = children[index] == track_ids
+        parent_track_ids[found] = parents[index[found]]
+    df["parent_track_id"] = parent_track_ids
+
+    for name, values in (properties or {}).items():
+        if name in df.columns:
+            continue
+        df[name] = np.asarray(values)
+    return df
+
+
+def tracks_layer_to_bundle(
+    data: np.ndarray,
+    properties: dict[str, np.ndarray] | None = None,
+    graph: dict | None = None,
+    zarr_dir: Path | None = None,
+    progress: Callable[[str], None] | None = None,
+) -> Path:
+    """
+    Convert the tracks of a napari Tracks layer to a bundle, with its properties as attributes.
+
+    The bundle is reused while the layer has the same data array (by identity, a layer whose
+    data is modified in place should be given a new array), properties and graph: converting
+    the same layer again is instant.
+
+    See `tracks_layer_to_dataframe` for the tracks, and `dataframe_to_bundle` for the other
+    parameters.
+
+    Returns
+    -------
+    Path
+        Path of the bundle (for an in-memory bundle, the path where it is mounted, which does
+        not exist on disk)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for name, values in sorted((properties or {}).items()):
+        digest.update(name.encode())
+        digest.update(pd.util.hash_array(np.asarray(values).ravel()).tobytes())
+    key = (
+        id(data),
+        digest.hexdigest(),
+        repr(sorted((graph or {}).items())),
+        None if zarr_dir is None else str(zarr_dir),
+    )
+    cached = _layer_bundles.get(key)
+    if cached is not None:
+        data_ref, zarr_path = cached
+        if data_ref() is data and zipbundle.isdir(str(zarr_path / "points")):
+            LOG.info(f"Reusing the bundle of the same tracks: {zarr_path}")
+            _layer_bundles.move_to_end(key)
+            return zarr_path
+
+    df = tracks_layer_to_dataframe(data, properties, graph)
+    extra_cols = [c for c in df.columns if c not in REQUIRED_COLUMNS]
+    zarr_path = dataframe_to_bundle(
+        df, zarr_dir, extra_cols=extra_cols, progress=progress
+    )
+    _layer_bundles[key] = (weakref.ref(data), zarr_path)
+    while len(_layer_bundles) > DATAFRAME_CACHE_SIZE:
+        _layer_bundles.popitem(last=False)
+    return zarr_path
 
 
 def check_if_columns_exist(
@@ -770,70 +1526,175 @@ def get_col_type(column: pd.Series) -> str:
         return "continuous"
 
 
-def convert_file(
-    input_file: Path,
-    out_dir: Path | None = None,
-    add_radius: bool = False,
-    add_all_attributes: bool = False,
-    add_attribute: str | None = None,
-    add_hex_attribute: str | None = None,
-    calc_velocity: bool = False,
-    velocity_smoothing_windowsize: int = 1,
-    overwrite_zarr: bool = False,
-) -> Path:
+def is_table_collection(input_path: Path) -> bool:
     """
-    Convert a CSV/Parquet/GEFF file of tracks to a sparse Zarr store.
+    Check if the input path refers to multiple CSV/Parquet parts (a glob pattern or a directory of tables).
 
-    This is the core function that can be called both programmatically and via CLI.
+    Parameters
+    ----------
+    input_path : Path
+        Path to a directory or a glob pattern (e.g., /path/to/tracks_*.csv)
+
+    Returns
+    -------
+    bool
+        True if the input path is a glob pattern or a directory containing CSV/Parquet files.
+        An existing file is never a glob pattern, even if its name contains e.g. brackets.
+    """
+    if input_path.is_dir():
+        return len(collect_table_parts(input_path)) > 0
+    if input_path.exists():
+        return False
+    return any(c in str(input_path) for c in GLOB_CHARACTERS)
+
+
+def collect_table_parts(input_path: Path) -> list[Path]:
+    """
+    Resolve a directory or glob pattern into the sorted list of CSV/Parquet parts.
 
     Parameters
     ----------
-    input_file : Path
-        Path to the input file (CSV, Parquet, or GEFF)
-    out_dir : Path | None, optional
-        Path to the output directory (optional, defaults to the parent dir of the input file)
-    add_radius : bool, optional
-        Boolean indicating whether to include the column radius as cell size, by default False
-    add_all_attributes : bool, optional
-        Boolean indicating whether to include all extra columns as attributes, by default False
-    add_attribute : str | None, optional
-        Comma-separated list of column names to include as attributes, by default None
-    add_hex_attribute : str | None, optional
-        Comma-separated list of column names to include as HEX attributes, by default None
-    calc_velocity : bool, optional
-        Boolean indicating whether to calculate velocity of the cells, by default False
-    velocity_smoothing_windowsize : int, optional
-        Smoothing factor for velocity calculation, by default 1
-    overwrite_zarr : bool, optional
-        Whether to overwrite an existing Zarr store at the specified path.
-        If False (default), a unique path will be generated by appending a counter.
-        If True, the existing Zarr store will be overwritten.
+    input_path : Path
+        Path to a directory or a glob pattern (e.g., /path/to/tracks_*.csv)
 
     Returns
     -------
-    Path
-        Path to the created Zarr store
+    list[Path]
+        Sorted list of the CSV/Parquet files matching the input path
+    """
+    if input_path.is_dir():
+        candidates = input_path.iterdir()
+    else:
+        candidates = (Path(p) for p in glob.glob(str(input_path)))
 
-    Raises
-    ------
-    ValueError
-        If the file format is unsupported or required columns are missing
+    return sorted(
+        p for p in candidates if p.is_file() and p.suffix.lower() in TABLE_EXTENSIONS
+    )
+
+
+def _read_table_part(path: Path) -> pa.Table:
+    """
+    Read a single CSV/Parquet part as an Arrow table (Arrow releases the GIL while parsing).
+    """
+    if path.suffix.lower() == ".csv":
+        return pyarrow.csv.read_csv(path)
+    return pyarrow.parquet.read_table(path)
+
+
+def read_table_parts(
+    parts: list[Path],
+    reconcile_track_ids: bool = False,
+    num_workers: int | None = None,
+) -> pd.DataFrame:
+    """
+    Read multiple CSV/Parquet parts concurrently and combine them into a single tracks DataFrame.
+
+    The parts are read as Arrow tables in a thread pool and concatenated without copying,
+    so only a single conversion to pandas is done at the end.
+
+    Parameters
+    ----------
+    parts : list[Path]
+        List of CSV/Parquet files (e.g., one file per timepoint or per tile)
+    reconcile_track_ids : bool, optional
+        Whether the track ids are local to each part (e.g., one file per tile), by default False.
+        If True, the track_id and parent_track_id of each part are offset by the
+        cumulative maximum track_id of the previous parts, so that the ids are unique across parts.
+        Leave False when the parts share track ids (e.g., one file per timepoint).
+    num_workers : int | None, optional
+        Number of reader threads, by default None (ThreadPoolExecutor default)
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame with the rows of all parts
     """
+    if len(parts) == 0:
+        raise ValueError("No CSV or Parquet files found to convert")
+
     start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        tables = list(executor.map(_read_table_part, parts))
+
+    if reconcile_track_ids:
+        offset = 0
+        for i, table in enumerate(tables):
+            if "track_id" not in table.column_names or table.num_rows == 0:
+                continue
+            track_ids = table["track_id"]
+            tables[i] = table.set_column(
+                table.column_names.index("track_id"),
+                "track_id",
+                pc.add(track_ids, offset),
+            )
+            if "parent_track_id" in table.column_names:
+                parents = table["parent_track_id"]
+                tables[i] = tables[i].set_column(
+                    table.column_names.index("parent_track_id"),
+                    "parent_track_id",
+                    pc.if_else(pc.less(parents, 0), parents, pc.add(parents, offset)),
+                )
+            offset += pc.max(track_ids).as_py() + 1
 
-    if out_dir is None:
-        out_dir = input_file.parent
-    else:
-        out_dir = Path(out_dir)
+    table = pa.concat_tables(tables, promote_options="permissive")
+
+    LOG.info(
+        f"Read {len(parts)} parts ({table.num_rows} rows) in {time.monotonic() - start} seconds"
+    )
+    return table.to_pandas()
+
+
+def get_bundle_name(input_file: Path) -> str:
+    """
+    Name of the bundle of a tracks file, e.g. 'tracks' for '/path/to/tracks.csv'
+    (the bundle is then named 'tracks_bundle.zarr').
+    """
+    input_file = Path(input_file)
+    if is_table_collection(input_file):
+        if not input_file.is_dir():
+            # glob pattern, e.g. /path/to/tracks_*.csv: name the bundle after the parent directory
+            return input_file.parent.resolve().name
+        return input_file.name
+    return input_file.stem
+
+
+def read_tracks_file(
+    input_file: Path,
+    add_radius: bool = False,
+    add_all_attributes: bool = False,
+    add_attribute: str | None = None,
+    add_hex_attribute: str | None = None,
+    reconcile_track_ids: bool = False,
+    num_workers: int | None = None,
+) -> tuple[pd.DataFrame, list[str], list[str]]:
+    """
+    Read a tracks file (or directory/glob of parts) and select the attribute columns.
+
+    See `convert_file` for the parameters.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, list[str], list[str]]
+        The tracks, the names of the attribute columns and their types
+    """
+    start = time.monotonic()
 
     if not isinstance(input_file, Path):
         input_file = Path(input_file)
 
-    zarr_path = out_dir / f"{input_file.stem}_bundle.zarr"
+    flag_multiple_parts = is_table_collection(input_file)
 
     # Read input file based on extension
     file_extension = input_file.suffix.lower()
-    if file_extension == ".csv":
+    if flag_multiple_parts:
+        parts = collect_table_parts(input_file)
+        LOG.info(f"Reading {len(parts)} CSV/Parquet parts from {input_file}")
+        tracks_df = read_table_parts(
+            parts,
+            reconcile_track_ids=reconcile_track_ids,
+            num_workers=num_workers,
+        )
+    elif file_extension == ".csv":
         tracks_df = pd.read_csv(input_file)
     elif file_extension == ".parquet":
         tracks_df = pd.read_parquet(input_file)
@@ -855,7 +1716,7 @@ def convert_file(
         )
     else:
         raise ValueError(
-            f"Unsupported file format: {file_extension}. Only .csv, .parquet and GEFF files are supported."
+            f"Unsupported file format: {file_extension}. Only .csv, .parquet and GEFF files (or directories of .csv/.parquet files) are supported."
         )
 
     LOG.info(
@@ -888,6 +1749,110 @@ def convert_file(
         LOG.info(f"Columns included as hex attributes: {', '.join(selected_columns)}")
     LOG.info(f"Column types: {col_types}")
 
+    return tracks_df, extra_cols, col_types
+
+
+def convert_file(
+    input_file: Path,
+    out_dir: Path | None = None,
+    add_radius: bool = False,
+    add_all_attributes: bool = False,
+    add_attribute: str | None = None,
+    add_hex_attribute: str | None = None,
+    calc_velocity: bool = False,
+    velocity_smoothing_windowsize: int = 1,
+    overwrite_zarr: bool = False,
+    reconcile_track_ids: bool = False,
+    num_workers: int | None = None,
+    precompress: bool = False,
+    zip_bundle: bool = False,
+    ragged: bool = False,
+    quantize: bool = False,
+    delta_encode: bool = False,
+) -> Path:
+    """
+    Convert a CSV/Parquet/GEFF file of tracks to a sparse Zarr store.
+
+    This is the core function that can be called both programmatically and via CLI.
+
+    Parameters
+    ----------
+    input_file : Path
+        Path to the input file (CSV, Parquet, or GEFF), or a directory/glob pattern of CSV/Parquet parts
+    out_dir : Path | None, optional
+        Path to the output directory (optional, defaults to the parent dir of the input file)
+    add_radius : bool, optional
+        Boolean indicating whether to include the column radius as cell size, by default False
+    add_all_attributes : bool, optional
+        Boolean indicating whether to include all extra columns as attributes, by default False
+    add_attribute : str | None, optional
+        Comma-separated list of column names to include as attributes, by default None
+    add_hex_attribute : str | None, optional
+        Comma-separated list of column names to include as HEX attributes, by default None
+    calc_velocity : bool, optional
+        Boolean indicating whether to calculate velocity of the cells, by default False
+    velocity_smoothing_windowsize : int, optional
+        Smoothing factor for velocity calculation, by default 1
+    overwrite_zarr : bool, optional
+        Whether to overwrite an existing Zarr store at the specified path.
+        If False (default), a unique path will be generated by appending a counter.
+        If True, the existing Zarr store will be overwritten.
+    reconcile_track_ids : bool, optional
+        Only for multiple input parts: whether to offset the track ids of each part to make them unique
+        across parts (e.g., one file per tile), by default False
+    num_workers : int | None, optional
+        Only for multiple input parts: number of threads used to read the parts, by default None
+    precompress : bool, optional
+        Whether to write precompressed (.gz/.br) sidecars of the metadata and uncompressed chunks,
+        served to clients accepting those encodings by `intracktive serve`, by default False
+    zip_bundle : bool, optional
+        Whether to write the bundle as a single uncompressed zip file (`<name>.zarr.zip`, readable
+        with `zarr.storage.ZipStore`) instead of a directory, by default False
+    ragged : bool, optional
+        Whether to store the points without padding to the busiest time point, with the offset
+        of each time point (bundle version 2), by default False
+    quantize : bool, optional
+        Whether to store the coordinates as 16-bit integers with a scale and offset, with an
+        error of at most 1 / 131068 of their range, by default False
+    delta_encode : bool, optional
+        Whether to also delta encode the quantized coordinates of the points of the tracks,
+        by default False (requires `quantize`)
+
+    Returns
+    -------
+    Path
+        Path to the created Zarr store
+
+    Raises
+    ------
+    ValueError
+        If the file format is unsupported or required columns are missing
+    """
+    start = time.monotonic()
+
+    if not isinstance(input_file, Path):
+        input_file = Path(input_file)
+
+    input_dir = input_file.parent
+    bundle_name = get_bundle_name(input_file)
+
+    if out_dir is None:
+        out_dir = input_dir
+    else:
+        out_dir = Path(out_dir)
+
+    zarr_path = out_dir / f"{bundle_name}_bundle.zarr"
+
+    tracks_df, extra_cols, col_types = read_tracks_file(
+        input_file,
+        add_radius=add_radius,
+        add_all_attributes=add_all_attributes,
+        add_attribute=add_attribute,
+        add_hex_attribute=add_hex_attribute,
+        reconcile_track_ids=reconcile_track_ids,
+        num_workers=num_workers,
+    )
+
     # TODO: do the calc_velocity BEFORE the zarr conversion, because now we check the existance of attributes in the dataframe, before the conversion script
     zarr_path = convert_dataframe_to_zarr(
         tracks_df,
@@ -898,8 +1863,27 @@ def convert_file(
         calc_velocity=calc_velocity,
         velocity_smoothing_windowsize=velocity_smoothing_windowsize,
         overwrite_zarr=overwrite_zarr,
+        ragged=ragged,
+        quantize=quantize,
+        delta_encode=delta_encode,
     )
 
+    if precompress:
+        write_compressed_sidecars(zarr_path)
+
+    if zip_bundle:
+        zip_path = zarr_path.with_name(zarr_path.name + ZIP_SUFFIX)
+        counter = 1
+        while zip_path.exists() and not overwrite_zarr:
+            zip_path = zarr_path.with_name(
+                f"{zarr_path.stem}_{counter}{zarr_path.suffix}{ZIP_SUFFIX}"
+            )
+            counter += 1
+        pack_bundle(zarr_path, zip_path)
+        shutil.rmtree(zarr_path)
+        LOG.info(f"Packed the bundle in {zip_path}")
+        zarr_path = zip_path
+
     LOG.info(f"Full conversion took {time.monotonic() - start} seconds")
 
     return zarr_path
@@ -908,7 +1892,7 @@ def convert_file(
 @click.command(name="convert")
 @click.argument(
     "input_file",
-    type=click.Path(exists=True, dir_okay=True, path_type=Path),
+    type=click.Path(dir_okay=True, path_type=Path),
 )
 @click.option(
     "--out_dir",
@@ -962,6 +1946,55 @@ def convert_file(
     default=False,
     type=bool,
 )
+@click.option(
+    "--reconcile_track_ids",
+    is_flag=True,
+    help="When converting multiple CSV/Parquet parts: offset the track ids of each part to make them unique across parts (e.g., one file per tile)",
+    default=False,
+    type=bool,
+)
+@click.option(
+    "--num_workers",
+    type=int,
+    default=None,
+    help="When converting multiple CSV/Parquet parts: number of threads used to read the parts (default: automatic)",
+)
+@click.option(
+    "--precompress",
+    is_flag=True,
+    help="Boolean indicating whether to write precompressed .gz (and .br, if brotli is installed) sidecars of the metadata files, served to remote clients by `intracktive serve`",
+    default=False,
+    type=bool,
+)
+@click.option(
+    "--zip",
+    "zip_bundle",
+    is_flag=True,
+    help="Boolean indicating whether to write the bundle as a single uncompressed zip file (<name>.zarr.zip) instead of a directory of many small files",
+    default=False,
+    type=bool,
+)
+@click.option(
+    "--ragged",
+    is_flag=True,
+    help="Boolean indicating whether to store the points without padding each time point to the busiest one, with the offset of each time point (bundle version 2, smaller when the number of cells varies over time)",
+    default=False,
+    type=bool,
+)
+@click.option(
+    "--quantize",
+    is_flag=True,
+    help="Boolean indicating whether to store the coordinates as 16-bit integers with a scale and offset, with an error of at most 1/131068 of their range (smaller bundle)",
+    default=False,
+    type=bool,
+)
+@click.option(
+    "--delta_encode",
+    is_flag=True,
+    help="Boolean indicating whether to also delta encode the quantized coordinates of the points of each track (requires --quantize)",
+    default=False,
+    type=bool,
+)
 def convert_cli(
     input_file: Path,
     out_dir: Path | None,
@@ -972,13 +2005,27 @@ def convert_cli(
     calc_velocity: bool,
     velocity_smoothing_windowsize: int,
     overwrite_zarr: bool,
+    reconcile_track_ids: bool,
+    num_workers: int | None,
+    precompress: bool,
+    zip_bundle: bool,
+    ragged: bool,
+    quantize: bool,
+    delta_encode: bool,
 ) -> None:
     """
     Convert a CSV/Parquet/GEFF file of tracks to a sparse Zarr store.
 
     Arguments:
-        INPUT_FILE: Path to the input file (CSV, Parquet, or GEFF)
+        INPUT_FILE: Path to the input file (CSV, Parquet, or GEFF), or a directory or
+        quoted glob pattern (e.g., 'tracks_*.csv') of CSV/Parquet parts
     """
+    if not input_file.exists() and not is_table_collection(input_file):
+        raise click.BadParameter(
+            f"Path '{input_file}' does not exist.", param_hint="'INPUT_FILE'"
+        )
+    if delta_encode and not quantize:
+        raise click.UsageError("--delta_encode requires --quantize")
     convert_file(
         input_file=input_file,
         out_dir=out_dir,
@@ -989,6 +2036,13 @@ def convert_cli(
         calc_velocity=calc_velocity,
         velocity_smoothing_windowsize=velocity_smoothing_windowsize,
         overwrite_zarr=overwrite_zarr,
+        reconcile_track_ids=reconcile_track_ids,
+        num_workers=num_workers,
+        precompress=precompress,
+        zip_bundle=zip_bundle,
+        ragged=ragged,
+        quantize=quantize,
+        delta_encode=delta_encode,
     )
 
 
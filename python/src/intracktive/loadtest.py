@@ -0,0 +1,459 @@
+import http.client
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+import click
+import numpy as np
+from intracktive.client import chunk_key, decode_chunk
+from intracktive.metrics import QUANTILES, request_group
+from intracktive.quantize import QUANTIZED_PADDING
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+# relative frequency of the actions of a simulated viewer
+ACTION_WEIGHTS = {"playback": 0.8, "trail": 0.1, "lineage": 0.1}
+# time points around the current one shown by the track highlight, as in the viewer (minTime, maxTime)
+TRAIL_WINDOW = (-6, 5)
+# points are padded with INF_SPACE (-9999.9) after the last valid point of a time point
+# (QUANTIZED_PADDING in quantized bundles)
+INVALID_POINT_THRESHOLD = -9000
+SPARSE_GROUPS = ("points_to_tracks", "tracks_to_points", "tracks_to_tracks")
+
+
+def _chunk_range(start: int, stop: int, chunk_size: int) -> range:
+    """
+    Grid indices of the chunks (along the first axis) overlapping the rows [start, stop).
+    """
+    if stop <= start:
+        return range(0)
+    return range(start // chunk_size, (stop - 1) // chunk_size + 1)
+
+
+class _Viewer:
+    """
+    Simulated viewer, fetching the chunks of a bundle in the same sequence as the TrackManager
+    of the web viewer, over a single persistent connection.
+    """
+
+    def __init__(
+        self, bundle_url: str, seed: int, think_time: float, timeout: float
+    ) -> None:
+        url = urllib.parse.urlsplit(bundle_url)
+        self.host = url.hostname
+        self.port = url.port
+        self.connection_class = (
+            http.client.HTTPSConnection
+            if url.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.prefix = url.path.rstrip("/")
+        self.think_time = think_time
+        self.timeout = timeout
+        self.rng = np.random.default_rng(seed)
+        self.connection = None
+
+        # (group, status, bytes, seconds) of each request
+        self.requests: list[tuple[str, int, int, float]] = []
+        self.errors = 0
+        self.actions = {name: 0 for name in ACTION_WEIGHTS}
+
+        self.meta: dict[str, dict] = {}
+        self.indptrs: dict[str, np.ndarray] = {}
+        self.time = 0
+
+    def get(self, key: str) -> bytes | None:
+        """
+        GET a file of the bundle, returning None when it does not exist (e.g. empty chunks).
+        """
+        path = f"{self.prefix}/{key}"
+        start = time.monotonic()
+        try:
+            if self.connection is None:
+                self.connection = self.connection_class(
+                    self.host, self.port, timeout=self.timeout
+                )
+            self.connection.request("GET", path)
+            response = self.connection.getresponse()
+            body = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            LOG.debug(f"Request {path} failed: {e}")
+            self.errors += 1
+            self.close()
+            return None
+        self.requests.append(
+            (request_group(path), status, len(body), time.monotonic() - start)
+        )
+        if status == 404:
+            return None
+        if status >= 400:
+            self.errors += 1
+            return None
+        return body
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def open(self) -> None:
+        """
+        Read the metadata of the bundle arrays, as done when the viewer loads a bundle.
+        """
+        self.get(".zattrs")
+        arrays = ["points", "time_offsets", "attributes"] + [
+            f"{group}/{name}"
+            for group in SPARSE_GROUPS
+            for name in ("indptr", "indices", "data")
+        ]
+        for array in arrays:
+            data = self.get(f"{array}/.zarray")
+            if data is not None:
+                self.meta[array] = json.loads(data)
+        if "points" not in self.meta:
+            raise ValueError(f"{self.prefix} is not an inTRACKtive bundle: no points")
+
+        points = self.meta["points"]
+        attrs = json.loads(self.get("points/.zattrs") or b"{}")
+        self.values_per_point = attrs.get("values_per_point", 3)
+        self.quantization = attrs.get("quantization")
+        self.ragged = attrs.get("layout") == "ragged"
+        if self.ragged:
+            # one row per point: the offsets of the time points are fetched once
+            self.time_offsets = self.read_rows(
+                "time_offsets", 0, self.meta["time_offsets"]["shape"][0]
+            )
+            self.num_times = len(self.time_offsets) - 1
+        else:
+            self.num_times = points["shape"][0]
+            self.max_points = points["shape"][1] // self.values_per_point
+        if "attributes" in self.meta:
+            # the blocks of columns of the listed attributes
+            attrs = json.loads(self.get("attributes/.zattrs") or b"{}")
+            names = attrs.get("attribute_names", [])
+            self.attribute_columns = attrs.get(
+                "attribute_columns", list(range(len(names)))
+            )
+        self.time = int(self.rng.integers(self.num_times))
+
+    def read_chunk(self, array: str, index: tuple[int, ...]) -> np.ndarray:
+        meta = self.meta[array]
+        return decode_chunk(meta, self.get(chunk_key(array, meta, index)))
+
+    def read_rows(
+        self, array: str, start: int, stop: int, column: int = 0
+    ) -> np.ndarray:
+        """
+        Rows [start, stop) of an array (of a column of chunks of a 2D array), read chunk by
+        chunk like zarr.js.
+        """
+        meta = self.meta[array]
+        size = meta["chunks"][0]
+        tail = (column,)[: len(meta["shape"]) - 1]
+        chunks = [
+            self.read_chunk(array, (i, *tail)) for i in _chunk_range(start, stop, size)
+        ]
+        if not chunks:
+            return np.empty((0, *meta["chunks"][1:]), dtype=meta["dtype"])
+        offset = (start // size) * size
+        return np.concatenate(chunks)[start - offset : stop - offset]
+
+    def read_time_point(self, array: str, t: int, column: int = 0) -> np.ndarray:
+        """
+        Values of the points of a time point in `points` or `attributes` (in a column of
+        chunks, i.e. an attribute): a row of a padded bundle, or the rows
+        `time_offsets[t]:time_offsets[t + 1]` of a ragged bundle.
+        """
+        if self.ragged:
+            return self.read_rows(
+                array, int(self.time_offsets[t]), int(self.time_offsets[t + 1]), column
+            )
+        return self.read_chunk(array, (t, column))
+
+    def indptr(self, group: str, row: int) -> tuple[int, int]:
+        """
+        Start and end of a row of a sparse array. As in the viewer, the whole index pointer
+        array is fetched once and then reused.
+        """
+        array = f"{group}/indptr"
+        if array not in self.indptrs:
+            self.indptrs[array] = self.read_rows(array, 0, self.meta[array]["shape"][0])
+        indptr = self.indptrs[array]
+        return int(indptr[row]), int(indptr[row + 1])
+
+    def playback(self) -> None:
+        """
+        Step to the next time point: its points and the attribute used for coloring.
+        """
+        self.time = (self.time + 1) % self.num_times
+        self.read_time_point("points", self.time)
+        if "attributes" in self.meta and self.attribute_columns:
+            # as the viewer, only the chunks of the displayed attribute
+            column = int(self.rng.choice(self.attribute_columns))
+            if self.ragged:
+                # one column per attribute, in chunks of one column (or of all the columns in
+                # bundles written before the attributes were chunked per attribute)
+                column //= self.meta["attributes"]["chunks"][1]
+            self.read_time_point("attributes", self.time, column)
+
+    def trail(self) -> None:
+        """
+        Jump to a random time point and load the time points of the track highlight window.
+        """
+        self.time = int(self.rng.integers(self.num_times))
+        for t in range(self.time + TRAIL_WINDOW[0], self.time + TRAIL_WINDOW[1] + 1):
+            if 0 <= t < self.num_times:
+                self.read_time_point("points", t)
+
+    def lineage(self) -> None:
+        """
+        Select a random point of the current time point and load the tracks of its lineage:
+        points -> tracks -> lineage tracks -> points of each track.
+        """
+        if "tracks_to_tracks/data" not in self.meta:
+            return
+        points = self.read_time_point("points", self.time).ravel()
+        if self.quantization is None:
+            invalid = np.flatnonzero(points <= INVALID_POINT_THRESHOLD)
+        else:
+            invalid = np.flatnonzero(points == QUANTIZED_PADDING)
+        num_valid = (
+            invalid[0] if len(invalid) else len(points)
+        ) // self.values_per_point
+        if num_valid == 0:
+            return
+        if self.ragged:
+            first_id = int(self.time_offsets[self.time])
+        else:
+            first_id = self.time * self.max_points
+        point_id = first_id + int(self.rng.integers(num_valid))
+
+        start, end = self.indptr("points_to_tracks", point_id)
+        for track_id in self.read_rows("points_to_tracks/indices", start, end):
+            start, end = self.indptr("tracks_to_tracks", int(track_id))
+            lineage = self.read_rows("tracks_to_tracks/indices", start, end)
+            self.read_rows("tracks_to_tracks/data", start, end)
+            for related_id in lineage:
+                start, end = self.indptr("tracks_to_points", int(related_id))
+                self.read_rows("tracks_to_points/data", start, end)
+                self.read_rows("tracks_to_points/indices", start, end)
+
+    def run(self, stop: threading.Event) -> None:
+        names = list(ACTION_WEIGHTS)
+        weights = np.array(list(ACTION_WEIGHTS.values()))
+        weights = weights / weights.sum()
+        try:
+            while not stop.is_set():
+                name = names[self.rng.choice(len(names), p=weights)]
+                getattr(self, name)()
+                self.actions[name] += 1
+                if self.think_time > 0:
+                    stop.wait(self.think_time)
+        finally:
+            self.close()
+
+
+def _latency_summary(seconds: np.ndarray) -> dict[str, float]:
+    return {
+        f"p{round(q * 100)}": float(np.quantile(seconds, q)) if len(seconds) else 0.0
+        for q in QUANTILES
+    }
+
+
+def run_loadtest(
+    bundle_url: str,
+    n_viewers: int = 8,
+    duration: float = 30.0,
+    seed: int = 0,
+    think_time: float = 0.0,
+    timeout: float = 30.0,
+) -> dict:
+    """
+    Simulate concurrent viewers of a bundle served over HTTP, e.g. by `intracktive serve`.
+
+    Each viewer plays back time points, jumps to random time points loading the track highlight
+    window around them, and selects random cells, loading their lineage with the same sequence
+    of chunk requests as the web viewer.
+
+    Parameters
+    ----------
+    bundle_url : str
+        URL of the bundle, e.g. 'http://127.0.0.1:8000/tracks_bundle.zarr'
+    n_viewers : int, optional
+        Number of concurrent viewers, by default 8
+    duration : float, optional
+        Duration of the test in seconds, by default 30
+    seed : int, optional
+        Seed of the random actions of the viewers, by default 0
+    think_time : float, optional
+        Seconds each viewer waits between two actions, by default 0
+    timeout : float, optional
+        Timeout of each request in seconds, by default 30
+
+    Returns
+    -------
+    dict
+        Report with the number of requests, errors and bytes, the throughput, the number of
+        actions per kind and the latency percentiles (in seconds), overall and per array group
+    """
+    viewers = [
+        _Viewer(bundle_url, seed + i, think_time, timeout) for i in range(n_viewers)
+    ]
+    for viewer in viewers:
+        viewer.open()
+
+    LOG.info(f"Simulating {n_viewers} viewers of {bundle_url} for {duration} seconds")
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=viewer.run, args=(stop,), daemon=True)
+        for viewer in viewers
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    stop.wait(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    requests = [request for viewer in viewers for request in viewer.requests]
+    groups = np.array([group for group, _, _, _ in requests], dtype=object)
+    n_bytes = np.array([size for _, _, size, _ in requests], dtype=np.int64)
+    seconds = np.array([latency for _, _, _, latency in requests], dtype=np.float64)
+
+    report = {
+        "viewers": n_viewers,
+        "duration": elapsed,
+        "requests": len(requests),
+        "errors": sum(viewer.errors for viewer in viewers),
+        "bytes": int(n_bytes.sum()),
+        "requests_per_second": len(requests) / elapsed,
+        "megabytes_per_second": n_bytes.sum() / elapsed / 1e6,
+        "actions": {
+            name: sum(viewer.actions[name] for viewer in viewers)
+            for name in ACTION_WEIGHTS
+        },
+        "latency": _latency_summary(seconds),
+        "groups": {
+            group: {
+                "requests": int(np.sum(groups == group)),
+                "bytes": int(n_bytes[groups == group].sum()),
+                **_latency_summary(seconds[groups == group]),
+            }
+            for group in sorted(set(groups))
+        },
+    }
+    return report
+
+
+def log_report(report: dict) -> None:
+    latency = report["latency"]
+    LOG.info(
+        f"{report['requests']} requests ({report['errors']} errors) in {report['duration']:.1f} seconds: "
+        f"{report['requests_per_second']:.1f} requests/s, {report['megabytes_per_second']:.1f} MB/s, "
+        f"latency p50={latency['p50'] * 1e3:.1f} ms p95={latency['p95'] * 1e3:.1f} ms "
+        f"p99={latency['p99'] * 1e3:.1f} ms"
+    )
+    LOG.info(
+        "Actions: "
+        + ", ".join(f"{count} {name}" for name, count in report["actions"].items())
+    )
+    for group, values in report["groups"].items():
+        LOG.info(
+            f"{group}: {values['requests']} requests, {values['bytes'] / 1e6:.1f} MB, "
+            f"latency p50={values['p50'] * 1e3:.1f} ms p95={values['p95'] * 1e3:.1f} ms "
+            f"p99={values['p99'] * 1e3:.1f} ms"
+        )
+
+
+@click.command("loadtest")
+@click.argument("bundle", type=str)
+@click.option(
+    "--viewers",
+    type=int,
+    default=8,
+    help="Number of concurrent simulated viewers (default: 8)",
+)
+@click.option(
+    "--duration",
+    type=float,
+    default=30.0,
+    help="Duration of the test in seconds (default: 30)",
+)
+@click.option(
+    "--think_time",
+    type=float,
+    default=0.0,
+    help="Seconds each viewer waits between two actions (default: 0)",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=0,
+    help="Seed of the random actions of the viewers (default: 0)",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["threaded", "async"]),
+    default="threaded",
+    help="Server implementation used when BUNDLE is a local path (default: threaded)",
+)
+@click.option(
+    "--report",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write the report as JSON to this file (default: none)",
+)
+def loadtest_cli(
+    bundle: str,
+    viewers: int,
+    duration: float,
+    think_time: float,
+    seed: int,
+    engine: str,
+    report: Path | None,
+) -> None:
+    """
+    Simulate concurrent viewers of a bundle to measure the throughput and latency of the server.
+
+    BUNDLE is the URL of a served bundle (e.g. http://127.0.0.1:8000/tracks_bundle.zarr),
+    or the path of a local bundle, which is then served by a local server during the test.
+    """
+    if viewers < 1:
+        raise click.BadParameter("must be at least 1", param_hint="--viewers")
+
+    if not bundle.startswith(("http://", "https://")):
+        from intracktive.server import serve_directory
+
+        path = Path(bundle).resolve()
+        if not path.is_dir():
+            raise click.BadParameter(
+                f"{bundle} is neither a URL nor a bundle directory",
+                param_hint="BUNDLE",
+            )
+        url = serve_directory(
+            path.parent, threaded=True, engine=engine, metrics_log_interval=0
+        )
+        bundle = f"{url}/{path.name}"
+
+    try:
+        result = run_loadtest(
+            bundle,
+            n_viewers=viewers,
+            duration=duration,
+            seed=seed,
+            think_time=think_time,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    log_report(result)
+    if report is not None:
+        report.write_text(json.dumps(result, indent=2))
+        LOG.info(f"Report written to {report}")
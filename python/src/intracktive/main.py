@@ -1,13 +1,89 @@
+import importlib
 import logging
 import sys
 
 import click
-from intracktive.convert import convert_cli
-from intracktive.open import open_cli
-from intracktive.server import server_cli
 
+# Subcommands are imported lazily, so that e.g. `intracktive serve` and `intracktive --help`
+# don't pay for importing pandas, scipy, zarr, scikit-image and geff.
+# name -> (module:attribute of the click command, short help shown in `intracktive --help`)
+LAZY_SUBCOMMANDS = {
+    "attributes": (
+        "intracktive.attributes:attributes_cli",
+        "Add or remove the attributes of an existing bundle.",
+    ),
+    "catalog": (
+        "intracktive.catalog:catalog_cli",
+        "Serve many bundles on one port from a registry of bundles.",
+    ),
+    "convert": (
+        "intracktive.convert:convert_cli",
+        "Convert a CSV/Parquet/GEFF file of tracks to a sparse Zarr store.",
+    ),
+    "convert-batch": (
+        "intracktive.batch:convert_batch_cli",
+        "Convert multiple CSV/Parquet/GEFF files listed in a manifest in parallel.",
+    ),
+    "serve": (
+        "intracktive.server:server_cli",
+        "Serves data on the file system over HTTP bypassing CORS",
+    ),
+    "loadtest": (
+        "intracktive.loadtest:loadtest_cli",
+        "Simulate concurrent viewers of a bundle to benchmark the server.",
+    ),
+    "open": (
+        "intracktive.open:open_cli",
+        "Open a file in inTRACKtive viewer.",
+    ),
+}
 
-@click.group()
+
+class LazyGroup(click.Group):
+    """
+    Click group that only imports the module of a subcommand when that subcommand is used.
+    """
+
+    def __init__(
+        self,
+        *args,
+        lazy_subcommands: dict[str, tuple[str, str]] | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_subcommands))
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.lazy_subcommands and cmd_name not in self.commands:
+            import_path, _ = self.lazy_subcommands[cmd_name]
+            module_name, attribute = import_path.split(":")
+            command = getattr(importlib.import_module(module_name), attribute)
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(
+        self, ctx: click.Context, formatter: click.HelpFormatter
+    ) -> None:
+        # use the static help of the lazy subcommands instead of importing them
+        rows = []
+        for cmd_name in self.list_commands(ctx):
+            if cmd_name in self.commands:
+                command = self.commands[cmd_name]
+                if command.hidden:
+                    continue
+                rows.append((cmd_name, command.get_short_help_str()))
+            else:
+                rows.append((cmd_name, self.lazy_subcommands[cmd_name][1]))
+
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_subcommands=LAZY_SUBCOMMANDS)
 def main() -> None:
     # Configure logging for CLI
     logging.basicConfig(
@@ -17,9 +93,5 @@ def main() -> None:
     )
 
 
-main.add_command(convert_cli)
-main.add_command(server_cli)
-main.add_command(open_cli)
-
 if __name__ == "__main__":
     main()
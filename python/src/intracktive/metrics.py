@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+# groups of requests reported separately: the arrays of a bundle
+ARRAY_GROUPS = ("points", "time_offsets", "attributes")
+SPARSE_GROUPS = ("points_to_tracks", "tracks_to_points", "tracks_to_tracks")
+QUANTILES = (0.5, 0.95, 0.99)
+LATENCY_WINDOW = (
+    2048  # number of recent requests per group used for the latency quantiles
+)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = "/metrics"
+
+
+def request_group(url_path: str) -> str:
+    """
+    Group of a request, by the bundle array it reads.
+
+    Parameters
+    ----------
+    url_path : str
+        Path of the request URL, e.g. '/tracks_bundle.zarr/tracks_to_points/indptr/0'
+
+    Returns
+    -------
+    str
+        'points', 'time_offsets', 'attributes', '<sparse group>/<indptr|indices|data>' (e.g. 'tracks_to_points/indptr'),
+        'query/<name>', 'metadata' (other Zarr metadata files) or 'other'
+    """
+    parts = [part for part in url_path.split("?", 1)[0].split("/") if part]
+    for i, part in enumerate(parts):
+        if part == "query" and i == len(parts) - 2:
+            return f"query/{parts[i + 1]}"
+        if part in ARRAY_GROUPS:
+            return part
+        if part in SPARSE_GROUPS and i + 1 < len(parts):
+            return f"{part}/{parts[i + 1]}"
+    if parts and parts[-1] in (".zgroup", ".zattrs", ".zmetadata", "zarr.json"):
+        return "metadata"
+    return "other"
+
+
+def _quantile(sorted_values: list[float], q: float) -> float:
+    # nearest-rank quantile
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class ServerMetrics:
+    """
+    Thread-safe request metrics of the data server, exported in the Prometheus text format.
+
+    Requests are counted per group (see `request_group`) and status code, together with the number
+    of bytes served and the latency quantiles over the most recent requests of each group.
+    """
+
+    def __init__(self, chunk_cache=None) -> None:
+        self.chunk_cache = chunk_cache
+        self._lock = threading.Lock()
+        self._requests: defaultdict[tuple[str, int], int] = defaultdict(int)
+        self._bytes: defaultdict[str, int] = defaultdict(int)
+        self._latency_sum: defaultdict[str, float] = defaultdict(float)
+        self._latency_count: defaultdict[str, int] = defaultdict(int)
+        self._latencies: defaultdict[str, deque] = defaultdict(
+            lambda: deque(maxlen=LATENCY_WINDOW)
+        )
+        self.connections = 0
+        self.start_time = time.monotonic()
+
+    def connection_opened(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def connection_closed(self) -> None:
+        with self._lock:
+            self.connections -= 1
+
+    def observe(self, url_path: str, status: int, n_bytes: int, seconds: float) -> None:
+        """
+        Record a served request.
+
+        Parameters
+        ----------
+        url_path : str
+            Path of the request URL
+        status : int
+            Status code of the response
+        n_bytes : int
+            Size of the response body
+        seconds : float
+            Time between receiving the request and sending the response
+        """
+        group = request_group(url_path)
+        with self._lock:
+            self._requests[(group, int(status))] += 1
+            self._bytes[group] += n_bytes
+            self._latency_sum[group] += seconds
+            self._latency_count[group] += 1
+            self._latencies[group].append(seconds)
+
+    def summary(self) -> dict[str, dict]:
+        """
+        Number of requests, bytes served and latency quantiles (in seconds) of each group.
+        """
+        with self._lock:
+            latencies = {
+                group: sorted(values) for group, values in self._latencies.items()
+            }
+            summary = {
+                group: {
+                    "requests": self._latency_count[group],
+                    "bytes": self._bytes[group],
+                    **{f"p{round(q * 100)}": _quantile(values, q) for q in QUANTILES},
+                }
+                for group, values in latencies.items()
+            }
+        return summary
+
+    def log_summary(self) -> None:
+        """
+        Log the number of requests, bytes served and latencies of each group, and the cache hit rate.
+        """
+        summary = self.summary()
+        if not summary:
+            return
+        for group, values in sorted(summary.items()):
+            LOG.info(
+                f"{group}: {values['requests']} requests, {values['bytes'] / 1e6:.1f} MB, "
+                f"latency p50={values['p50'] * 1e3:.1f} ms p95={values['p95'] * 1e3:.1f} ms "
+                f"p99={values['p99'] * 1e3:.1f} ms"
+            )
+        message = f"{self.connections} open connections"
+        if self.chunk_cache is not None:
+            stats = self.chunk_cache.stats()
+            lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+            if lookups:
+                message += (
+                    f", chunk cache hit rate {100 * stats['hits'] / lookups:.1f}%"
+                )
+        LOG.info(message)
+
+    def start_periodic_logging(self, interval: float) -> threading.Thread:
+        """
+        Log a summary of the metrics every `interval` seconds, when new requests were served.
+        """
+
+        def run():
+            last_count = 0
+            while True:
+                time.sleep(interval)
+                with self._lock:
+                    count = sum(self._latency_count.values())
+                if count != last_count:
+                    last_count = count
+                    self.log_summary()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def render(self) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def add(name: str, kind: str, help: str, samples: list[tuple[str, float]]):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+
+        with self._lock:
+            requests = sorted(self._requests.items())
+            n_bytes = sorted(self._bytes.items())
+            latency_sum = dict(self._latency_sum)
+            latency_count = dict(self._latency_count)
+            latencies = {
+                group: sorted(values) for group, values in self._latencies.items()
+            }
+            connections = self.connections
+
+        add(
+            "intracktive_requests_total",
+            "counter",
+            "Number of HTTP requests by array group and status code.",
+            [
+                (f'{{group="{group}",status="{status}"}}', count)
+                for (group, status), count in requests
+            ],
+        )
+        add(
+            "intracktive_response_bytes_total",
+            "counter",
+            "Number of response body bytes by array group.",
+            [(f'{{group="{group}"}}', value) for group, value in n_bytes],
+        )
+        # the _sum and _count samples of the summary are rendered as suffixes of its name
+        samples = []
+        for group in sorted(latencies):
+            for q in QUANTILES:
+                samples.append(
+                    (
+                        f'{{group="{group}",quantile="{q}"}}',
+                        _quantile(latencies[group], q),
+                    )
+                )
+            samples.append((f'_sum{{group="{group}"}}', latency_sum[group]))
+            samples.append((f'_count{{group="{group}"}}', latency_count[group]))
+        add(
+            "intracktive_request_duration_seconds",
+            "summary",
+            f"Latency of the last {LATENCY_WINDOW} requests by array group.",
+            samples,
+        )
+        add(
+            "intracktive_connections_in_flight",
+            "gauge",
+            "Number of open client connections.",
+            [("", connections)],
+        )
+        add(
+            "intracktive_uptime_seconds",
+            "gauge",
+            "Time since the server started.",
+            [("", time.monotonic() - self.start_time)],
+        )
+
+        if self.chunk_cache is not None:
+            stats = self.chunk_cache.stats()
+            for key in ("hits", "misses", "coalesced", "evictions"):
+                add(
+                    f"intracktive_cache_{key}_total",
+                    "counter",
+                    f"Number of chunk cache {key}.",
+                    [("", stats[key])],
+                )
+            add(
+                "intracktive_cache_size_bytes",
+                "gauge",
+                "Size of the cached file contents.",
+                [("", stats["size"])],
+            )
+            add(
+                "intracktive_cache_entries",
+                "gauge",
+                "Number of cached files.",
+                [("", stats["entries"])],
+            )
+
+        return "\n".join(lines) + "\n"
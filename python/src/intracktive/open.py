@@ -1,13 +1,63 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import click
-from intracktive.convert import convert_file, is_geff_dataset, zarr_to_browser
+from intracktive import zipbundle
+from intracktive.convert import (
+    ProgressiveBundleWriter,
+    build_bundle,
+    get_bundle_name,
+    get_unique_zarr_path,
+    is_geff_dataset,
+    read_tracks_file,
+    zarr_to_browser,
+)
+from intracktive.virtual import open_virtual_bundle
+from intracktive.watch import BundleWatcher
 
 LOG = logging.getLogger(__name__)
 LOG.setLevel(logging.INFO)
 
 
+def _convert_progressively(
+    writer: ProgressiveBundleWriter,
+    input_path: Path,
+    add_radius: bool = False,
+    add_all_attributes: bool = False,
+    add_attribute: str | None = None,
+    add_hex_attribute: str | None = None,
+    calc_velocity: bool = False,
+    velocity_smoothing_windowsize: int = 1,
+    stage_cache: dict | None = None,
+) -> Path:
+    try:
+        tracks_df, extra_cols, col_types = read_tracks_file(
+            input_path,
+            add_radius=add_radius,
+            add_all_attributes=add_all_attributes,
+            add_attribute=add_attribute,
+            add_hex_attribute=add_hex_attribute,
+        )
+        build_bundle(
+            tracks_df,
+            add_radius=add_radius,
+            extra_cols=extra_cols,
+            attribute_types=col_types,
+            calc_velocity=calc_velocity,
+            velocity_smoothing_windowsize=velocity_smoothing_windowsize,
+            bundle=writer.bundle,
+            stage_cache=stage_cache,
+            progress=writer.progress,
+        )
+    except Exception:
+        LOG.exception(f"Conversion of {input_path} failed")
+        raise
+    finally:
+        writer.close()
+    return writer.zarr_path
+
+
 def open_file(
     input_path: Path,
     no_browser: bool = False,
@@ -18,12 +68,19 @@ def open_file(
     add_hex_attribute: str | None = None,
     calc_velocity: bool = False,
     velocity_smoothing_windowsize: int = 1,
+    virtual: bool = False,
+    watch: bool = False,
 ) -> Path:
     """
-    Open a file in inTRACKtive viewer. Supports Zarr stores, CSV, Parquet, and GEFF files.
+    Open a file in inTRACKtive viewer. Supports Zarr stores (directories or zip bundles),
+    CSV, Parquet, and GEFF files.
 
     This is the core function that can be called both programmatically and via CLI.
 
+    CSV, Parquet and GEFF files are converted while they are served: the server starts (and
+    the browser opens) right away, the bundle is written in the background, its points first,
+    and the server holds the requests for the files that are not written yet.
+
     Parameters
     ----------
     input_path : Path
@@ -44,11 +101,18 @@ def open_file(
         Boolean indicating whether to calculate velocity of the cells, by default False
     velocity_smoothing_windowsize : int, optional
         Smoothing factor for velocity calculation, by default 1
+    virtual : bool, optional
+        Serve CSV/Parquet/GEFF files from an in-memory (virtual) bundle instead of converting
+        them to a Zarr store on disk, by default False
+    watch : bool, optional
+        Watch a CSV/Parquet/GEFF file while it is served, and reconvert it when it changes:
+        the viewer loads the new bundle once it is written, by default False
 
     Returns
     -------
     Path
-        Path to the Zarr store that was opened
+        Path to the Zarr store that was opened (for a virtual bundle, the path where it is
+        mounted, which does not exist on disk; for a watched file, the latest version)
 
     Raises
     ------
@@ -57,10 +121,20 @@ def open_file(
     """
     # Determine if we need to convert the file
     file_extension = input_path.suffix.lower()
-    is_zarr = input_path.suffix == ".zarr"
+    is_zarr = input_path.suffix == ".zarr" or zipbundle.is_zip_bundle(input_path)
+
+    if is_zarr and virtual:
+        raise click.UsageError(
+            "--virtual only applies to CSV, Parquet and GEFF files, a Zarr store is served as is"
+        )
+
+    if watch and (is_zarr or virtual):
+        raise click.UsageError(
+            "--watch only applies to CSV, Parquet and GEFF files converted to a Zarr store"
+        )
 
     if is_zarr:
-        # Direct Zarr file - use as is
+        # Direct Zarr file (or zip bundle, served without extraction) - use as is
         zarr_path = input_path
         if not zarr_path.exists():
             raise click.UsageError(f"Zarr store does not exist: {zarr_path}")
@@ -75,8 +149,7 @@ def open_file(
         missing_folders = []
 
         for folder in required_folders:
-            folder_path = zarr_path / folder
-            if not folder_path.exists() or not folder_path.is_dir():
+            if not zipbundle.isdir(str(zarr_path / folder)):
                 missing_folders.append(folder)
 
         if missing_folders:
@@ -95,25 +168,78 @@ def open_file(
         if not input_path.exists():
             raise click.UsageError(f"Input file does not exist: {input_path}")
 
-        # Convert to Zarr
-        LOG.info(f"Converting {input_path} to Zarr format...")
-        zarr_path = convert_file(
-            input_file=input_path,
-            out_dir=out_dir,
+    if virtual:
+        # Serve the chunks from memory, encoded on request: nothing is written to disk
+        LOG.info(f"Building a virtual bundle from {input_path}...")
+        zarr_path = Path(
+            open_virtual_bundle(
+                input_path,
+                add_radius=add_radius,
+                add_all_attributes=add_all_attributes,
+                add_attribute=add_attribute,
+                add_hex_attribute=add_hex_attribute,
+                calc_velocity=calc_velocity,
+                velocity_smoothing_windowsize=velocity_smoothing_windowsize,
+            ).path
+        )
+
+    conversion = None
+    watcher = None
+    if not is_zarr and not virtual:
+        # Convert to Zarr in the background, while the bundle is served
+        zarr_path = get_unique_zarr_path(
+            Path(input_path.parent if out_dir is None else out_dir).resolve()
+            / f"{get_bundle_name(input_path)}_bundle.zarr"
+        )
+        LOG.info(f"Converting {input_path} to Zarr format at {zarr_path}...")
+        writer = ProgressiveBundleWriter(zarr_path)
+        if watch:
+            # the viewer polls the attributes of watched bundles for a newer version
+            writer.bundle.attrs[""]["watched"] = True
+            watcher = BundleWatcher(
+                input_path,
+                zarr_path,
+                add_radius=add_radius,
+                add_all_attributes=add_all_attributes,
+                add_attribute=add_attribute,
+                add_hex_attribute=add_hex_attribute,
+                calc_velocity=calc_velocity,
+                velocity_smoothing_windowsize=velocity_smoothing_windowsize,
+            )
+        executor = ThreadPoolExecutor(max_workers=1)
+        conversion = executor.submit(
+            _convert_progressively,
+            writer,
+            input_path,
             add_radius=add_radius,
             add_all_attributes=add_all_attributes,
             add_attribute=add_attribute,
             add_hex_attribute=add_hex_attribute,
             calc_velocity=calc_velocity,
             velocity_smoothing_windowsize=velocity_smoothing_windowsize,
+            stage_cache=None if watcher is None else watcher.stage_cache,
         )
-        LOG.info(f"Conversion completed! Zarr store created at: {zarr_path}")
+        executor.shutdown(wait=False)
+        if watcher is not None:
+            watcher.start(first_conversion=conversion)
 
     LOG.info(f"zarr_path in open_file: {zarr_path}")
     # Open in browser
-    zarr_to_browser(
-        zarr_path=zarr_path, flag_open_browser=not no_browser, threaded=False
-    )
+    try:
+        zarr_to_browser(
+            zarr_path=zarr_path, flag_open_browser=not no_browser, threaded=False
+        )
+    finally:
+        if watcher is not None:
+            watcher.stop()
+
+    if conversion is not None:
+        conversion.result()
+        LOG.info(f"Conversion completed! Zarr store created at: {zarr_path}")
+    if watcher is not None and watcher.latest != zarr_path:
+        # the first bundle may have been deleted by later reconversions
+        zarr_path = watcher.latest
+        LOG.info(f"Latest reconversion of {input_path} at: {zarr_path}")
 
     return zarr_path
 
@@ -174,6 +300,18 @@ def open_file(
     default=1,
     help="Smoothing factor for velocity calculation, using a moving average over n frames around each frame",
 )
+@click.option(
+    "--virtual",
+    is_flag=True,
+    default=False,
+    help="Serve CSV/Parquet/GEFF files from memory without writing a Zarr store: chunks are encoded when the viewer requests them (default: False)",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Reconvert CSV/Parquet/GEFF files when they change, and reload them in the viewer (default: False)",
+)
 def open_cli(
     input_path: Path,
     no_browser: bool,
@@ -184,6 +322,8 @@ def open_cli(
     add_hex_attribute: str | None,
     calc_velocity: bool,
     velocity_smoothing_windowsize: int,
+    virtual: bool,
+    watch: bool,
 ) -> None:
     """
     Open a file in inTRACKtive viewer. Supports Zarr stores, CSV, Parquet, and GEFF files.
@@ -192,8 +332,8 @@ def open_cli(
         INPUT_PATH: Path to the file (Zarr store, CSV, Parquet, or GEFF)
 
     This command will:
-    1. If input is CSV/Parquet/GEFF: Convert to Zarr format first
-    2. Start a local server to host the Zarr store
+    1. If input is CSV/Parquet/GEFF: Convert to Zarr format, in the background
+    2. Start a local server to host the Zarr store (while it is written)
     3. Generate a URL for viewing in inTRACKtive
     4. Open the browser (unless --no-browser is specified)
 
@@ -206,6 +346,8 @@ def open_cli(
     intracktive open /path/to/data.csv
     intracktive open /path/to/data.parquet
     intracktive open /path/to/data.geff
+    intracktive open /path/to/data.csv --virtual
+    intracktive open /path/to/data.csv --watch
     """
     open_file(
         input_path=input_path,
@@ -217,6 +359,8 @@ def open_cli(
         add_hex_attribute=add_hex_attribute,
         calc_velocity=calc_velocity,
         velocity_smoothing_windowsize=velocity_smoothing_windowsize,
+        virtual=virtual,
+        watch=watch,
     )
 
 
@@ -0,0 +1,114 @@
+import numpy as np
+
+# Coordinates can be stored quantized to 16 bits (see `build_bundle(quantize=True)`): a stored
+# value `q` is the coordinate `q * scale + offset`, with `scale` and `offset` in the `quantization`
+# attribute of the array. The range of the coordinates is mapped to [0, QUANTIZED_MAX], so the
+# error of a coordinate is at most `scale / 2` (stored as `max_error`), e.g. 0.015 µm for a
+# field of 2 mm. QUANTIZED_PADDING stands for the padding of the points (INF_SPACE).
+QUANTIZED_DTYPE = np.dtype(np.uint16)
+QUANTIZED_MAX = 65534
+QUANTIZED_PADDING = 65535
+# The coordinates of the points of a track (`tracks_to_points/data`) can also be delta encoded
+# (`"delta": true`): the first point of a track is stored as `q - DELTA_BASE`, the next ones as the
+# difference with the previous point, as int16, which compresses better.
+DELTA_DTYPE = np.dtype(np.int16)
+DELTA_BASE = 32767
+
+
+def quantization_params(values: np.ndarray) -> dict:
+    """
+    Quantization attribute of coordinates (an empty array has scale 1 and offset 0).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    low = float(values.min()) if values.size else 0.0
+    high = float(values.max()) if values.size else 0.0
+    scale = (high - low) / QUANTIZED_MAX if high > low else 1.0
+    return {"scale": scale, "offset": low, "max_error": scale / 2}
+
+
+def quantize_values(
+    values: np.ndarray, quantization: dict, valid: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Quantize coordinates to 16 bits, the values that are not valid (e.g. padding) to
+    QUANTIZED_PADDING.
+    """
+    stored = np.rint(
+        (np.asarray(values, dtype=np.float64) - quantization["offset"])
+        / quantization["scale"]
+    )
+    stored = np.clip(stored, 0, QUANTIZED_MAX).astype(QUANTIZED_DTYPE)
+    if valid is not None:
+        stored[~valid] = QUANTIZED_PADDING
+    return stored
+
+
+def dequantize_values(
+    stored: np.ndarray, quantization: dict, padding: float | None = None
+) -> np.ndarray:
+    """
+    Coordinates of quantized values (float32), QUANTIZED_PADDING replaced by `padding` if given.
+    """
+    values = (
+        stored.astype(np.float64) * quantization["scale"] + quantization["offset"]
+    ).astype(np.float32)
+    if padding is not None:
+        values[stored == QUANTIZED_PADDING] = padding
+    return values
+
+
+def delta_encode_values(stored: np.ndarray, lengths: np.ndarray) -> np.ndarray | None:
+    """
+    Delta encode the quantized coordinates of consecutive rows (e.g. the points of each track),
+    or None if a difference does not fit in DELTA_DTYPE.
+
+    Parameters
+    ----------
+    stored : np.ndarray
+        (n, k) quantized coordinates of the points of all rows, row after row
+    lengths : np.ndarray
+        Number of points of each row
+    """
+    values = stored.astype(np.int64)
+    encoded = values.copy()
+    encoded[1:] -= values[:-1]
+    lengths = np.asarray(lengths, dtype=np.int64)
+    starts = (np.cumsum(lengths) - lengths)[lengths > 0]
+    encoded[starts] = values[starts] - DELTA_BASE
+    info = np.iinfo(DELTA_DTYPE)
+    if encoded.size and (encoded.min() < info.min or encoded.max() > info.max):
+        return None
+    return encoded.astype(DELTA_DTYPE)
+
+
+def delta_decode_values(encoded: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Quantized coordinates of delta encoded rows, see `delta_encode_values`. The rows must be complete.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    cumulative = np.cumsum(encoded.astype(np.int64), axis=0)
+    # sum of the values before each row, subtracted from the values of the row
+    starts = np.cumsum(lengths) - lengths
+    before = np.zeros((len(lengths), *encoded.shape[1:]), dtype=np.int64)
+    nonzero = starts > 0
+    before[nonzero] = cumulative[starts[nonzero] - 1]
+    return (cumulative - np.repeat(before, lengths, axis=0) + DELTA_BASE).astype(
+        QUANTIZED_DTYPE
+    )
+
+
+def decode_coordinates(
+    stored: np.ndarray,
+    quantization: dict | None,
+    lengths: np.ndarray | None = None,
+    padding: float | None = None,
+) -> np.ndarray:
+    """
+    Coordinates of the values of an array with the `quantization` attribute (None if the
+    values are not quantized), of complete rows of `lengths` points if it is delta encoded.
+    """
+    if quantization is None:
+        return stored
+    if quantization.get("delta"):
+        stored = delta_decode_values(stored, lengths)
+    return dequantize_values(stored, quantization, padding)
@@ -1,13 +1,71 @@
+import datetime
+import email.utils
+import functools
+import gzip
+import io
+import json
 import logging
+import mimetypes
+import os
+import posixpath
+import queue
+import re
+import selectors
 import socket
 import socketserver
+import struct
 import threading
+import time
+import urllib.parse
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from http import HTTPStatus
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from pathlib import Path
 
 import click
+from intracktive import zipbundle
+from intracktive.metrics import METRICS_PATH, PROMETHEUS_CONTENT_TYPE, ServerMetrics
 
 DEFAULT_HOST = "127.0.0.1"
+DEFAULT_MAX_WORKERS = 32
+KEEP_ALIVE_TIMEOUT = 10  # seconds an idle persistent connection is kept open
+# seconds between checks of an idle persistent connection, which is closed as soon as other
+# connections wait for a worker of the pool
+IDLE_POLL_INTERVAL = 0.05
+COPY_BUFFER_SIZE = 64 * 1024
+DEFAULT_CACHE_SIZE_MB = 256
+DEFAULT_METRICS_LOG_INTERVAL = 60  # seconds between summary logs of the server metrics
+# larger files (e.g. big tracks_to_points/data chunks) are always streamed from disk
+MAX_CACHED_FILE_SIZE = 16 * 1024 * 1024
+# bundle URLs are not versioned (e.g. `convert --overwrite_zarr` rewrites a bundle in place):
+# responses are cached, but revalidated with their ETag on every use (a cheap 304)
+CACHE_CONTROL = "public, no-cache"
+# precompressed sidecar files (e.g. `.zarray.gz`), in order of preference
+SIDECAR_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+GZIP_LEVEL = 6
+MIN_COMPRESS_SIZE = 256  # smaller files do not benefit from compression
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "image/svg+xml")
+# queries are requested at <bundle url>/query/<name>?<parameters>
+QUERY_SEGMENT = "/query/"
+MAX_QUERY_IDS = 100_000
+MAX_BATCH_CHUNKS = 1024
+# framed binary response of the chunks query, see `query_chunks`
+CHUNK_FRAMES_MAGIC = b"ITKC"
+CHUNK_FRAMES_CONTENT_TYPE = "application/x-intracktive-chunks"
+# summary of the bundles served by a catalog server, see `intracktive.catalog`
+CATALOG_PATH = "/catalog.json"
+# more ranges than this in a single request are ignored (the full file is served)
+MAX_RANGES = 100
+# seconds a request for a file of a bundle being written waits for the file, see `wait_for_file`
+PENDING_WAIT_TIMEOUT = 120.0
+CORS_HEADERS = [
+    ("Access-Control-Allow-Origin", "*"),
+    ("Access-Control-Allow-Methods", "GET, POST, OPTIONS"),
+    ("Access-Control-Allow-Headers", "*"),
+]
+_BYTE_RANGE_RE = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
 
 LOG = logging.getLogger(__name__)
 LOG.setLevel(logging.INFO)
@@ -19,27 +77,1066 @@ class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
     daemon_threads = True  # Ensure threads close when main thread exits
 
 
+class PooledHTTPServer(HTTPServer):
+    """
+    Handle connections with a bounded pool of worker threads.
+
+    Accepted connections are queued for the workers. When the queue is full, the accept loop
+    blocks until a worker is free (backpressure), so a burst of requests (e.g. a lineage-heavy
+    selection) cannot spawn thousands of threads. A worker holding an idle persistent
+    connection gives it up as soon as other connections are queued (see `has_waiting`).
+    """
+
+    request_queue_size = 128  # listen backlog of the socket
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        RequestHandlerClass,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_pending: int | None = None,
+    ) -> None:
+        super().__init__(server_address, RequestHandlerClass)
+        self._pending = queue.Queue(maxsize=max_pending or 4 * max_workers)
+        self._workers = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def process_request(self, request, client_address) -> None:
+        self._pending.put((request, client_address))
+
+    def has_waiting(self) -> bool:
+        """
+        Whether accepted connections wait for a free worker.
+        """
+        return not self._pending.empty()
+
+    def _work(self) -> None:
+        while (item := self._pending.get()) is not None:
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        for _ in self._workers:
+            self._pending.put(None)
+
+
+class ChunkCache:
+    """
+    Thread-safe LRU cache of file contents bounded by their total size in bytes.
+
+    Entries are keyed by path and validated with the modification time and size of the file,
+    so a rewritten file is read again. Concurrent requests for the same uncached file are
+    coalesced: a single thread reads the file while the others wait for its contents.
+    Files can also be cached gzip-compressed, for responses encoded on the fly.
+    """
+
+    def __init__(
+        self, max_bytes: int, max_file_size: int = MAX_CACHED_FILE_SIZE
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_file_size = min(max_file_size, max_bytes)
+        self._entries: OrderedDict[
+            tuple[str, str | None], tuple[tuple[int, int], bytes]
+        ] = OrderedDict()
+        self._inflight: dict[tuple[str, str | None, int, int], Future] = {}
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def lookup(
+        self, path: str, fs: os.stat_result, encoding: str | None = None
+    ) -> bytes | None:
+        """
+        Return the cached contents of a file without reading it, or None if not cached.
+        """
+        with self._lock:
+            entry = self._entries.get((path, encoding))
+            if entry is None or entry[0] != (fs.st_mtime_ns, fs.st_size):
+                return None
+            self._entries.move_to_end((path, encoding))
+            self.hits += 1
+            return entry[1]
+
+    def get(
+        self, path: str, fs: os.stat_result, encoding: str | None = None
+    ) -> bytes | None:
+        """
+        Return the contents of a file, reading it into the cache if needed.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file
+        fs : os.stat_result
+            Status of the file, used to validate the cached contents
+        encoding : str | None
+            None for the contents of the file, or "gzip" for the gzip-compressed contents
+
+        Returns
+        -------
+        bytes | None
+            Contents of the file, or None if the file is too large to be cached
+        """
+        if fs.st_size > self.max_file_size:
+            return None
+
+        version = (fs.st_mtime_ns, fs.st_size)
+        name = (path, encoding)
+        key = (*name, *version)
+        leader = False
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            # another thread is reading this file, wait for its contents
+            return future.result()
+
+        try:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except (FileNotFoundError, NotADirectoryError):
+                # a member of a zip bundle
+                data = zipbundle.read_bytes(path)
+            if encoding == "gzip":
+                data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            self._insert(name, version, data)
+        future.set_result(data)
+        return data
+
+    def _insert(
+        self, name: tuple[str, str | None], version: tuple[int, int], data: bytes
+    ) -> None:
+        previous = self._entries.pop(name, None)
+        if previous is not None:
+            self.size -= len(previous[1])
+        self._entries[name] = (version, data)
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size": self.size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def translate_path(directory: str, url_path: str) -> str:
+    """
+    Translate a URL path to a path below the served directory (as SimpleHTTPRequestHandler does).
+
+    Parameters
+    ----------
+    directory : str
+        The directory being served
+    url_path : str
+        The path of the request URL
+
+    Returns
+    -------
+    str
+        The path on the file system, with a trailing slash if the URL had one
+    """
+    path = url_path.split("?", 1)[0].split("#", 1)[0]
+    trailing_slash = path.rstrip().endswith("/")
+    path = urllib.parse.unquote(path, errors="surrogatepass")
+    path = posixpath.normpath(path)
+    result = directory
+    for word in filter(None, path.split("/")):
+        if os.path.dirname(word) or word in (os.curdir, os.pardir):
+            # ignore components that are not a simple file/directory name
+            continue
+        result = os.path.join(result, word)
+    if trailing_slash:
+        result += "/"
+    return result
+
+
+# Bundles being written while they are served (e.g. by `intracktive open`):
+# bundle path -> paths (relative to the bundle) of the directories whose files are all written
+_pending_bundles: dict[str, set[str]] = {}
+_pending_condition = threading.Condition()
+
+
+def begin_pending_bundle(bundle_path: str) -> None:
+    """
+    Declare that a bundle is being written: requests for its files that do not exist yet
+    wait for them (see `wait_for_file`) instead of failing with 404.
+    """
+    with _pending_condition:
+        _pending_bundles[os.path.abspath(bundle_path)] = set()
+
+
+def complete_pending_directory(bundle_path: str, name: str = "") -> None:
+    """
+    Declare that all the files of a directory of a bundle being written (e.g. 'points', or ''
+    for the top-level group) are written: requests for its other files fail without waiting.
+    """
+    with _pending_condition:
+        completed = _pending_bundles.get(os.path.abspath(bundle_path))
+        if completed is not None:
+            completed.add(name)
+        _pending_condition.notify_all()
+
+
+def notify_pending_bundles() -> None:
+    """
+    Wake up the requests waiting for files of bundles being written, after writing files.
+    """
+    with _pending_condition:
+        _pending_condition.notify_all()
+
+
+def end_pending_bundle(bundle_path: str) -> None:
+    """
+    Declare that a bundle is written (or that writing it failed): requests for missing files
+    fail without waiting.
+    """
+    with _pending_condition:
+        _pending_bundles.pop(os.path.abspath(bundle_path), None)
+        _pending_condition.notify_all()
+
+
+def _pending_directory(path: str) -> tuple[str, str] | None:
+    for bundle_path in list(_pending_bundles):
+        if path.startswith(bundle_path + os.sep):
+            name = path[len(bundle_path) + 1 :].replace(os.sep, "/")
+            return bundle_path, posixpath.dirname(name)
+    return None
+
+
+def is_pending(path: str) -> bool:
+    """
+    Whether a path is in a bundle being written.
+    """
+    return bool(_pending_bundles) and _pending_directory(path) is not None
+
+
+def wait_for_file(path: str, timeout: float = PENDING_WAIT_TIMEOUT) -> bool:
+    """
+    Wait until a file of a bundle being written exists, the directory of the file is complete
+    (the file will never exist, e.g. a chunk only containing the fill value), the bundle is
+    written, or the timeout expires.
+
+    Returns
+    -------
+    bool
+        Whether the file exists
+    """
+    deadline = time.monotonic() + timeout
+    with _pending_condition:
+        while not zipbundle.isfile(path):
+            pending = _pending_directory(path)
+            if pending is None or pending[1] in _pending_bundles[pending[0]]:
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _pending_condition.wait(remaining)
+    return True
+
+
+def parse_range_header(value: str, size: int) -> list[tuple[int, int]] | None:
+    """
+    Parse the value of an HTTP Range header (RFC 9110, section 14.2).
+
+    Parameters
+    ----------
+    value : str
+        Value of the Range header, e.g. 'bytes=0-99,200-,-50'
+    size : int
+        Size of the requested file in bytes
+
+    Returns
+    -------
+    list[tuple[int, int]] | None
+        List of satisfiable (start, end) byte ranges, with inclusive end.
+        An empty list if none of the ranges is satisfiable (the response must be a 416),
+        or None if the header is malformed or unsupported (the Range header must be ignored).
+    """
+    unit, _, range_set = value.partition("=")
+    if unit.strip().lower() != "bytes" or not range_set:
+        return None
+
+    specs = range_set.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        match = _BYTE_RANGE_RE.match(spec)
+        if match is None:
+            return None
+        first, last = match.groups()
+        if first == "" and last == "":
+            return None
+        if first == "":
+            # suffix range: the last N bytes
+            length = int(last)
+            if length == 0 or size == 0:
+                # no bytes to select (every range of an empty file is unsatisfiable)
+                continue
+            ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(first)
+        end = size - 1 if last == "" else min(int(last), size - 1)
+        if last != "" and int(last) < start:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, end))
+
+    return ranges
+
+
+def make_etag(fs: os.stat_result, encoding: str | None = None) -> str:
+    """
+    Strong entity tag of a file, from its inode, modification time and size.
+
+    Each content encoding of the file is a different representation with its own entity tag.
+    """
+    suffix = f"-{encoding}" if encoding else ""
+    return f'"{fs.st_ino:x}-{fs.st_mtime_ns:x}-{fs.st_size:x}{suffix}"'
+
+
+def caching_headers(
+    path: str, fs: os.stat_result, encoding: str | None = None
+) -> list[tuple[str, str]]:
+    """
+    Validator and Cache-Control headers of a file.
+
+    Files are revalidated every time they are used: a bundle may be rewritten at the same URL
+    (overwritten, or another bundle of the same name), and stale chunks must not be mixed with
+    its new metadata. The strong entity tag changes with the file, unchanged files get a 304.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file
+    fs : os.stat_result
+        Status of the file
+    encoding : str | None
+        Content encoding of the response, by default None (identity)
+
+    Returns
+    -------
+    list[tuple[str, str]]
+        ETag, Last-Modified, Cache-Control and Vary headers
+    """
+    return [
+        ("ETag", make_etag(fs, encoding)),
+        ("Last-Modified", email.utils.formatdate(fs.st_mtime, usegmt=True)),
+        ("Cache-Control", CACHE_CONTROL),
+        ("Vary", "Accept-Encoding"),
+    ]
+
+
+def if_range_matches(headers, fs: os.stat_result) -> bool:
+    """
+    Check the If-Range precondition: the Range header only applies if the file did not change.
+
+    Parameters
+    ----------
+    headers : email.message.Message
+        Request headers
+    fs : os.stat_result
+        Status of the requested file
+
+    Returns
+    -------
+    bool
+        True if the Range header must be honored
+    """
+    if "If-Range" not in headers:
+        return True
+    value = headers["If-Range"].strip()
+    if value.startswith('"'):
+        # entity tags must match strongly
+        return value == make_etag(fs)
+    return value == email.utils.formatdate(fs.st_mtime, usegmt=True)
+
+
+def is_not_modified(headers, fs: os.stat_result, encoding: str | None = None) -> bool:
+    """
+    Check the If-None-Match and If-Modified-Since preconditions (RFC 9110, section 13.2.2).
+
+    Parameters
+    ----------
+    headers : email.message.Message
+        Request headers
+    fs : os.stat_result
+        Status of the requested file
+    encoding : str | None
+        Content encoding of the selected representation, by default None (identity)
+
+    Returns
+    -------
+    bool
+        True if a 304 (Not Modified) response must be sent
+    """
+    if "If-None-Match" in headers:
+        # If-Modified-Since is ignored when If-None-Match is present
+        etags = [etag.strip() for etag in headers["If-None-Match"].split(",")]
+        etag = make_etag(fs, encoding)
+        return any(
+            candidate == "*" or candidate.removeprefix("W/") == etag
+            for candidate in etags
+        )
+    if "If-Modified-Since" not in headers:
+        return False
+    try:
+        ims = email.utils.parsedate_to_datetime(headers["If-Modified-Since"])
+    except (TypeError, IndexError, OverflowError, ValueError):
+        return False
+    if ims.tzinfo is None:
+        ims = ims.replace(tzinfo=datetime.timezone.utc)
+    last_modif = datetime.datetime.fromtimestamp(
+        fs.st_mtime, datetime.timezone.utc
+    ).replace(microsecond=0)
+    return last_modif <= ims
+
+
+def parse_accept_encoding(value: str) -> dict[str, float]:
+    """
+    Parse the value of an Accept-Encoding header into a mapping of content coding to quality.
+    """
+    accepted = {}
+    for item in value.split(","):
+        coding, *params = item.strip().split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, q = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(q)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+@functools.lru_cache(maxsize=1024)
+def _is_uncompressed_array(zarray_path: str, mtime_ns: int) -> bool:
+    try:
+        return json.loads(zipbundle.read_bytes(zarray_path)).get("compressor") is None
+    except (OSError, ValueError, AttributeError):
+        return False
+
+
+def is_compressible(path: str) -> bool:
+    """
+    Whether a file benefits from compression: Zarr metadata, text, and chunks of uncompressed arrays.
+
+    Chunks of arrays written with a compressor (the Zarr default) are not compressed again.
+    """
+    name = os.path.basename(path)
+    if name.startswith(".") or name == "zarr.json":
+        return True
+    ctype = mimetypes.guess_type(path)[0]
+    if ctype is not None and (ctype.startswith("text/") or ctype in COMPRESSIBLE_TYPES):
+        return True
+    zarray_path = os.path.join(os.path.dirname(path), ".zarray")
+    try:
+        mtime_ns = zipbundle.stat(zarray_path).st_mtime_ns
+    except OSError:
+        return False
+    return _is_uncompressed_array(zarray_path, mtime_ns)
+
+
+def negotiate_encoding(
+    headers, path: str, fs: os.stat_result
+) -> tuple[str | None, str | None]:
+    """
+    Select the content encoding of the response to a GET or HEAD request.
+
+    A precompressed sidecar file (e.g. `points/.zarray.br`) accepted by the client is preferred,
+    otherwise compressible files are gzip-compressed on the fly. Range requests are always
+    answered with the identity encoding.
+
+    Parameters
+    ----------
+    headers : email.message.Message
+        Request headers
+    path : str
+        Path of the requested file
+    fs : os.stat_result
+        Status of the requested file
+
+    Returns
+    -------
+    tuple[str | None, str | None]
+        The content encoding (None for identity), and the path of the sidecar file to serve
+        (None to compress on the fly)
+    """
+    if "Range" in headers or "Accept-Encoding" not in headers:
+        return None, None
+    accepted = parse_accept_encoding(headers["Accept-Encoding"])
+
+    for encoding, suffix in SIDECAR_ENCODINGS:
+        if accepted.get(encoding, 0) <= 0:
+            continue
+        try:
+            sidecar_fs = zipbundle.stat(path + suffix)
+        except OSError:
+            continue
+        # ignore sidecars older than the file they compress
+        if sidecar_fs.st_mtime_ns >= fs.st_mtime_ns:
+            return encoding, path + suffix
+
+    if (
+        accepted.get("gzip", 0) > 0
+        and MIN_COMPRESS_SIZE <= fs.st_size <= MAX_CACHED_FILE_SIZE
+        and is_compressible(path)
+    ):
+        return "gzip", None
+    return None, None
+
+
+def compress_file(
+    path: str, fs: os.stat_result, chunk_cache: ChunkCache | None = None
+) -> bytes:
+    """
+    Return the gzip-compressed contents of a file, from the chunk cache when it is enabled.
+    """
+    if chunk_cache is not None:
+        data = chunk_cache.get(path, fs, encoding="gzip")
+        if data is not None:
+            return data
+    return gzip.compress(zipbundle.read_bytes(path), compresslevel=GZIP_LEVEL)
+
+
+def _parse_ids(params: dict[str, list[str]], key: str) -> list[int]:
+    """
+    Parse a list of integer ids given as comma-separated and/or repeated query parameters.
+    """
+    try:
+        ids = [
+            int(value)
+            for values in params.get(key, [])
+            for value in values.split(",")
+            if value.strip()
+        ]
+    except ValueError:
+        raise ValueError(
+            f"Parameter '{key}' must be a comma-separated list of integers"
+        )
+    if not ids:
+        raise ValueError(f"Missing parameter '{key}'")
+    if len(ids) > MAX_QUERY_IDS:
+        raise ValueError(f"At most {MAX_QUERY_IDS} ids can be queried at once")
+    return ids
+
+
+def query_lineage(bundle_path: str, params: dict[str, list[str]]) -> tuple[str, bytes]:
+    """
+    Query the lineages of selected points: `<bundle url>/query/lineage?points=1,2,3`.
+
+    Returns the JSON of `BundleReader.query_lineage`, i.e. the tracks of the lineages with
+    their parent track ids and polylines, which the viewer otherwise fetches with one request
+    per sparse array slice.
+    """
+    # imported here, so that serving files does not require importing zarr
+    from intracktive.bundle import open_bundle
+
+    point_ids = _parse_ids(params, "points")
+    result = open_bundle(bundle_path).query_lineage(point_ids)
+    return "application/json", json.dumps(result).encode("utf-8")
+
+
+def _bundle_file(bundle_path: str, key: str) -> str:
+    """
+    Path of a file of a bundle, refusing keys that point outside of the bundle.
+    """
+    parts = key.split("/")
+    if not key or key.startswith("/") or any(p in ("", ".", "..") for p in parts):
+        raise ValueError(f"Invalid chunk key '{key}'")
+    return os.path.join(bundle_path, *parts)
+
+
+def encode_chunk_frames(chunks: list[tuple[str, bytes | None]]) -> bytes:
+    """
+    Encode chunks in the framed binary format of the chunks query.
+
+    The format is the magic bytes `ITKC` and the number of frames (uint32), followed by one frame
+    per chunk: the length of the key (uint32), the UTF-8 key, the length of the data (int64,
+    -1 for a missing chunk, i.e. filled with the fill value) and the data as stored on disk.
+    All integers are little-endian.
+    """
+    frames = [CHUNK_FRAMES_MAGIC, struct.pack("<I", len(chunks))]
+    for key, data in chunks:
+        encoded_key = key.encode("utf-8")
+        frames.append(struct.pack("<I", len(encoded_key)))
+        frames.append(encoded_key)
+        frames.append(struct.pack("<q", -1 if data is None else len(data)))
+        if data is not None:
+            frames.append(data)
+    return b"".join(frames)
+
+
+def decode_chunk_frames(body: bytes) -> dict[str, bytes | None]:
+    """
+    Decode a framed binary response of the chunks query (see `encode_chunk_frames`).
+    """
+    if body[:4] != CHUNK_FRAMES_MAGIC:
+        raise ValueError("Not a framed chunks response")
+    view = memoryview(body)
+    (n_frames,) = struct.unpack_from("<I", view, 4)
+    offset = 8
+    chunks = {}
+    for _ in range(n_frames):
+        (key_length,) = struct.unpack_from("<I", view, offset)
+        offset += 4
+        key = bytes(view[offset : offset + key_length]).decode("utf-8")
+        offset += key_length
+        (data_length,) = struct.unpack_from("<q", view, offset)
+        offset += 8
+        if data_length < 0:
+            chunks[key] = None
+            continue
+        chunks[key] = bytes(view[offset : offset + data_length])
+        offset += data_length
+    return chunks
+
+
+def query_chunks(bundle_path: str, params: dict[str, list[str]]) -> tuple[str, bytes]:
+    """
+    Fetch multiple chunks at once: `<bundle url>/query/chunks?keys=points/10.0,attributes/10.0`.
+
+    The keys are paths of chunk files relative to the bundle, the response contains their
+    contents (as stored, i.e. still compressed by zarr) framed by `encode_chunk_frames`.
+    This replaces one request per chunk, e.g. for the points of all time points of a trail window.
+    """
+    keys = [
+        key.strip()
+        for values in params.get("keys", [])
+        for key in values.split(",")
+        if key.strip()
+    ]
+    if not keys:
+        raise ValueError("Missing parameter 'keys'")
+    if len(keys) > MAX_BATCH_CHUNKS:
+        raise ValueError(f"At most {MAX_BATCH_CHUNKS} chunks can be fetched at once")
+    if not zipbundle.isdir(bundle_path):
+        raise FileNotFoundError(bundle_path)
+
+    chunks = []
+    for key in keys:
+        try:
+            chunks.append((key, zipbundle.read_bytes(_bundle_file(bundle_path, key))))
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            chunks.append((key, None))
+    return CHUNK_FRAMES_CONTENT_TYPE, encode_chunk_frames(chunks)
+
+
+# name -> function(bundle path, query parameters) returning the content type and body
+QUERY_HANDLERS = {
+    "lineage": query_lineage,
+    "chunks": query_chunks,
+}
+
+
+def parse_query_target(target: str) -> tuple[str, str, dict[str, list[str]]] | None:
+    """
+    Split the target of a query request into the bundle URL path, the query name and its parameters.
+
+    Parameters
+    ----------
+    target : str
+        Request target, e.g. '/tracks_bundle.zarr/query/lineage?points=1,2'
+
+    Returns
+    -------
+    tuple[str, str, dict[str, list[str]]] | None
+        e.g. ('/tracks_bundle.zarr/', 'lineage', {'points': ['1,2']}),
+        or None if the target is not a known query (and must be served as a file)
+    """
+    url = urllib.parse.urlsplit(target)
+    prefix, segment, name = url.path.rpartition(QUERY_SEGMENT)
+    if not segment or name not in QUERY_HANDLERS:
+        return None
+    return prefix + "/", name, urllib.parse.parse_qs(url.query)
+
+
+def run_query(
+    bundle_path: str, name: str, params: dict[str, list[str]]
+) -> tuple[HTTPStatus, list[tuple[str, str]], bytes]:
+    """
+    Run a query on a bundle and build the response.
+
+    Parameters
+    ----------
+    bundle_path : str
+        Path of the bundle on the file system
+    name : str
+        Name of the query, a key of QUERY_HANDLERS
+    params : dict[str, list[str]]
+        Query parameters
+
+    Returns
+    -------
+    tuple[HTTPStatus, list[tuple[str, str]], bytes]
+        Status, headers (without Content-Length) and body of the response.
+        Errors are reported with a JSON body {"error": message}.
+    """
+    try:
+        content_type, body = QUERY_HANDLERS[name](bundle_path, params)
+        status = HTTPStatus.OK
+    except FileNotFoundError:
+        status = HTTPStatus.NOT_FOUND
+        content_type = "application/json"
+        body = json.dumps({"error": f"No bundle found for query '{name}'"}).encode()
+    except ValueError as e:
+        status = HTTPStatus.BAD_REQUEST
+        content_type = "application/json"
+        body = json.dumps({"error": str(e)}).encode()
+    return status, [("Content-Type", content_type), ("Cache-Control", "no-store")], body
+
+
 class CORSRequestHandler(SimpleHTTPRequestHandler):
+    # persistent connections: every response must have a correct Content-Length
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+
     def __init__(
-        self, *args, directory: str = None, enable_logging: bool = False, **kwargs
+        self,
+        *args,
+        directory: str = None,
+        enable_logging: bool = False,
+        chunk_cache: ChunkCache | None = None,
+        metrics: ServerMetrics | None = None,
+        catalog=None,
+        **kwargs,
     ) -> None:
         self.directory = directory
         self.enable_logging = enable_logging
+        self.chunk_cache = chunk_cache
+        self.metrics = metrics
+        self.catalog = catalog
+        # byte ranges to copy in `copyfile`: list of (part header, start, length) and a trailer
+        self._range_parts: list[tuple[bytes, int, int]] | None = None
+        self._range_trailer = b""
+        # status, body size and start time of the current request, for the metrics
+        self._response_status: int | None = None
+        self._response_length = 0
+        self._request_start = 0.0
         super().__init__(*args, directory=directory, **kwargs)
 
+    def setup(self):
+        super().setup()
+        if self.metrics is not None:
+            self.metrics.connection_opened()
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            if self.metrics is not None:
+                self.metrics.connection_closed()
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._wait_for_request():
+            self.handle_one_request()
+
+    def _wait_for_request(self) -> bool:
+        """
+        Wait for the next request of a persistent connection, without reading it.
+
+        Returns False to close the connection: it was idle for `timeout` seconds, or other
+        connections wait for a worker of the pool, which this one should not keep idle.
+        """
+        # a request may already be buffered (pipelining): peek without blocking
+        self.connection.setblocking(False)
+        try:
+            if self.rfile.peek(1):
+                return True
+        except OSError:
+            return True
+        finally:
+            self.connection.settimeout(self.timeout)
+
+        pool = self.server if isinstance(self.server, PooledHTTPServer) else None
+        deadline = time.monotonic() + self.timeout
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.connection, selectors.EVENT_READ)
+            while (remaining := deadline - time.monotonic()) > 0:
+                if selector.select(min(remaining, IDLE_POLL_INTERVAL)):
+                    # the next request, or the end of the connection
+                    return True
+                if pool is not None and pool.has_waiting():
+                    return False
+        return False
+
+    def handle_one_request(self):
+        self._response_status = None
+        super().handle_one_request()
+        if self.metrics is not None and self._response_status is not None:
+            self.metrics.observe(
+                self.path,
+                self._response_status,
+                0 if self.command == "HEAD" else self._response_length,
+                time.monotonic() - self._request_start,
+            )
+
+    def parse_request(self):
+        # called once the request line is read, i.e. excluding the idle time of the connection
+        self._request_start = time.monotonic()
+        self._response_length = 0
+        return super().parse_request()
+
+    def send_response(self, code, message=None):
+        self._response_status = int(code)
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "content-length":
+            self._response_length = int(value)
+        super().send_header(keyword, value)
+
+    def do_GET(self):
+        if self.metrics is not None and self.path.split("?", 1)[0] == METRICS_PATH:
+            body = self.metrics.render().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if self.catalog is not None and self.path.split("?", 1)[0] == CATALOG_PATH:
+            body = self.catalog.to_json()
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        query = parse_query_target(self.path)
+        if query is None:
+            super().do_GET()
+            return
+
+        bundle_url, name, params = query
+        status, headers, body = run_query(self.translate_path(bundle_url), name, params)
+        self.send_response(status)
+        for keyword, value in headers:
+            self.send_header(keyword, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def translate_path(self, path):
+        if self.catalog is not None:
+            return self.catalog.translate_path(path)
+        return super().translate_path(path)
+
+    def send_head(self):
+        """
+        Common code for GET and HEAD commands, with support for (multi-)range requests.
+
+        Directories are handled by SimpleHTTPRequestHandler, files are handled here,
+        answering with 304 (Not Modified) to conditional requests, and with 206 (Partial Content)
+        or 416 (Range Not Satisfiable) to Range requests. Compressible files are sent
+        gzip/brotli-encoded when the client accepts it (see `negotiate_encoding`).
+        """
+        self._range_parts = None
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or path.endswith("/"):
+            return super().send_head()
+
+        if is_pending(path):
+            # a file of a bundle being written, which may not be written yet
+            wait_for_file(path)
+
+        try:
+            f, fs = self.open_file(path)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            size = fs.st_size
+            ctype = self.guess_type(path)
+            encoding, sidecar = negotiate_encoding(self.headers, path, fs)
+            validators = caching_headers(path, fs, encoding)
+
+            # preconditions are evaluated before the Range header
+            if is_not_modified(self.headers, fs, encoding):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                for keyword, value in validators:
+                    self.send_header(keyword, value)
+                self.end_headers()
+                f.close()
+                return None
+
+            if encoding is not None:
+                f.close()
+                if sidecar is not None:
+                    f, sidecar_fs = self.open_file(sidecar)
+                    size = sidecar_fs.st_size
+                else:
+                    f = io.BytesIO(compress_file(path, fs, self.chunk_cache))
+                    size = len(f.getbuffer())
+                validators.append(("Content-Encoding", encoding))
+
+            ranges = None
+            if "Range" in self.headers and if_range_matches(self.headers, fs):
+                ranges = parse_range_header(self.headers["Range"], size)
+
+            if ranges == []:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                f.close()
+                return None
+
+            if ranges is None:
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-type", ctype)
+                self.send_header("Content-Length", str(size))
+            elif len(ranges) == 1:
+                start, end = ranges[0]
+                self._range_parts = [(b"", start, end - start + 1)]
+                self._range_trailer = b""
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-type", ctype)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.send_header("Content-Length", str(end - start + 1))
+            else:
+                boundary = uuid.uuid4().hex
+                self._range_parts = [
+                    (
+                        (
+                            f"\r\n--{boundary}\r\n"
+                            f"Content-Type: {ctype}\r\n"
+                            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                        ).encode("latin-1"),
+                        start,
+                        end - start + 1,
+                    )
+                    for start, end in ranges
+                ]
+                self._range_trailer = f"\r\n--{boundary}--\r\n".encode("latin-1")
+                length = len(self._range_trailer) + sum(
+                    len(header) + n for header, _, n in self._range_parts
+                )
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header(
+                    "Content-type", f"multipart/byteranges; boundary={boundary}"
+                )
+                self.send_header("Content-Length", str(length))
+
+            self.send_header("Accept-Ranges", "bytes")
+            for keyword, value in validators:
+                self.send_header(keyword, value)
+            self.end_headers()
+            return f
+        except:  # noqa: E722 (same as SimpleHTTPRequestHandler, close the file on any error)
+            f.close()
+            raise
+
+    def open_file(self, path: str) -> tuple[io.IOBase, os.stat_result]:
+        """
+        Open a file (or a member of a zip bundle) for reading, from the chunk cache when it is
+        enabled and the file fits in it.
+        """
+        if self.chunk_cache is not None:
+            fs = zipbundle.stat(path)
+            data = self.chunk_cache.get(path, fs)
+            if data is not None:
+                return io.BytesIO(data), fs
+        return zipbundle.open_binary(path)
+
+    def copyfile(self, source, outputfile) -> None:
+        if self._range_parts is None:
+            super().copyfile(source, outputfile)
+            return
+
+        for header, start, length in self._range_parts:
+            outputfile.write(header)
+            source.seek(start)
+            while length > 0:
+                buf = source.read(min(COPY_BUFFER_SIZE, length))
+                if not buf:
+                    break
+                outputfile.write(buf)
+                length -= len(buf)
+        outputfile.write(self._range_trailer)
+
     def end_headers(self):
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "*")
+        for keyword, value in CORS_HEADERS:
+            self.send_header(keyword, value)
         super().end_headers()
 
     def do_OPTIONS(self):
         self.send_response(200)
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "*")
+        for keyword, value in CORS_HEADERS:
+            self.send_header(keyword, value)
+        self.send_header("Content-Length", "0")
         super().end_headers()
 
+    def send_error(self, code, message=None, explain=None):
+        # SimpleHTTPRequestHandler closes the connection on errors. Keep it open for
+        # missing files, which are frequent: zarr does not write chunks that only contain the fill value.
+        if code != HTTPStatus.NOT_FOUND:
+            super().send_error(code, message, explain)
+            return
+        self.log_error("code %d, message %s", code, message)
+        self.send_response(code, message)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
     def log_message(self, format, *args):
         if self.enable_logging:
             super().log_message(format, *args)
@@ -60,6 +1157,10 @@ def serve_directory(
     port: int = 8000,
     threaded: bool = True,
     enable_request_logging: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    engine: str = "threaded",
+    cache_size_mb: float = DEFAULT_CACHE_SIZE_MB,
+    metrics_log_interval: float = DEFAULT_METRICS_LOG_INTERVAL,
 ) -> str:
     """
     Starts an HTTP server in a background thread to serve a directory, allowing non-blocking execution.
@@ -76,29 +1177,111 @@ def serve_directory(
         Whether to run the server in a separate thread, by default True.
     enable_request_logging : bool
         Whether to enable request logging, by default False.
+    max_workers : int
+        Number of worker threads handling the (persistent) connections, by default 32.
+        Only used by the threaded engine.
+    engine : str
+        Server implementation, "threaded" (worker thread pool) or "async" (asyncio event loop
+        with zero-copy sendfile), by default "threaded".
+    cache_size_mb : float
+        Size in MB of the in-memory LRU cache of file contents, by default 256 (0 disables it).
+        The async engine sends files with sendfile, and only caches responses compressed on
+        the fly.
+    metrics_log_interval : float
+        Seconds between summary logs of the request metrics (also served at /metrics),
+        by default 60 (0 disables them).
 
     Returns
     -------
     str
         The URL of the server.
     """
-
-    port = find_available_port(port)  # Get an available port
-
     # Ensure path exists and is a directory
     if not path.exists() or not path.is_dir():
         LOG.error("The specified path does not exist or is not a directory: %s", path)
         return
 
+    return start_server(
+        path,
+        host,
+        port,
+        threaded=threaded,
+        enable_request_logging=enable_request_logging,
+        max_workers=max_workers,
+        engine=engine,
+        cache_size_mb=cache_size_mb,
+        metrics_log_interval=metrics_log_interval,
+    )
+
+
+def start_server(
+    path: Path,
+    host: str = DEFAULT_HOST,
+    port: int = 8000,
+    threaded: bool = True,
+    enable_request_logging: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    engine: str = "threaded",
+    cache_size_mb: float = DEFAULT_CACHE_SIZE_MB,
+    metrics_log_interval: float = DEFAULT_METRICS_LOG_INTERVAL,
+    catalog=None,
+) -> str:
+    """
+    Start the data server, serving a directory or the bundles of a catalog.
+
+    The parameters are the same as `serve_directory`, with the addition of `catalog`:
+    a `BundleCatalog` whose bundles are served under /<name>/ (instead of the contents of `path`)
+    together with their summary at /catalog.json.
+    """
+    port = find_available_port(port)  # Get an available port
+
+    chunk_cache = None
+    if cache_size_mb > 0:
+        chunk_cache = ChunkCache(int(cache_size_mb * 1024 * 1024))
+    metrics = ServerMetrics(chunk_cache)
+    if metrics_log_interval > 0:
+        metrics.start_periodic_logging(metrics_log_interval)
+    served = catalog if catalog is not None else path
+
+    if engine == "async":
+        from intracktive.async_server import serve_directory_async
+
+        serve_directory_async(
+            path,
+            host,
+            port,
+            threaded=threaded,
+            enable_request_logging=enable_request_logging,
+            chunk_cache=chunk_cache,
+            metrics=metrics,
+            catalog=catalog,
+        )
+        return f"http://{host}:{port}"
+    elif engine != "threaded":
+        raise ValueError(
+            f"Unknown server engine '{engine}', expected 'threaded' or 'async'"
+        )
+
     # Factory to pass directory to CORSRequestHandler
     def handler_factory(*args, **kwargs):
         return CORSRequestHandler(
-            *args, directory=str(path), enable_logging=enable_request_logging, **kwargs
+            *args,
+            directory=str(path),
+            enable_logging=enable_request_logging,
+            chunk_cache=chunk_cache,
+            metrics=metrics,
+            catalog=catalog,
+            **kwargs,
         )
 
-    def start_server():
-        with ThreadingHTTPServer((host, port), handler_factory) as httpd:
-            LOG.info("Serving %s at http://%s:%s", path, host, port)
+    # Bind before starting the (background) server, so the URL is reachable once returned
+    httpd = PooledHTTPServer((host, port), handler_factory, max_workers=max_workers)
+    httpd.chunk_cache = chunk_cache
+    httpd.metrics = metrics
+
+    def run_server():
+        with httpd:
+            LOG.info("Serving %s at http://%s:%s", served, host, port)
             try:
                 LOG.info("Server running...")
                 httpd.serve_forever()
@@ -106,12 +1289,15 @@ def serve_directory(
                 LOG.info("Server interrupted, shutting down.")
             except Exception as e:
                 LOG.error("An error occurred: %s", e)
+            metrics.log_summary()
+            if chunk_cache is not None:
+                LOG.info("Chunk cache statistics: %s", chunk_cache.stats())
 
     if threaded:
-        server_thread = threading.Thread(target=start_server, daemon=True)
+        server_thread = threading.Thread(target=run_server, daemon=True)
         server_thread.start()
     else:
-        start_server()
+        run_server()
 
     LOG.info(f"Server started in background thread at http://{host}:{port}")
 
@@ -132,15 +1318,54 @@ def serve_directory(
 @click.option(
     "--port", type=int, default=8000, help="The port number to serve on (default: 8000)"
 )
+@click.option(
+    "--max_workers",
+    type=int,
+    default=DEFAULT_MAX_WORKERS,
+    help=f"Number of worker threads handling connections (default: {DEFAULT_MAX_WORKERS})",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["threaded", "async"]),
+    default="threaded",
+    help="Server implementation: a pool of worker threads, or a single asyncio event loop "
+    "with zero-copy sendfile, suited to many concurrent connections (default: threaded)",
+)
+@click.option(
+    "--cache_size_mb",
+    type=float,
+    default=DEFAULT_CACHE_SIZE_MB,
+    help=f"Size in MB of the in-memory cache of chunk files, 0 to disable (default: {DEFAULT_CACHE_SIZE_MB})",
+)
+@click.option(
+    "--metrics_log_interval",
+    type=float,
+    default=DEFAULT_METRICS_LOG_INTERVAL,
+    help=f"Seconds between summary logs of the request metrics, 0 to disable (default: {DEFAULT_METRICS_LOG_INTERVAL}). "
+    "The metrics are also served in the Prometheus format at /metrics",
+)
 def server_cli(
     path: Path,
     host: str,
     port: int,
+    max_workers: int,
+    engine: str,
+    cache_size_mb: float,
+    metrics_log_interval: float,
 ) -> None:
     """
     Serves data on the file system over HTTP bypassing CORS
     """
-    serve_directory(path, host, port, threaded=False)
+    serve_directory(
+        path,
+        host,
+        port,
+        threaded=False,
+        max_workers=max_workers,
+        engine=engine,
+        cache_size_mb=cache_size_mb,
+        metrics_log_interval=metrics_log_interval,
+    )
 
 
 if __name__ == "__main__":
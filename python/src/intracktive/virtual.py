@@ -0,0 +1,246 @@
+import json
+import logging
+import math
+import os
+import stat as stat_module
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+
+import numcodecs
+import numpy as np
+import zarr
+from intracktive import zipbundle
+from intracktive.convert import (
+    BundleData,
+    build_bundle,
+    get_bundle_name,
+    get_unique_zarr_path,
+    read_tracks_file,
+    write_bundle,
+)
+from zarr.core.buffer import Buffer, default_buffer_prototype
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+# number of encoded chunks kept in memory by a virtual bundle (a chunk is encoded to get its size,
+# then read when it is sent)
+CHUNK_CACHE_SIZE = 1024
+
+
+class VirtualBundle:
+    """
+    Bundle that only exists in memory, served as if it were a bundle directory once mounted
+    (see `zipbundle.mount`).
+
+    The metadata (`.zgroup`, `.zattrs` and `.zarray` files) is written by zarr in a memory store
+    when the bundle is created, so it is the metadata of the same bundle written to disk.
+    Chunks are encoded (with the filters and compressor of their array) from the arrays of the
+    bundle when they are requested, and the most recent ones are kept in a cache.
+
+    Parameters
+    ----------
+    data : BundleData
+        Arrays and attributes of the bundle
+    path : Path
+        Path where the bundle is mounted, which should not exist on disk
+    cache_size : int, optional
+        Number of encoded chunks kept in memory, by default 1024
+    """
+
+    def __init__(
+        self, data: BundleData, path: Path, cache_size: int = CHUNK_CACHE_SIZE
+    ) -> None:
+        self.path = str(Path(path).resolve())
+        self.cache_size = cache_size
+        self.created_ns = time.time_ns()
+
+        store_dict = {}
+        write_bundle(data, zarr.storage.MemoryStore(store_dict), write_data=False)
+        self._files = {key: value.to_bytes() for key, value in store_dict.items()}
+        self._arrays = {path: array for path, (array, _) in data.arrays.items()}
+        self._meta = {
+            path: json.loads(self._files[f"{path}/.zarray"]) for path in self._arrays
+        }
+        self.directories = {""} | set(data.groups) | set(self._arrays)
+
+        self._chunks: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"VirtualBundle({self.path!r})"
+
+    def _chunk_index(self, name: str) -> tuple[str, tuple[int, ...]] | None:
+        """
+        Array path and grid index of a chunk key, e.g. ('points', (3, 0)) for 'points/3.0',
+        or None when the key is not a chunk of the bundle.
+        """
+        array_path, _, key = name.rpartition("/")
+        meta = self._meta.get(array_path)
+        if meta is None:
+            return None
+        try:
+            index = tuple(int(i) for i in key.split(meta["dimension_separator"]))
+        except ValueError:
+            return None
+        grid = [math.ceil(n / c) for n, c in zip(meta["shape"], meta["chunks"])]
+        if len(index) != len(grid) or not all(0 <= i < n for i, n in zip(index, grid)):
+            return None
+        return array_path, index
+
+    def has_member(self, name: str) -> bool:
+        return name in self._files or self._chunk_index(name) is not None
+
+    def has_directory(self, name: str) -> bool:
+        return name in self.directories
+
+    def encode_chunk(self, array_path: str, index: tuple[int, ...]) -> bytes:
+        """
+        Encode a chunk of an array, padded with the fill value at the edges of the array
+        like zarr does.
+        """
+        meta = self._meta[array_path]
+        chunks = tuple(meta["chunks"])
+        dtype = np.dtype(meta["dtype"])
+        block = self._arrays[array_path][
+            tuple(slice(i * c, (i + 1) * c) for i, c in zip(index, chunks))
+        ]
+        if block.shape != chunks:
+            padded = np.full(chunks, meta["fill_value"], dtype=dtype)
+            padded[tuple(slice(0, n) for n in block.shape)] = block
+            block = padded
+        data = np.ascontiguousarray(block, dtype=dtype)
+        for f in meta["filters"] or []:
+            data = numcodecs.get_codec(f).encode(data)
+        if meta["compressor"]:
+            data = numcodecs.get_codec(meta["compressor"]).encode(data)
+        return bytes(data)
+
+    def read(self, name: str) -> memoryview:
+        data = self._files.get(name)
+        if data is not None:
+            return memoryview(data)
+
+        with self._lock:
+            data = self._chunks.get(name)
+            if data is not None:
+                self._chunks.move_to_end(name)
+                return memoryview(data)
+
+        chunk = self._chunk_index(name)
+        if chunk is None:
+            raise FileNotFoundError(f"{self.path}/{name}")
+        data = self.encode_chunk(*chunk)
+
+        with self._lock:
+            self._chunks[name] = data
+            while len(self._chunks) > self.cache_size:
+                self._chunks.popitem(last=False)
+        return memoryview(data)
+
+    def store(self) -> zarr.storage.MemoryStore:
+        """
+        Read-only Zarr store of the bundle, e.g. to read it with `BundleReader`.
+        """
+        return zarr.storage.MemoryStore(_Members(self), read_only=True)
+
+    def member_range(self, name: str) -> tuple[int, int]:
+        return 0, len(self.read(name))
+
+    def member_stat(self, name: str) -> os.stat_result:
+        """
+        Status of a member (or directory) of the bundle, modified when the bundle was created.
+        """
+        if name in self.directories:
+            mode, size = stat_module.S_IFDIR | 0o555, 0
+        else:
+            mode, size = stat_module.S_IFREG | 0o444, len(self.read(name))
+        mtime = self.created_ns // 1_000_000_000
+        return os.stat_result(
+            (mode, 0, 0, 1, 0, 0, size, mtime, mtime, mtime),
+            {
+                "st_atime_ns": self.created_ns,
+                "st_mtime_ns": self.created_ns,
+                "st_ctime_ns": self.created_ns,
+            },
+        )
+
+
+class _Members(Mapping):
+    """
+    Members of a virtual bundle by key, encoding chunks on access, used as the dictionary of
+    a `zarr.storage.MemoryStore`.
+    """
+
+    def __init__(self, bundle: VirtualBundle) -> None:
+        self.bundle = bundle
+
+    def __getitem__(self, key: str) -> Buffer:
+        if not self.bundle.has_member(key):
+            raise KeyError(key)
+        return default_buffer_prototype().buffer.from_bytes(self.bundle.read(key))
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.bundle.has_member(key)
+
+    def __iter__(self):
+        # chunks are not listed, like the chunks of an array that are not written yet
+        return iter(self.bundle._files)
+
+    def __len__(self) -> int:
+        return len(self.bundle._files)
+
+
+def open_virtual_bundle(
+    input_file: Path,
+    add_radius: bool = False,
+    add_all_attributes: bool = False,
+    add_attribute: str | None = None,
+    add_hex_attribute: str | None = None,
+    calc_velocity: bool = False,
+    velocity_smoothing_windowsize: int = 1,
+) -> VirtualBundle:
+    """
+    Read a tracks file into a virtual bundle, and mount it next to the file
+    (at e.g. '/path/to/tracks_virtual.zarr', which is not written), so it can be served like
+    a converted bundle. Nothing is written to disk.
+
+    See `convert_file` for the parameters.
+
+    Returns
+    -------
+    VirtualBundle
+        The mounted bundle, whose `path` is served
+    """
+    start = time.monotonic()
+    input_file = Path(input_file)
+
+    tracks_df, extra_cols, col_types = read_tracks_file(
+        input_file,
+        add_radius=add_radius,
+        add_all_attributes=add_all_attributes,
+        add_attribute=add_attribute,
+        add_hex_attribute=add_hex_attribute,
+    )
+    data = build_bundle(
+        tracks_df,
+        add_radius=add_radius,
+        extra_cols=extra_cols,
+        attribute_types=col_types,
+        calc_velocity=calc_velocity,
+        velocity_smoothing_windowsize=velocity_smoothing_windowsize,
+    )
+
+    path = get_unique_zarr_path(
+        input_file.parent / f"{get_bundle_name(input_file)}_virtual.zarr"
+    )
+    bundle = VirtualBundle(data, path)
+    zipbundle.mount(bundle)
+
+    LOG.info(
+        f"Built the virtual bundle {bundle.path} in {time.monotonic() - start} seconds"
+    )
+    return bundle
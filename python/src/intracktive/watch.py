@@ -0,0 +1,216 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import zarr
+from intracktive.catalog import release_bundle, shared_bundle_url
+from intracktive.convert import (
+    build_bundle,
+    collect_table_parts,
+    is_table_collection,
+    read_tracks_file,
+    write_bundle,
+)
+
+LOG = logging.getLogger(__name__)
+LOG.setLevel(logging.INFO)
+
+WATCH_INTERVAL = 1.0  # seconds between checks of the input file
+
+
+def input_signature(input_path: Path) -> tuple:
+    """
+    Modification times and sizes of the files of an input (a file, a directory or glob of
+    CSV/Parquet parts, or a GEFF directory), which change when the input is rewritten.
+    """
+    input_path = Path(input_path)
+    if is_table_collection(input_path):
+        try:
+            files = collect_table_parts(input_path)
+        except ValueError:
+            files = []
+    elif input_path.is_dir():
+        files = sorted(p for p in input_path.rglob("*") if p.is_file())
+    else:
+        files = [input_path]
+
+    signature = []
+    for path in files:
+        try:
+            fs = os.stat(path)
+        except OSError:
+            continue
+        signature.append((str(path), fs.st_mtime_ns, fs.st_size))
+    return tuple(signature)
+
+
+class BundleWatcher:
+    """
+    Reconvert a tracks file to a new bundle whenever it changes, and supersede the served one.
+
+    Each conversion writes a new bundle next to the first one (e.g. `tracks_bundle_1.zarr`),
+    reusing the relabeling and the lineage of the previous conversion when the tracks did not
+    change. Once the new bundle is complete, the root attributes of the served bundle get
+    `superseded_by`, the URL of the new bundle relative to the served one: the viewer, which
+    polls the attributes of bundles with `watched` set, then loads the new bundle.
+    The bundle superseded before the served one is deleted.
+
+    Parameters
+    ----------
+    input_path : Path
+        Path of the tracks file (or directory/glob of parts)
+    zarr_path : Path
+        Path of the bundle of the first conversion, which is served
+    interval : float, optional
+        Seconds between checks of the input file, by default 1
+    **convert_kwargs
+        Parameters of the conversion, see `read_tracks_file` and `build_bundle`
+    """
+
+    def __init__(
+        self,
+        input_path: Path,
+        zarr_path: Path,
+        interval: float = WATCH_INTERVAL,
+        **convert_kwargs,
+    ) -> None:
+        self.input_path = Path(input_path)
+        self.zarr_path = Path(zarr_path)
+        self.interval = interval
+        self.convert_kwargs = convert_kwargs
+        self.stage_cache: dict = {}
+        self.signature = input_signature(self.input_path)
+        self.versions = [self.zarr_path]
+        self._revision = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def latest(self) -> Path:
+        """
+        Path of the latest version of the bundle, the one the viewer loads (the bundle of
+        the first conversion is deleted after two reconversions).
+        """
+        return self.versions[-1]
+
+    def convert(self) -> Path:
+        """
+        Convert the input file to a new bundle next to the served one, reusing the stages of
+        the previous conversion that did not change.
+
+        Returns
+        -------
+        Path
+            Path of the new bundle
+        """
+        tracks_df, extra_cols, col_types = read_tracks_file(
+            self.input_path,
+            add_radius=self.convert_kwargs.get("add_radius", False),
+            add_all_attributes=self.convert_kwargs.get("add_all_attributes", False),
+            add_attribute=self.convert_kwargs.get("add_attribute"),
+            add_hex_attribute=self.convert_kwargs.get("add_hex_attribute"),
+        )
+        bundle = build_bundle(
+            tracks_df,
+            add_radius=self.convert_kwargs.get("add_radius", False),
+            extra_cols=extra_cols,
+            attribute_types=col_types,
+            calc_velocity=self.convert_kwargs.get("calc_velocity", False),
+            velocity_smoothing_windowsize=self.convert_kwargs.get(
+                "velocity_smoothing_windowsize", 1
+            ),
+            stage_cache=self.stage_cache,
+        )
+        bundle.attrs[""]["watched"] = True
+        # never reuse the path of a deleted version: the viewer caches chunks by URL
+        while True:
+            self._revision += 1
+            zarr_path = self.zarr_path.with_name(
+                f"{self.zarr_path.stem}_{self._revision}{self.zarr_path.suffix}"
+            )
+            if not zarr_path.exists():
+                break
+        write_bundle(bundle, zarr_path.as_posix())
+        return zarr_path
+
+    def reconvert(self) -> Path:
+        """
+        Convert the input file to a new bundle, and supersede the served bundle with it.
+
+        Returns
+        -------
+        Path
+            Path of the new bundle
+        """
+        start = time.monotonic()
+        zarr_path = self.convert()
+
+        # through the catalog server, bundles are served under their name in the catalog
+        url = shared_bundle_url(zarr_path) or f"../{zarr_path.name}/"
+        served = self.versions[-1]
+        # zarr writes the attributes atomically, the viewer sees the old or the new ones
+        zarr.open_group(served.as_posix(), mode="r+", zarr_format=2).attrs[
+            "superseded_by"
+        ] = url
+        self.versions.append(zarr_path)
+
+        # the viewer may still read the previous bundle, but not the one before
+        while len(self.versions) > 2:
+            obsolete = self.versions.pop(0)
+            release_bundle(obsolete)
+            shutil.rmtree(obsolete, ignore_errors=True)
+
+        LOG.info(
+            f"Reconverted {self.input_path} to {zarr_path} in {time.monotonic() - start} seconds"
+        )
+        return zarr_path
+
+    def start(self, first_conversion=None) -> None:
+        """
+        Start watching the input file in a background thread.
+
+        Parameters
+        ----------
+        first_conversion : concurrent.futures.Future | None, optional
+            The first conversion, waited for before reconverting
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(first_conversion,), daemon=True
+        )
+        self._thread.start()
+        LOG.info(f"Watching {self.input_path} for changes")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, first_conversion) -> None:
+        while not self._stop.wait(self.interval):
+            signature = input_signature(self.input_path)
+            if signature == self.signature or not signature:
+                continue
+            # the file may still be being written: wait until it does not change anymore
+            while not self._stop.wait(self.interval):
+                latest = input_signature(self.input_path)
+                if latest == signature:
+                    break
+                signature = latest
+            if self._stop.is_set():
+                break
+
+            if first_conversion is not None:
+                # wait, and keep watching even if it failed
+                first_conversion.exception()
+                first_conversion = None
+            self.signature = signature
+            LOG.info(f"{self.input_path} changed, reconverting")
+            try:
+                self.reconvert()
+            except Exception:
+                LOG.exception(f"Reconversion of {self.input_path} failed")
@@ -1,6 +1,18 @@
-import pandas as pd
-from intracktive.convert import dataframe_to_browser
-from magicgui.widgets import Container, FileEdit, PushButton, create_widget
+import threading
+from pathlib import Path
+
+import numpy as np
+from intracktive.convert import (
+    CONVERSION_STAGES,
+    tracks_layer_to_bundle,
+    zarr_to_browser,
+)
+from magicgui.widgets import Container, FileEdit, ProgressBar, PushButton, create_widget
+from superqt.utils import ensure_main_thread, thread_worker
+
+
+class ConversionCancelled(Exception):
+    """Raised in the conversion worker when the conversion is cancelled."""
 
 
 class IntracktiveWidget(Container):
@@ -25,6 +37,18 @@ class IntracktiveWidget(Container):
         self._run_btn.changed.connect(self._run_btn_click)
         self.append(self._run_btn)
 
+        self._progress_bar = ProgressBar(
+            label="Conversion", min=0, max=len(CONVERSION_STAGES), visible=False
+        )
+        self.append(self._progress_bar)
+
+        self._cancel_btn = PushButton(name="Cancel", visible=False)
+        self._cancel_btn.changed.connect(self._cancel_btn_click)
+        self.append(self._cancel_btn)
+
+        self._worker = None
+        self._cancelled = threading.Event()
+
     def _run_btn_click(self) -> None:
         if self._tracks_layer_w.value is None:
             print("No tracks layer selected")
@@ -32,44 +56,69 @@ class IntracktiveWidget(Container):
 
         tracks_layer = self._tracks_layer_w.value
 
-        tracks_data = tracks_layer.data
-        graph_data = tracks_layer.graph
+        # convert in a background thread, the napari UI stays responsive
+        self._start_conversion(
+            tracks_layer.data,
+            tracks_layer.properties,
+            tracks_layer.graph,
+            self._file_dialog.value,
+        )
 
-        flag_2D = False
-        if tracks_data.shape[1] == 4:
-            flag_2D = True
+    def _start_conversion(
+        self, data: np.ndarray, properties: dict, graph: dict, zarr_dir: Path
+    ) -> None:
+        self._cancelled.clear()
+        self._progress_bar.value = 0
+        self._progress_bar.visible = True
+        self._cancel_btn.visible = True
+        self._run_btn.enabled = False
 
-        # Extract any properties (e.g., 'track_id') that were added to the layer
-        properties = tracks_layer.properties
+        self._worker = self._convert(data, properties, graph, zarr_dir)
+        self._worker.returned.connect(self._conversion_returned)
+        self._worker.errored.connect(self._conversion_errored)
+        self._worker.finished.connect(self._conversion_finished)
+        self._worker.start()
 
-        # Convert to a pandas DataFrame
-        if flag_2D:
-            df_extracted = pd.DataFrame(
-                tracks_data, columns=["track_id", "t", "y", "x"]
-            )
-        else:
-            df_extracted = pd.DataFrame(
-                tracks_data, columns=["track_id", "t", "z", "y", "x"]
-            )
-
-        # Add additional properties if present
-        for prop_name, prop_values in properties.items():
-            df_extracted[prop_name] = prop_values
-
-        for prop_name, prop_values in properties.items():
-            df_extracted[prop_name] = prop_values
-
-        # check if graph was provided, if yes: add parent_track_id, if not: set to -1
-        graph_data = {
-            k: v[0] if isinstance(v, list) else v for k, v in graph_data.items()
-        }
-        if len(graph_data) > 0:
-            print("graph used to extract parent_track_id")
-            df_extracted["parent_track_id"] = (
-                df_extracted["track_id"].map(graph_data).fillna(-1).astype(int)
-            )
+    @thread_worker
+    def _convert(
+        self, data: np.ndarray, properties: dict, graph: dict, zarr_dir: Path
+    ) -> Path:
+        # the tracks array, properties and graph are converted directly, and the bundle of
+        # the same layer is reused when the button is clicked again
+        return tracks_layer_to_bundle(
+            data, properties, graph, zarr_dir, progress=self._report_progress
+        )
+
+    def _report_progress(self, stage: str) -> None:
+        # called by the converter in the worker thread, at the start of each stage
+        if self._cancelled.is_set():
+            raise ConversionCancelled(f"Conversion cancelled before the {stage} stage")
+        self._set_progress(stage)
+
+    @ensure_main_thread
+    def _set_progress(self, stage: str) -> None:
+        self._progress_bar.value = CONVERSION_STAGES.index(stage)
+        self._progress_bar.label = f"Conversion: {stage}"
+
+    def _cancel_btn_click(self) -> None:
+        # the conversion stops at the start of its next stage
+        self._cancelled.set()
+        self._cancel_btn.enabled = False
+
+    def _conversion_returned(self, zarr_path: Path) -> None:
+        self._progress_bar.value = self._progress_bar.max
+        zarr_to_browser(zarr_path)
+
+    def _conversion_errored(self, error: Exception) -> None:
+        if isinstance(error, ConversionCancelled):
+            print("Conversion cancelled")
         else:
-            print("no graph provided, set parent_track_id to -1")
-            df_extracted["parent_track_id"] = -1
+            print(f"Conversion failed: {error}")
 
-        dataframe_to_browser(df_extracted, self._file_dialog.value)
+    def _conversion_finished(self) -> None:
+        self._worker = None
+        self._progress_bar.visible = False
+        self._progress_bar.label = "Conversion"
+        self._cancel_btn.visible = False
+        self._cancel_btn.enabled = True
+        self._run_btn.enabled = True
@@ -0,0 +1,350 @@
+import functools
+import io
+import mmap
+import os
+import re
+import stat as stat_module
+import struct
+import threading
+import zipfile
+from pathlib import Path
+
+# A bundle can be a single uncompressed zip file (e.g. `tracks_bundle.zarr.zip`), whose members
+# are served as if the archive were a directory: `<dir>/tracks_bundle.zarr.zip/points/0.0`.
+# The functions below (`stat`, `isdir`, `isfile`, `open_binary`, `read_bytes`) are used by the
+# servers instead of their `os` counterparts, and resolve such paths to members of the archive.
+# Bundles that only exist in memory (see `intracktive.virtual`) are mounted at a path with `mount`,
+# and served the same way.
+ZIP_SUFFIX = ".zip"
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_ZIP_COMPONENT_RE = re.compile(r"\.zip(?=[/\\])", re.IGNORECASE)
+
+
+class ZipBundle:
+    """
+    Read-only view of the members of an uncompressed (stored) zip file.
+
+    The central directory is read once into an index of member name -> (offset, size) of its
+    data in the archive, which is memory-mapped: reading a member is a slice of the mapping,
+    without decompression, extraction or system call.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = str(path)
+        self._file = open(self.path, "rb")
+        self.stat = os.fstat(self._file.fileno())
+        # an empty file cannot be mapped, and is not a valid zip file anyway
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.members: dict[str, tuple[int, int]] = {}
+        self.directories: set[str] = {""}
+
+        with zipfile.ZipFile(self.path) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir():
+                    self._add_directories(name.rstrip("/"))
+                    continue
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ValueError(
+                        f"{self.path} is not an uncompressed zip file: {name} is compressed"
+                    )
+                header = _LOCAL_HEADER.unpack_from(self._mmap, info.header_offset)
+                if header[0] != _LOCAL_HEADER_SIGNATURE:
+                    raise ValueError(f"{self.path}: bad local header for {name}")
+                name_length, extra_length = header[-2:]
+                offset = info.header_offset + _LOCAL_HEADER.size
+                offset += name_length + extra_length
+                self.members[name] = (offset, info.file_size)
+                self._add_directories(posix_dirname(name))
+
+    def _add_directories(self, name: str) -> None:
+        while name and name not in self.directories:
+            self.directories.add(name)
+            name = posix_dirname(name)
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def has_member(self, name: str) -> bool:
+        return name in self.members
+
+    def has_directory(self, name: str) -> bool:
+        return name in self.directories
+
+    def member_stat(self, name: str) -> os.stat_result:
+        """
+        Status of a member: the status of the archive, with the size of the member.
+        """
+        if name in self.directories:
+            mode, size = stat_module.S_IFDIR | 0o555, 0
+        else:
+            mode, size = stat_module.S_IFREG | 0o444, self.members[name][1]
+        fs = self.stat
+        return os.stat_result(
+            (
+                mode,
+                fs.st_ino,
+                fs.st_dev,
+                1,
+                fs.st_uid,
+                fs.st_gid,
+                size,
+                int(fs.st_atime),
+                int(fs.st_mtime),
+                int(fs.st_ctime),
+            ),
+            {
+                "st_atime_ns": fs.st_atime_ns,
+                "st_mtime_ns": fs.st_mtime_ns,
+                "st_ctime_ns": fs.st_ctime_ns,
+            },
+        )
+
+    def member_range(self, name: str) -> tuple[int, int]:
+        """
+        Offset and size of the data of a member in the archive.
+        """
+        return self.members[name]
+
+    def read(self, name: str) -> memoryview:
+        offset, size = self.members[name]
+        return memoryview(self._mmap)[offset : offset + size]
+
+
+def posix_dirname(name: str) -> str:
+    return name.rpartition("/")[0]
+
+
+class MemberFile(io.RawIOBase):
+    """
+    Seekable binary file of a member of a `ZipBundle` (or of a mounted bundle), reading from the
+    memory-mapped archive.
+
+    `offset` and `size` locate the data of the member in the archive.
+    """
+
+    def __init__(self, bundle: ZipBundle, name: str) -> None:
+        super().__init__()
+        self.name = f"{bundle.path}/{name}"
+        self.offset, self.size = bundle.member_range(name)
+        self._data = bundle.read(name)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._data[self._position : self._position + len(buffer)]
+        n = len(data)
+        buffer[:n] = data
+        self._position += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        else:
+            self._position = self.size + offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def getbuffer(self) -> memoryview:
+        return self._data
+
+
+_bundles_lock = threading.Lock()
+_mounts: dict[str, object] = {}
+
+
+def mount(bundle) -> str:
+    """
+    Mount a bundle that only exists in memory at its path (`bundle.path`), replacing the bundle
+    mounted there if any.
+
+    The bundle has the interface of `ZipBundle` used by the functions of this module:
+    `path`, `has_member`, `has_directory`, `member_stat`, `member_range` and `read`.
+
+    Returns
+    -------
+    str
+        Path of the mounted bundle
+    """
+    path = os.path.abspath(bundle.path)
+    with _bundles_lock:
+        _mounts[path] = bundle
+    return path
+
+
+def unmount(path: str) -> None:
+    """
+    Unmount the bundle mounted at a path (no-op when there is none).
+    """
+    with _bundles_lock:
+        _mounts.pop(os.path.abspath(path), None)
+
+
+def mounted(path: str):
+    """
+    The bundle mounted at a path, or None.
+    """
+    return _mounts.get(os.path.abspath(path))
+
+
+def _resolve_mount(path: str) -> tuple[object, str] | None:
+    for root, bundle in list(_mounts.items()):
+        if path == root:
+            return bundle, ""
+        if path.startswith(root + os.sep):
+            return bundle, path[len(root) + 1 :].replace(os.sep, "/").strip("/")
+    return None
+
+
+@functools.lru_cache(maxsize=64)
+def _open_zip_bundle(path: str, mtime_ns: int, size: int) -> ZipBundle:
+    return ZipBundle(path)
+
+
+def open_zip_bundle(path: str) -> ZipBundle:
+    """
+    Open a zip bundle, reusing its index (and mapping) while the archive is unchanged.
+    """
+    fs = os.stat(path)
+    with _bundles_lock:
+        return _open_zip_bundle(str(path), fs.st_mtime_ns, fs.st_size)
+
+
+def split_zip_path(path: str) -> tuple[str, str] | None:
+    """
+    Split a path inside a zip bundle into the path of the archive and the member name.
+
+    Returns None when the path has no `.zip` component followed by a member name, or when that
+    component is not a file (e.g. a directory whose name ends with `.zip`).
+    """
+    for match in _ZIP_COMPONENT_RE.finditer(path):
+        archive = path[: match.end()]
+        if os.path.isfile(archive):
+            member = path[match.end() + 1 :].replace(os.sep, "/").strip("/")
+            return archive, member
+    return None
+
+
+def _resolve(path: str) -> tuple[ZipBundle, str] | None:
+    if _mounts:
+        resolved = _resolve_mount(path)
+        if resolved is not None:
+            return resolved
+    if ".zip" not in path.lower():
+        return None
+    split = split_zip_path(path)
+    if split is None:
+        return None
+    archive, member = split
+    try:
+        return open_zip_bundle(archive), member
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def stat(path: str) -> os.stat_result:
+    """
+    `os.stat`, also for the members (and implicit directories) of zip and mounted bundles.
+    """
+    try:
+        return os.stat(path)
+    except OSError:
+        resolved = _resolve(path)
+        if resolved is None:
+            raise
+        bundle, member = resolved
+        if not bundle.has_member(member) and not bundle.has_directory(member):
+            raise
+        return bundle.member_stat(member)
+
+
+def isdir(path: str) -> bool:
+    try:
+        return stat_module.S_ISDIR(stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def isfile(path: str) -> bool:
+    try:
+        return stat_module.S_ISREG(stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def open_binary(path: str) -> tuple[io.IOBase, os.stat_result]:
+    """
+    Open a file (or a member of a zip or mounted bundle) for reading.
+
+    Returns
+    -------
+    tuple[io.IOBase, os.stat_result]
+        The binary file and its status
+    """
+    try:
+        f = open(path, "rb")
+    except (FileNotFoundError, NotADirectoryError):
+        resolved = _resolve(path)
+        if resolved is None or not resolved[0].has_member(resolved[1]):
+            raise
+        bundle, member = resolved
+        return MemberFile(bundle, member), bundle.member_stat(member)
+    return f, os.fstat(f.fileno())
+
+
+def read_bytes(path: str) -> bytes:
+    f, _ = open_binary(path)
+    with f:
+        return f.read()
+
+
+def is_zip_bundle(path: Path) -> bool:
+    """
+    Whether a path is a zip bundle, i.e. a zip file (written by `convert --zip`).
+    """
+    path = Path(path)
+    return path.suffix.lower() == ZIP_SUFFIX and path.is_file()
+
+
+def pack_bundle(zarr_path: Path, zip_path: Path) -> Path:
+    """
+    Pack a bundle directory into a single uncompressed zip file.
+
+    Members are stored without compression (the chunks are already compressed by zarr),
+    so they can be served directly from the memory-mapped archive, and read with
+    `zarr.storage.ZipStore`.
+
+    Parameters
+    ----------
+    zarr_path : Path
+        Path of the bundle directory
+    zip_path : Path
+        Path of the zip file to write
+
+    Returns
+    -------
+    Path
+        Path of the zip file
+    """
+    zarr_path = Path(zarr_path)
+    tmp_path = Path(zip_path).with_name(Path(zip_path).name + ".tmp")
+    with zipfile.ZipFile(
+        tmp_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True
+    ) as archive:
+        for path in sorted(zarr_path.rglob("*")):
+            if path.is_file():
+                archive.write(path, path.relative_to(zarr_path).as_posix())
+    os.replace(tmp_path, zip_path)
+    return Path(zip_path)
@@ -12,7 +12,13 @@ import WarningDialog from "@/components/WarningDialog";
 import { usePointCanvas, ActionType } from "@/hooks/usePointCanvas";
 
 import { ViewerState, clearUrlHash } from "@/lib/ViewerState";
-import { Option, TrackManager, loadTrackManager, numberOfDefaultColorByOptions } from "@/lib/TrackManager";
+import {
+    Option,
+    TrackManager,
+    fetchBundleAttrs,
+    loadTrackManager,
+    numberOfDefaultColorByOptions,
+} from "@/lib/TrackManager";
 import { PointSelectionMode } from "@/lib/PointSelector";
 import LeftSidebarWrapper from "./leftSidebar/LeftSidebarWrapper";
 // import { TimestampOverlay } from "./overlays/TimestampOverlay";
@@ -33,6 +39,8 @@ clearUrlHash();
 const drawerWidth = 256;
 const playbackFPS = 16;
 const playbackIntervalMs = 1000 / playbackFPS;
+// how often a bundle served with `intracktive open --watch` is checked for a newer version
+const watchPollIntervalMs = 2000;
 
 // Define the hook for changes of deviceState
 const useDetectedDevice = () => {
@@ -165,12 +173,36 @@ export default function App() {
         });
     }, [dispatchCanvas, dataUrl]);
 
+    // reload a bundle served by `intracktive open --watch` when it is superseded by a newer version
+    useEffect(() => {
+        let watched = true;
+        const interval = setInterval(async () => {
+            const attrs = await fetchBundleAttrs(dataUrl);
+            if (attrs === null) return;
+            if (!attrs["watched"]) {
+                watched = false;
+                clearInterval(interval);
+            } else if (watched && typeof attrs["superseded_by"] === "string") {
+                watched = false;
+                clearInterval(interval);
+                const base = dataUrl.endsWith("/") ? dataUrl : `${dataUrl}/`;
+                dispatchCanvas({ type: ActionType.REMOVE_ALL_TRACKS });
+                setDataUrl(new URL(attrs["superseded_by"], base).toString());
+            }
+        }, watchPollIntervalMs);
+        return () => {
+            watched = false;
+            clearInterval(interval);
+        };
+    }, [dispatchCanvas, dataUrl]);
+
     useEffect(() => {
         console.debug("effect-trackmanager");
         if (!trackManager) return;
         dispatchCanvas({
             type: ActionType.INIT_POINTS_GEOMETRY,
             maxPointsPerTimepoint: trackManager.maxPointsPerTimepoint,
+            timeOffsets: trackManager.timeOffsets,
         });
         dispatchCanvas({
             type: ActionType.CHECK_CAMERA_LOCK,
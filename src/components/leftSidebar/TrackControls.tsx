@@ -30,7 +30,7 @@ interface TrackControlsProps {
 }
 
 export default function TrackControls(props: TrackControlsProps) {
-    const numTimes = props.trackManager?.points.shape[0] ?? 0;
+    const numTimes = props.trackManager?.numTimes ?? 0;
     const dropDownOptions = props.trackManager?.attributeOptions ?? [];
 
     return (
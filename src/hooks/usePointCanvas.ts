@@ -61,6 +61,7 @@ interface ResetPointSize {
 interface InitPointsGeometry {
     type: ActionType.INIT_POINTS_GEOMETRY;
     maxPointsPerTimepoint: number;
+    timeOffsets?: Int32Array | null;
 }
 
 interface TrackWidth {
@@ -226,7 +227,7 @@ function reducer(canvas: PointCanvas, action: PointCanvasAction): PointCanvas {
             newCanvas.controls.autoRotate = action.autoRotate;
             break;
         case ActionType.INIT_POINTS_GEOMETRY:
-            newCanvas.initPointsGeometry(action.maxPointsPerTimepoint);
+            newCanvas.initPointsGeometry(action.maxPointsPerTimepoint, action.timeOffsets ?? null);
             break;
         case ActionType.TRACK_WIDTH:
             newCanvas.trackWidthFactor = action.factor;
@@ -369,14 +370,15 @@ function usePointCanvas(
     canvas.selector.selectionChanged = useCallback(
         (pointIndices: number[]) => {
             console.debug("selectionChanged:", pointIndices);
-            const pointIds = new Set(pointIndices.map((p) => canvas.curTime * canvas.maxPointsPerTimepoint + p));
+            const idOffset = canvas.pointIdOffset(canvas.curTime);
+            const pointIds = new Set(pointIndices.map((p) => idOffset + p));
             dispatchCanvas({
                 type: ActionType.ADD_SELECTED_POINT_IDS,
                 selectedPointIndices: pointIndices,
                 selectedPointIds: pointIds,
             });
         },
-        [canvas.curTime, canvas.maxPointsPerTimepoint],
+        [canvas],
     );
 
     canvas.selector.selectionPreviewChanged = useCallback((pointIndices: number[]) => {
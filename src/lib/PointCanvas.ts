@@ -89,6 +89,8 @@ export class PointCanvas {
     // this is used to initialize the points geometry, and kept to initialize the
     // tracks but could be pulled from the points geometry when adding tracks
     maxPointsPerTimepoint = 0;
+    // first point id of each time point in ragged bundles, null for padded bundles
+    timeOffsets: Int32Array | null = null;
     private pointIndicesCache: Map<number, number[]> = new Map();
     colorBy: boolean = false;
     colorByEvent: Option = DEFAULT_DROPDOWN_OPTION;
@@ -328,7 +330,7 @@ export class PointCanvas {
         }
 
         // If not cached: find selectedPointIndices
-        const idOffset = this.curTime * this.maxPointsPerTimepoint;
+        const idOffset = this.pointIdOffset(this.curTime);
         this.selectedPointIndices = [];
         for (const track of this.tracks.values()) {
             if (this.curTime < track.threeTrack.startTime || this.curTime > track.threeTrack.endTime) continue;
@@ -533,8 +535,33 @@ export class PointCanvas {
         this.composer.setSize(width, height);
     }
 
-    initPointsGeometry(maxPointsPerTimepoint: number) {
+    // id of the first point at a time index
+    pointIdOffset(time: number): number {
+        return this.timeOffsets ? this.timeOffsets[time] : time * this.maxPointsPerTimepoint;
+    }
+
+    // time index of a point id
+    timeOfPointId(id: number): number {
+        if (!this.timeOffsets) {
+            return Math.floor(id / this.maxPointsPerTimepoint);
+        }
+        // last time point whose first point id is <= id
+        let low = 0;
+        let high = this.timeOffsets.length - 2;
+        while (low < high) {
+            const mid = (low + high + 1) >> 1;
+            if (this.timeOffsets[mid] <= id) {
+                low = mid;
+            } else {
+                high = mid - 1;
+            }
+        }
+        return low;
+    }
+
+    initPointsGeometry(maxPointsPerTimepoint: number, timeOffsets: Int32Array | null = null) {
         this.maxPointsPerTimepoint = maxPointsPerTimepoint;
+        this.timeOffsets = timeOffsets;
         const geometry = this.points.geometry;
         if (!geometry.hasAttribute("position") || geometry.getAttribute("position").count !== maxPointsPerTimepoint) {
             geometry.setAttribute(
@@ -627,7 +654,7 @@ export class PointCanvas {
             console.warn("Track with ID %d already exists", trackID);
             return null;
         }
-        const threeTrack = Track.new(positions, ids, this.maxPointsPerTimepoint);
+        const threeTrack = Track.new(positions, ids, (id) => this.timeOfPointId(id));
         threeTrack.updateAppearance(
             this.showTracks,
             this.showTrackHighlights,
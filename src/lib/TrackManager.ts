@@ -37,6 +37,30 @@ const DEFAULT_DROPDOWN_OPTIONS: Option[] = [
 
 export const numberOfDefaultColorByOptions = DEFAULT_DROPDOWN_OPTIONS.length;
 
+// coordinates stored as 16-bit integers (`convert --quantize`): coordinate = stored * scale + offset,
+// see python/src/intracktive/quantize.py
+export type Quantization = {
+    scale: number;
+    offset: number;
+    max_error: number;
+    delta?: boolean; // the points of a track are stored as the difference with the previous point
+};
+const QUANTIZED_PADDING = 65535;
+const DELTA_BASE = 32767;
+
+// decode quantized coordinates in place, the array holds complete tracks if they are delta encoded
+function dequantize(array: Float32Array, quantization: Quantization, stride: number): Float32Array {
+    if (quantization.delta) {
+        for (let i = 0; i < array.length; i++) {
+            array[i] += i < stride ? DELTA_BASE : array[i - stride];
+        }
+    }
+    for (let i = 0; i < array.length; i++) {
+        array[i] = array[i] * quantization.scale + quantization.offset;
+    }
+    return array;
+}
+
 // Function to reset the dropdown options based on an input flag
 function resetDropDownOptions(useFirstOptionOnly: boolean = false) {
     const options: Option[] = [];
@@ -169,11 +193,20 @@ export class TrackManager {
     points: ZarrArray;
     pointsToTracks: SparseZarrArray;
     tracksToPoints: SparseZarrArray;
-    tracksToTracks: SparseZarrArray;
+    // opened on the first lineage request: the lineage of a bundle being converted (e.g. by
+    // `intracktive open`) is written last, the viewer does not wait for it to show the points
+    tracksToTracks: Promise<SparseZarrArray> | null = null;
     attributes: ZarrArray;
     attributeOptions: Option[];
+    // block of columns of each attribute in `attributes` (attributes added to or removed from a
+    // bundle after its conversion leave gaps), null if the attributes are in order
+    attributeColumns: number[] | null = null;
     numTimes: number;
     maxPointsPerTimepoint: number;
+    // ragged bundles (version 2): points[timeOffsets[t]:timeOffsets[t + 1]] are the points at time t
+    timeOffsets: Int32Array | null;
+    pointsQuantization: Quantization | null = null;
+    tracksToPointsQuantization: Quantization | null = null;
     scaleSettings: ScaleSettings;
     defaultExtent: number;
     ndim: number;
@@ -183,41 +216,73 @@ export class TrackManager {
         points: ZarrArray,
         pointsToTracks: SparseZarrArray,
         tracksToPoints: SparseZarrArray,
-        tracksToTracks: SparseZarrArray,
         attributes: ZarrArray,
         attributeOptions: Option[],
         scaleSettings: ScaleSettings,
+        timeOffsets: Int32Array | null = null,
     ) {
         this.store = store;
         this.points = points;
         this.pointsToTracks = pointsToTracks;
         this.tracksToPoints = tracksToPoints;
-        this.tracksToTracks = tracksToTracks;
         this.attributes = attributes;
         this.attributeOptions = attributeOptions;
-        this.numTimes = points.shape[0];
-        this.maxPointsPerTimepoint = points.shape[1] / numberOfValuesPerPoint; // default is /3
+        this.timeOffsets = timeOffsets;
+        if (timeOffsets) {
+            this.numTimes = timeOffsets.length - 1;
+            this.maxPointsPerTimepoint = 0;
+            for (let t = 0; t < this.numTimes; t++) {
+                this.maxPointsPerTimepoint = Math.max(this.maxPointsPerTimepoint, timeOffsets[t + 1] - timeOffsets[t]);
+            }
+        } else {
+            this.numTimes = points.shape[0];
+            this.maxPointsPerTimepoint = points.shape[1] / numberOfValuesPerPoint; // default is /3
+        }
         this.scaleSettings = scaleSettings;
         this.defaultExtent = 1; // pointcloud is centered around (0,0,0) with an extent of 1
         this.ndim = 3;
     }
 
+    // id of the first point at a time index
+    pointIdOffset(timeIndex: number): number {
+        return this.timeOffsets ? this.timeOffsets[timeIndex] : timeIndex * this.maxPointsPerTimepoint;
+    }
+
     async fetchPointsAtTime(timeIndex: number): Promise<Float32Array> {
         console.debug("fetchPointsAtTime: %d", timeIndex);
 
-        const points: Float32Array = (await this.points.get([timeIndex, slice(null)])).data;
+        if (this.timeOffsets) {
+            // one row per point, without padding
+            const start = this.timeOffsets[timeIndex];
+            const rows = (await this.points.get([slice(start, this.timeOffsets[timeIndex + 1]), slice(null)])).data;
+            const flatPoints = new Float32Array(rows.length * numberOfValuesPerPoint);
+            for (let i = 0; i < rows.length; i++) {
+                flatPoints.set(rows[i], i * numberOfValuesPerPoint);
+            }
+            if (this.pointsQuantization) {
+                dequantize(flatPoints, this.pointsQuantization, numberOfValuesPerPoint);
+            }
+            return this.applyScale(flatPoints, numberOfValuesPerPoint);
+        }
+
+        let points: Float32Array = (await this.points.get([timeIndex, slice(null)])).data;
 
         // assume points < -127 are invalid, and all are at the end of the array
         // this is how the jagged array is stored in the zarr
         // for Float32 it's actually -9999, but the int8 data is -127
         // use -9000 here, as INF_SPACE is -9999.9 in python conversion code
-        let endIndex = points.findIndex((value) => value <= -9000);
+        // (quantized points are padded with QUANTIZED_PADDING)
+        const quantization = this.pointsQuantization;
+        let endIndex = points.findIndex((value) => (quantization ? value === QUANTIZED_PADDING : value <= -9000));
         if (endIndex === -1) {
             endIndex = points.length;
         } else if (endIndex % numberOfValuesPerPoint !== 0) {
             console.error("invalid points - %d not divisible by %d", endIndex, numberOfValuesPerPoint);
             endIndex -= endIndex % numberOfValuesPerPoint;
         }
+        if (quantization) {
+            points = dequantize(Float32Array.from(points.subarray(0, endIndex)), quantization, numberOfValuesPerPoint);
+        }
 
         // scale the data to fit in the viewer
         const array = this.applyScale(points.subarray(0, endIndex), numberOfValuesPerPoint);
@@ -227,7 +292,15 @@ export class TrackManager {
     async fetchAttributesAtTime(timeIndex: number, attributeIndex: number): Promise<Float32Array> {
         console.debug("fetchAttributesAtTime, time=%d, attribute=%d", timeIndex, attributeIndex);
 
-        const startColumn = attributeIndex * this.maxPointsPerTimepoint;
+        const column = this.attributeColumns ? this.attributeColumns[attributeIndex] : attributeIndex;
+        if (this.timeOffsets) {
+            // one row per point, one column per attribute
+            const start = this.timeOffsets[timeIndex];
+            const stop = this.timeOffsets[timeIndex + 1];
+            return (await this.attributes.get([slice(start, stop), column])).data;
+        }
+
+        const startColumn = column * this.maxPointsPerTimepoint;
         const endColumn = startColumn + this.maxPointsPerTimepoint;
 
         const attributes: Float32Array = (await this.attributes.get([timeIndex, slice(startColumn, endColumn)])).data;
@@ -268,6 +341,10 @@ export class TrackManager {
         for (let i = 0; i < points.length; i++) {
             flatPoints.set(points[i], i * 3);
         }
+        if (this.tracksToPointsQuantization) {
+            // the whole track is fetched, as needed by the delta encoding
+            dequantize(flatPoints, this.tracksToPointsQuantization, 3);
+        }
 
         // scale the data to fit in the viewer
         flatPoints = Float32Array.from(this.applyScale(flatPoints, 3));
@@ -275,11 +352,17 @@ export class TrackManager {
     }
 
     async fetchLineageForTrack(trackID: number): Promise<[Int32Array, Int32Array]> {
-        const rowStartEnd = await this.tracksToTracks.getIndPtr(slice(trackID, trackID + 2));
-        const lineage = await this.tracksToTracks.indices
+        if (!this.tracksToTracks) {
+            this.tracksToTracks = openSparseZarrArray(this.store, "tracks_to_tracks", true);
+            // retry on the next request if it failed
+            this.tracksToTracks.catch(() => (this.tracksToTracks = null));
+        }
+        const tracksToTracks = await this.tracksToTracks;
+        const rowStartEnd = await tracksToTracks.getIndPtr(slice(trackID, trackID + 2));
+        const lineage = await tracksToTracks.indices
             .get([slice(rowStartEnd[0], rowStartEnd[1])])
             .then((lineage: SparseZarrArray) => lineage.data);
-        const trackData = await this.tracksToTracks.data
+        const trackData = await tracksToTracks.data
             .get([slice(rowStartEnd[0], rowStartEnd[1])])
             .then((trackData: SparseZarrArray) => trackData.data);
         return Promise.all([lineage, trackData]);
@@ -318,6 +401,18 @@ export class TrackManager {
     }
 }
 
+// root attributes of a bundle, bypassing the browser cache (e.g. to see if a watched bundle
+// is superseded by a newer version)
+export async function fetchBundleAttrs(url: string): Promise<Record<string, unknown> | null> {
+    try {
+        const response = await fetch(`${url.replace(/\/$/, "")}/.zattrs`, { cache: "no-store" });
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        console.debug("Error fetching the attributes of %s: %s", url, error);
+        return null;
+    }
+}
+
 export async function loadTrackManager(url: string) {
     let trackManager;
     try {
@@ -340,6 +435,23 @@ export async function loadTrackManager(url: string) {
             numberOfValuesPerPoint = 3;
         }
 
+        let timeOffsets = null;
+        let pointsQuantization = null;
+        try {
+            const zattrs = await points.attrs.asObject();
+            pointsQuantization = zattrs["quantization"] ?? null;
+            if (zattrs["layout"] === "ragged") {
+                const offsets = await openArray({
+                    store: url,
+                    path: "time_offsets",
+                    mode: "r",
+                });
+                timeOffsets = (await offsets.get([slice(null)])).data;
+            }
+        } catch (error) {
+            console.error("Error getting the time offsets of the points: %s", error);
+        }
+
         let datasetNdim = 3;
         try {
             const zattrs = await points.attrs.asObject();
@@ -350,9 +462,9 @@ export async function loadTrackManager(url: string) {
 
         const pointsToTracks = await openSparseZarrArray(url, "points_to_tracks", false);
         const tracksToPoints = await openSparseZarrArray(url, "tracks_to_points", true);
-        const tracksToTracks = await openSparseZarrArray(url, "tracks_to_tracks", true);
 
         let attributes = null;
+        let attributeColumns = null;
         let attributeOptions: Option[] = resetDropDownOptions();
         try {
             attributes = await openArray({
@@ -363,6 +475,7 @@ export async function loadTrackManager(url: string) {
             const zattrs = await attributes.attrs.asObject();
             console.debug("attribute names found: %s", zattrs["attribute_names"]);
             console.debug("attribute types found: %s", zattrs["attribute_types"]);
+            attributeColumns = zattrs["attribute_columns"] ?? null;
 
             for (let column = 0; column < zattrs["attribute_names"].length; column++) {
                 addDropDownOption(attributeOptions, {
@@ -385,12 +498,15 @@ export async function loadTrackManager(url: string) {
             points,
             pointsToTracks,
             tracksToPoints,
-            tracksToTracks,
             attributes,
             attributeOptions,
             scaleSettings,
+            timeOffsets,
         );
-        if (numberOfValuesPerPoint == 4) {
+        trackManager.attributeColumns = attributeColumns;
+        trackManager.pointsQuantization = pointsQuantization;
+        trackManager.tracksToPointsQuantization = (await tracksToPoints.data.attrs.asObject())["quantization"] ?? null;
+        if (numberOfValuesPerPoint == 4 && !timeOffsets) {
             trackManager.maxPointsPerTimepoint = trackManager.points.shape[1] / numberOfValuesPerPoint;
         }
         if (datasetNdim == 2) {
@@ -20,7 +20,7 @@ export class Track extends Mesh {
     startTime: number = -1;
     endTime: number = -1;
 
-    static new(positions: Float32Array, pointIDs: Int32Array, maxPointsPerTimepoint: number) {
+    static new(positions: Float32Array, pointIDs: Int32Array, timeOfPointId: (id: number) => number) {
         const geometry = new TrackGeometry();
         const material = new TrackMaterial({
             vertexColors: true,
@@ -39,7 +39,7 @@ export class Track extends Mesh {
         // const n = pos.length / 3;
         // for (const [i, id] of pointIDs.entries()) {
         for (const [, id] of pointIDs.entries()) {
-            const t = Math.floor(id / maxPointsPerTimepoint);
+            const t = timeOfPointId(id);
             time.push(t);
             // TODO: use a LUT for the main track, too
             // colors.push(